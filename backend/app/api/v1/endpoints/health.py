@@ -0,0 +1,30 @@
+"""
+Defines liveness / readiness probes for orchestrators.
+
+Purpose:
+- /health/live: the process is up (never fails while serving).
+- /health/ready: the replica accepts new work; 503 while draining, so
+  the load balancer stops routing to it before it shuts down.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.lifecycle import lifecycle
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+def live():
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def ready():
+    if lifecycle.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "draining", "inflight": lifecycle.inflight},
+        )
+    return {"status": "ready", "inflight": lifecycle.inflight}
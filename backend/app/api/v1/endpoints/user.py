@@ -8,17 +8,17 @@ Purpose:
 """
 
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Header
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.schemas.user import UserCreate, UserOut, UserLogin
+from app.schemas.user import UserCreate, UserOut, UserLogin, UserUsageOut
 
-from app.core import security
+from app.core import revocation, security
 from app.core.config import get_settings
 
-from app.schemas.auth import Token
-from app.services import user_service
+from app.schemas.auth import Token, TokenRevoke
+from app.services import response_cache, usage_service, user_service
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -73,14 +73,13 @@ def login_user(credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 # ---------------------------------------------------------------------
-# Get Current User from Bearer Token
+# Decode + check the Bearer Token (dependency)
 # ---------------------------------------------------------------------
-@router.get("/me", response_model=UserOut)
-def get_current_user(
+def get_token_payload(
     authorization: str | None = Header(default=None),
     db: Session = Depends(get_db),
-):
-    """Return the authenticated user by decoding the bearer token."""
+) -> dict:
+    """Return the payload of a valid, non-revoked bearer token."""
 
     if not authorization:
         raise HTTPException(
@@ -104,6 +103,17 @@ def get_current_user(
             detail="Invalid or expired token.",
         )
 
+    # In-memory filter; hits the DB only for the periodic refresh
+    if revocation.is_token_revoked(db, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked.",
+        )
+
+    return payload
+
+
+def _user_id_from_payload(payload: dict) -> int:
     subject = payload.get("sub")
 
     try:
@@ -117,29 +127,118 @@ def get_current_user(
             detail="Invalid token payload.",
         )
 
-    user = user_service.get_user_by_id(db, user_id)
+    return user_id
 
-    if not user:
+
+# ---------------------------------------------------------------------
+# Get Current User from Bearer Token
+# ---------------------------------------------------------------------
+def _cached_user(request: Request, db: Session, user_id: int, detail: str):
+    """Serve a user from the response cache (304 when unchanged)."""
+
+    def build():
+        user = user_service.get_user_by_id(db, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+        return response_cache.user_response(user)
+
+    return response_cache.cached_response(
+        request,
+        response_cache.user_key(user_id),
+        build,
+        ttl=settings.RESPONSE_CACHE_USER_TTL_SECONDS,
+    )
+
+
+@router.get("/me", response_model=UserOut)
+def get_current_user(
+    request: Request,
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db),
+):
+    """Return the authenticated user by decoding the bearer token."""
+
+    user_id = _user_id_from_payload(payload)
+    return _cached_user(request, db, user_id, "User not found.")
+
+
+# ---------------------------------------------------------------------
+# Log Out (revoke the current token)
+# ---------------------------------------------------------------------
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout_user(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db),
+):
+    """Revoke the bearer token used for this request."""
+
+    try:
+        revocation.revoke_token(db, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+# ---------------------------------------------------------------------
+# Revoke a Specific Token
+# ---------------------------------------------------------------------
+@router.post("/tokens/revoke", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_user_token(
+    body: TokenRevoke,
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db),
+):
+    """
+    Revoke another token belonging to the authenticated user
+    (e.g. one issued to a lost device).
+    """
+
+    try:
+        target = security.decode_access_token(body.token)
+    except ValueError:
+        # Invalid or already expired tokens need no revocation
+        return
+
+    if target.get("sub") != payload.get("sub"):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found.",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot revoke a token issued to another user.",
         )
 
-    return user
+    try:
+        revocation.revoke_token(db, target)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 # ---------------------------------------------------------------------
 # Get User by ID
 # ---------------------------------------------------------------------
 @router.get("/{user_id}", response_model=UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Retrieve a specific user by ID.
+
+    Answers with ETag / Last-Modified and 304 for a matching conditional GET.
     """
-    user = user_service.get_user_by_id(db, user_id)
-    if not user:
+    return _cached_user(request, db, user_id, f"User with ID {user_id} not found.")
+
+
+# ---------------------------------------------------------------------
+# Get Usage Counters of a User
+# ---------------------------------------------------------------------
+@router.get("/{user_id}/usage", response_model=UserUsageOut)
+def get_user_usage(user_id: int, db: Session = Depends(get_db)):
+    """
+    Return the incrementally maintained usage counters of a user.
+    """
+    usage = usage_service.get_usage(db, user_id)
+    if usage is not None:
+        return usage
+
+    if not user_service.get_user_by_id(db, user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with ID {user_id} not found.",
         )
-    return user
+
+    return UserUsageOut(user_id=user_id)
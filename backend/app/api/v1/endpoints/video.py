@@ -1,72 +1,490 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+import math
+from dataclasses import asdict
+from typing import Literal
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    UploadFile,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.models.video import Video
-from app.schemas.video import VideoCreate
-from app.services.video_service import generate_video_flow
-from datetime import datetime
+from app.core.config import get_settings
+from app.core.lifecycle import Checkpoint, HandedOffError, lifecycle
+from app.schemas.video import (
+    GenerationJobOut,
+    QueueEstimateOut,
+    TraceSpan,
+    VideoCreate,
+    VideoRead,
+    VideoSearchHit,
+    VideoSearchPage,
+    VideoTraceOut,
+)
+from app.models.idempotency_key import KEY_COMPLETED, IdempotencyKey
+from app.services import (
+    export_service,
+    idempotency_service,
+    job_service,
+    response_cache,
+    search_service,
+    tracing,
+    usage_service,
+    user_service,
+)
+from app.services.queue_estimator import DEFAULT_WORKFLOW, estimator
+from app.services.video_service import (
+    ImageTooLargeError,
+    generate_video_flow,
+    get_video,
+    get_video_trace,
+    get_workflow_target_size,
+    ingest_image,
+    prepare_workflow,
+    save_video,
+)
+from app.services.workflow_validator import WorkflowValidationError
 
+settings = get_settings()
 
 router = APIRouter(prefix="/videos", tags=["Videos"])
 
 
+def _fingerprint(endpoint, positive_prompt, negative_prompt, image):
+    return idempotency_service.request_fingerprint(
+        endpoint,
+        positive_prompt=positive_prompt,
+        negative_prompt=negative_prompt,
+        image=(image.filename, image.size) if image else None,
+    )
+
+
+async def _admit(db: Session, user_id: int, extra_pending: int = 0):
+    """
+    Quota and backpressure checks shared by /generate and /jobs.
+    Returns the queue estimate of an admitted generation.
+    """
+    # Shutting down: let the client retry against another replica
+    if lifecycle.draining:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down; retry the request.",
+            headers={"Retry-After": "1", "Connection": "close"},
+        )
+
+    # O(1) quota check against the usage aggregate
+    quota_error = usage_service.check_quota(db, user_id)
+    if quota_error:
+        raise HTTPException(status_code=429, detail=quota_error)
+
+    # Backpressure: don't queue GPU work that is bound to time out
+    estimator.refresh(db)
+    estimate = await estimator.estimate(DEFAULT_WORKFLOW, extra_pending=extra_pending)
+    if estimate.eta_seconds > settings.GENERATION_DEADLINE_SECONDS:
+        retry_after = math.ceil(
+            estimate.eta_seconds - settings.GENERATION_DEADLINE_SECONDS
+        )
+        raise HTTPException(
+            status_code=503,
+            detail=(
+                f"GPU queue is too deep: estimated completion in "
+                f"{estimate.eta_seconds:.0f}s exceeds the "
+                f"{settings.GENERATION_DEADLINE_SECONDS}s deadline."
+            ),
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    return estimate
+
+
+async def _claim_idempotency_key(
+    db: Session, user_id: int, key: str, endpoint: str, fingerprint: str
+) -> IdempotencyKey:
+    """
+    Returns either a freshly claimed key (status in_progress: the caller
+    runs the request) or the completed key of the original request (the
+    caller replays its result). Waits while the original is still running.
+    """
+    while True:
+        try:
+            record, owner = idempotency_service.claim_key(
+                db, user_id, key, endpoint, fingerprint
+            )
+        except idempotency_service.IdempotencyConflictError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        if owner or record.status == KEY_COMPLETED:
+            return record
+
+        record = await idempotency_service.wait_for_key(
+            record.id, timeout=settings.GENERATION_DEADLINE_SECONDS
+        )
+        if record is None:
+            continue  # the original failed; run the request ourselves
+        if record.status == KEY_COMPLETED:
+            return record
+
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress.",
+            headers={"Retry-After": str(int(settings.IDEMPOTENCY_POLL_SECONDS) + 1)},
+        )
+
+
+def _handed_off(db: Session, job_id: int) -> JSONResponse:
+    """202 pointing at the job that took over a generation."""
+    job = job_service.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=410, detail="The original job no longer exists."
+        )
+    return JSONResponse(
+        status_code=202,
+        content=GenerationJobOut.model_validate(job).model_dump(mode="json"),
+        headers={"Location": f"{settings.API_V1_STR}/videos/jobs/{job.id}"},
+    )
+
+
 # -----------------------------
 #  POST /videos/generate
 # -----------------------------
 @router.post("/generate", response_model=VideoCreate)
 async def generate_video(
+    response: Response,
+    user_id: int = Form(...),
+    positive_prompt: str = Form(...),
+    negative_prompt: str = Form(""),
+    image: UploadFile = File(None),
+    idempotency_key: str | None = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+):
+    """
+    0. Replay retries that carry an already used Idempotency-Key
+    1. Reject work that cannot finish before the deadline
+    2. Upload image to ComfyUI
+    3. Inject workflow params
+    4. Execute workflow
+    5. Wait for final video
+    6. Save metadata to DB
+
+    If the replica is drained meanwhile, the generation is handed to the
+    worker fleet and the response is 202 with the job (as POST /jobs).
+    """
+
+    # 0. Retried request: return the original video instead of a new GPU run
+    record = None
+    if idempotency_key:
+        record = await _claim_idempotency_key(
+            db,
+            user_id,
+            idempotency_key,
+            "generate",
+            _fingerprint("generate", positive_prompt, negative_prompt, image),
+        )
+        if record.status == KEY_COMPLETED:
+            if record.video_id is None and record.job_id is not None:
+                return _handed_off(db, record.job_id)
+
+            video = get_video(db, record.video_id) if record.video_id else None
+            if video is None:
+                raise HTTPException(
+                    status_code=410, detail="The original video no longer exists."
+                )
+            response.headers["Idempotent-Replayed"] = "true"
+            return video
+
+    try:
+        # 1. Quota + backpressure
+        estimate = await _admit(db, user_id)
+        response.headers["X-Queue-ETA-Seconds"] = f"{estimate.eta_seconds:.0f}"
+
+        # 2. Run the actual generation logic
+        trace = tracing.start_trace()
+        response.headers["X-Correlation-ID"] = trace.correlation_id
+        try:
+            async with idempotency_service.keep_alive(record.id if record else None):
+                result = await lifecycle.run(
+                    Checkpoint(
+                        user_id, positive_prompt, negative_prompt, DEFAULT_WORKFLOW
+                    ),
+                    generate_video_flow(positive_prompt, negative_prompt, image),
+                )
+        except HandedOffError as e:
+            if record is not None:
+                idempotency_service.complete_key(db, record, job_id=e.job_id)
+            return _handed_off(db, e.job_id)
+        except ImageTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except WorkflowValidationError as e:
+            raise HTTPException(
+                status_code=422,
+                detail={"message": "Workflow failed validation.", "errors": e.errors},
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"ComfyUI error: {str(e)}")
+
+        if result["filename"] is None:
+            raise HTTPException(
+                status_code=500, detail="Model did not return any video file."
+            )
+
+        estimator.record(DEFAULT_WORKFLOW, result.get("execution_seconds"))
+
+        # 3. Save video, artifacts and usage counters in DB
+        video = save_video(
+            db,
+            user_id,
+            positive_prompt,
+            negative_prompt,
+            result,
+            trace=trace,
+            workflow=DEFAULT_WORKFLOW,
+        )
+    except BaseException:
+        # Let a retry with the same key run the request again
+        if record is not None:
+            idempotency_service.release_key(db, record)
+        raise
+
+    if record is not None:
+        idempotency_service.complete_key(db, record, video_id=video.id)
+
+    return video
+
+
+# -----------------------------
+#  POST /videos/jobs
+# -----------------------------
+@router.post("/jobs", response_model=GenerationJobOut, status_code=202)
+async def create_generation_job(
+    response: Response,
     user_id: int = Form(...),
     positive_prompt: str = Form(...),
     negative_prompt: str = Form(""),
     image: UploadFile = File(None),
+    idempotency_key: str | None = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue a generation for the worker fleet (python -m app.worker) and
+    return immediately. Poll GET /videos/jobs/{job_id} for the result.
+    A retry with the same Idempotency-Key returns the original job.
+    """
+    record = None
+    if idempotency_key:
+        record = await _claim_idempotency_key(
+            db,
+            user_id,
+            idempotency_key,
+            "jobs",
+            _fingerprint("jobs", positive_prompt, negative_prompt, image),
+        )
+        if record.status == KEY_COMPLETED:
+            job = job_service.get_job(db, record.job_id) if record.job_id else None
+            if job is None:
+                raise HTTPException(
+                    status_code=410, detail="The original job no longer exists."
+                )
+            response.headers["Idempotent-Replayed"] = "true"
+            response.headers["Location"] = f"{settings.API_V1_STR}/videos/jobs/{job.id}"
+            return job
+
+    try:
+        estimate = await _admit(
+            db, user_id, extra_pending=job_service.count_unsubmitted(db)
+        )
+
+        # Validate and upload here, so bad requests fail fast and workers
+        # never need access to the original upload.
+        try:
+            workflow = await prepare_workflow(positive_prompt, negative_prompt)
+            input_image = (
+                await ingest_image(image, get_workflow_target_size(workflow))
+                if image
+                else None
+            )
+        except ImageTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except WorkflowValidationError as e:
+            raise HTTPException(
+                status_code=422,
+                detail={"message": "Workflow failed validation.", "errors": e.errors},
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"ComfyUI error: {str(e)}")
+
+        job = job_service.enqueue_job(
+            db,
+            user_id=user_id,
+            positive_prompt=positive_prompt,
+            negative_prompt=negative_prompt,
+            input_image=input_image,
+            workflow=DEFAULT_WORKFLOW,
+        )
+    except BaseException:
+        if record is not None:
+            idempotency_service.release_key(db, record)
+        raise
+
+    if record is not None:
+        idempotency_service.complete_key(db, record, job_id=job.id)
+
+    response.headers["Location"] = f"{settings.API_V1_STR}/videos/jobs/{job.id}"
+    response.headers["X-Queue-ETA-Seconds"] = f"{estimate.eta_seconds:.0f}"
+
+    return GenerationJobOut.model_validate(job).model_copy(
+        update={"eta_seconds": estimate.eta_seconds}
+    )
+
+
+# -----------------------------
+#  GET /videos/jobs/{job_id}
+# -----------------------------
+@router.get("/jobs/{job_id}", response_model=GenerationJobOut)
+def get_generation_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Status of a queued generation; includes the video once it succeeded.
+    """
+    job = job_service.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found.")
+
+    return job
+
+
+# -----------------------------
+#  GET /videos/export
+# -----------------------------
+@router.get("/export")
+def export_videos(
+    user_id: int = Query(...),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
     db: Session = Depends(get_db),
 ):
     """
-    1. Upload image to ComfyUI
-    2. Inject workflow params
-    3. Execute workflow
-    4. Wait for final video
-    5. Save metadata to DB
+    Stream every video record of a user as NDJSON or CSV, archived ones
+    included (their `archived_at` is set).
+    Rows are written out as they arrive from a server-side cursor.
     """
+    if not user_service.get_user_by_id(db, user_id):
+        raise HTTPException(
+            status_code=404, detail=f"User with ID {user_id} not found."
+        )
 
-    # 1. Run the actual generation logic
+    return StreamingResponse(
+        export_service.iter_export(user_id, format),
+        media_type=export_service.EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="videos-user-{user_id}.{format}"'
+            )
+        },
+    )
+
+
+# -----------------------------
+#  GET /videos/search
+# -----------------------------
+@router.get("/search", response_model=VideoSearchPage)
+def search_videos(
+    user_id: int = Query(...),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over a user's prompt history, ranked by relevance.
+    """
     try:
-        result = await generate_video_flow(positive_prompt, negative_prompt, image)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ComfyUI error: {str(e)}")
+        rows, next_cursor = search_service.search_videos(
+            db, user_id=user_id, query=q, limit=limit, cursor=cursor
+        )
+    except search_service.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except search_service.SearchUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    items = [
+        VideoSearchHit(**VideoRead.model_validate(video).model_dump(), score=score)
+        for video, score in rows
+    ]
+
+    return VideoSearchPage(items=items, next_cursor=next_cursor)
+
+
+# -----------------------------
+#  GET /videos/queue/estimate
+# -----------------------------
+@router.get("/queue/estimate", response_model=QueueEstimateOut)
+async def get_queue_estimate(db: Session = Depends(get_db)):
+    """
+    Predict when a job submitted now would finish, and whether it would
+    currently be accepted.
+    """
+    estimator.refresh(db)
+    estimate = await estimator.estimate(DEFAULT_WORKFLOW)
+
+    return QueueEstimateOut(
+        **asdict(estimate),
+        deadline_seconds=settings.GENERATION_DEADLINE_SECONDS,
+        accepting=estimate.eta_seconds <= settings.GENERATION_DEADLINE_SECONDS,
+    )
+
 
-    if result["filename"] is None:
+# -----------------------------
+#  GET /videos/{video_id}/trace
+# -----------------------------
+# Declared after the static routes so they are matched first.
+@router.get("/{video_id}/trace", response_model=VideoTraceOut)
+def get_video_trace_timeline(video_id: int, db: Session = Depends(get_db)):
+    """
+    Span timeline of the generation that produced the video: upload,
+    submit, queue wait, each ComfyUI node, download, metadata and DB save.
+    """
+    trace = get_video_trace(db, video_id)
+    if not trace:
         raise HTTPException(
-            status_code=500, detail="Model did not return any video file."
+            status_code=404, detail=f"No trace recorded for video {video_id}."
         )
 
-    # 2. Extract metadata
-    metadata = result.get("metadata", {})
-
-    # 3. Save in DB
-    new_video = Video(
-        user_id=user_id,
-        # output
-        filename=result.get("filename"),
-        format=result.get("format"),
-        localpath=result.get("localpath"),
-        source_video=result.get("source_video"),
-        # input
-        input_image=result["input_image"],
-        positive_prompt=positive_prompt,
-        negative_prompt=negative_prompt,
-        # metadata
-        duration=metadata.get("duration"),
-        resolution=metadata.get("resolution"),
-        width=metadata.get("width"),
-        height=metadata.get("height"),
-        fps=metadata.get("fps"),
-        # created_at
-        created_at=datetime.now(),
+    return VideoTraceOut(
+        video_id=trace.video_id,
+        correlation_id=trace.correlation_id,
+        host=trace.host,
+        started_at=trace.started_at,
+        total_ms=trace.total_ms,
+        spans=[TraceSpan(**span) for span in tracing.parse_spans(trace.spans)],
     )
 
-    db.add(new_video)
-    db.commit()
-    db.refresh(new_video)
 
-    return new_video
+# -----------------------------
+#  GET /videos/{video_id}
+# -----------------------------
+@router.get("/{video_id}", response_model=VideoCreate)
+def read_video(video_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    A generated video with its artifacts. Videos never change, so repeat
+    reads come from the response cache and conditional GETs get 304.
+    """
+
+    def build():
+        video = get_video(db, video_id)
+        if not video:
+            raise HTTPException(status_code=404, detail=f"Video {video_id} not found.")
+        return response_cache.video_response(video)
+
+    return response_cache.cached_response(
+        request,
+        response_cache.video_key(video_id),
+        build,
+        ttl=settings.RESPONSE_CACHE_VIDEO_TTL_SECONDS,
+    )
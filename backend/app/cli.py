@@ -0,0 +1,206 @@
+"""
+Command line entry point for backend maintenance tasks.
+
+Usage:
+    python -m app.cli init-db [--check]
+    python -m app.cli reconcile-usage [--user-id ID]
+    python -m app.cli purge-revoked-tokens
+    python -m app.cli purge-idempotency-keys
+    python -m app.cli migrate-prompts [--batch-size N] [--pause S] [--drop-legacy]
+    python -m app.cli retention [--dry-run] [--batch-size N] [--pause S]
+    python -m app.cli set-retention-policy --user-id ID
+        [--archive-after-days N] [--evict-media-after-days N] [--clear]
+
+Intended to be run from cron / a scheduled container next to the API.
+"""
+
+import argparse
+
+from app.db.session import SessionLocal
+
+
+def init_db(args: argparse.Namespace) -> None:
+    from app.db.migrations import init_db, missing_schema
+    from app.db.session import engine
+
+    if args.check:
+        missing = missing_schema(engine)
+        if missing:
+            raise SystemExit(f"Schema is missing: {', '.join(missing)}")
+        print("Schema is up to date.")
+        return
+
+    added = init_db(engine)
+    print(f"Schema ready; added column(s): {', '.join(added) or 'none'}.")
+
+
+def reconcile_usage(args: argparse.Namespace) -> None:
+    from app.services import usage_service
+
+    db = SessionLocal()
+    try:
+        count = usage_service.reconcile_usage(db, user_id=args.user_id)
+    finally:
+        db.close()
+
+    print(f"Reconciled usage for {count} user(s).")
+
+
+def purge_revoked_tokens(args: argparse.Namespace) -> None:
+    from app.core.revocation import purge_expired_revocations
+
+    db = SessionLocal()
+    try:
+        count = purge_expired_revocations(db)
+    finally:
+        db.close()
+
+    print(f"Purged {count} expired revocation(s).")
+
+
+def purge_idempotency_keys(args: argparse.Namespace) -> None:
+    from app.services.idempotency_service import purge_expired_keys
+
+    db = SessionLocal()
+    try:
+        count = purge_expired_keys(db)
+    finally:
+        db.close()
+
+    print(f"Purged {count} expired idempotency key(s).")
+
+
+def migrate_prompts(args: argparse.Namespace) -> None:
+    from app.db.session import engine
+    from app.services import prompt_service
+
+    count = prompt_service.backfill_prompts(
+        engine, batch_size=args.batch_size, pause=args.pause
+    )
+    print(f"Backfilled prompts for {count} video(s).")
+
+    if args.drop_legacy:
+        dropped = prompt_service.drop_legacy_columns(engine)
+        print(f"Dropped legacy column(s): {', '.join(dropped) or 'none'}.")
+
+
+def retention(args: argparse.Namespace) -> None:
+    from app.services import retention_service
+
+    db = SessionLocal()
+    try:
+        report = retention_service.run_retention(
+            db, dry_run=args.dry_run, batch_size=args.batch_size, pause=args.pause
+        )
+    finally:
+        db.close()
+
+    prefix = "Would reclaim" if report.dry_run else "Reclaimed"
+    print(
+        f"{prefix} {report.bytes_reclaimed} byte(s): "
+        f"{report.videos_archived} video(s) archived, "
+        f"{report.artifacts_evicted} artifact(s) evicted "
+        f"({report.files_deleted} file(s) deleted, "
+        f"{report.files_missing} already missing) in {report.batches} batch(es)."
+    )
+
+
+def set_retention_policy(args: argparse.Namespace) -> None:
+    from app.models.retention_policy import RetentionPolicy
+
+    db = SessionLocal()
+    try:
+        policy = db.get(RetentionPolicy, args.user_id)
+        if args.clear:
+            if policy is not None:
+                db.delete(policy)
+            db.commit()
+            print(f"User {args.user_id} now follows the default retention policy.")
+            return
+
+        policy = policy or RetentionPolicy(user_id=args.user_id)
+        policy.archive_after_days = args.archive_after_days
+        policy.evict_media_after_days = args.evict_media_after_days
+        db.add(policy)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"Updated the retention policy of user {args.user_id}.")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init = subparsers.add_parser(
+        "init-db", help="Create missing tables, columns and indexes"
+    )
+    init.add_argument(
+        "--check",
+        action="store_true",
+        help="Only verify; exit non-zero when tables or columns are missing",
+    )
+    init.set_defaults(func=init_db)
+
+    reconcile = subparsers.add_parser(
+        "reconcile-usage", help="Recompute user_usage from the videos table"
+    )
+    reconcile.add_argument("--user-id", type=int, default=None)
+    reconcile.set_defaults(func=reconcile_usage)
+
+    purge = subparsers.add_parser(
+        "purge-revoked-tokens", help="Delete revocations of already expired tokens"
+    )
+    purge.set_defaults(func=purge_revoked_tokens)
+
+    purge_keys = subparsers.add_parser(
+        "purge-idempotency-keys", help="Delete expired Idempotency-Key records"
+    )
+    purge_keys.set_defaults(func=purge_idempotency_keys)
+
+    prompts = subparsers.add_parser(
+        "migrate-prompts",
+        help="Move legacy videos prompt texts into the deduplicated prompts table",
+    )
+    prompts.add_argument("--batch-size", type=int, default=None)
+    prompts.add_argument(
+        "--pause", type=float, default=0.0, help="Seconds to sleep between batches"
+    )
+    prompts.add_argument(
+        "--drop-legacy",
+        action="store_true",
+        help="Drop videos.positive_prompt / negative_prompt after the backfill",
+    )
+    prompts.set_defaults(func=migrate_prompts)
+
+    retention_parser = subparsers.add_parser(
+        "retention", help="Evict aged media and archive aged videos"
+    )
+    retention_parser.add_argument(
+        "--dry-run", action="store_true", help="Only report what would be reclaimed"
+    )
+    retention_parser.add_argument("--batch-size", type=int, default=None)
+    retention_parser.add_argument(
+        "--pause", type=float, default=None, help="Seconds to sleep between batches"
+    )
+    retention_parser.set_defaults(func=retention)
+
+    policy = subparsers.add_parser(
+        "set-retention-policy",
+        help="Override the retention defaults for one user (omitted = never)",
+    )
+    policy.add_argument("--user-id", type=int, required=True)
+    policy.add_argument("--archive-after-days", type=int, default=None)
+    policy.add_argument("--evict-media-after-days", type=int, default=None)
+    policy.add_argument(
+        "--clear", action="store_true", help="Go back to the default policy"
+    )
+    policy.set_defaults(func=set_retention_policy)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,31 @@ class Settings(BaseSettings):
         ge=1,
     )
 
+    REVOCATION_REFRESH_SECONDS: float = Field(
+        default=5.0,
+        description="How often each worker pulls newly revoked token ids",
+        ge=0,
+    )
+    REVOCATION_REFRESH_OVERLAP_SECONDS: float = Field(
+        default=60.0,
+        description=(
+            "Each refresh re-reads revocations this much older than the newest "
+            "one seen, so rows committed out of order are not skipped"
+        ),
+        ge=0,
+    )
+    REVOCATION_FILTER_CAPACITY: int = Field(
+        default=100_000,
+        description="Expected number of live revoked tokens (Bloom filter sizing)",
+        ge=1,
+    )
+    REVOCATION_FILTER_ERROR_RATE: float = Field(
+        default=0.001,
+        description="Target false-positive rate of the revocation Bloom filter",
+        gt=0,
+        lt=1,
+    )
+
     # --- Database ---
     MYSQL_USER: str = Field(..., description="MySQL username")
     MYSQL_PASSWORD: str = Field(..., description="MySQL password")
@@ -37,6 +62,275 @@ class Settings(BaseSettings):
         description="Optional root password used only by the MySQL container",
     )
     MYSQL_PORT: int = Field(..., description="MySQL port")
+    DB_AUTO_MIGRATE: bool = Field(
+        default=True,
+        description=(
+            "Create/upgrade the schema when the API starts; disable when "
+            "`python -m app.cli init-db` runs as a deploy step"
+        ),
+    )
+
+    EXPORT_BATCH_SIZE: int = Field(
+        default=500,
+        description="Rows fetched per server-side cursor batch during exports",
+        ge=1,
+    )
+
+    # --- Query instrumentation ---
+    SQL_SLOW_QUERY_MS: float = Field(
+        default=200.0,
+        description="Statements slower than this are written to the slow-query log",
+        ge=0,
+    )
+    SQL_WARN_LAZY_LOADS: bool = Field(
+        default=True,
+        description="Log a warning whenever a relationship is lazy-loaded",
+    )
+    SQL_REQUEST_QUERY_WARN: int = Field(
+        default=50,
+        description="Log requests that execute more statements than this",
+        ge=1,
+    )
+    SQL_DEBUG_HEADERS: bool = Field(
+        default=False,
+        description="Expose per-request query count and DB time as response headers",
+    )
+
+    # --- Uploads ---
+    MAX_UPLOAD_BYTES: int = Field(
+        default=25 * 1024 * 1024,
+        description="Maximum size in bytes of an uploaded reference image",
+        ge=1,
+    )
+    UPLOAD_CHUNK_BYTES: int = Field(
+        default=256 * 1024,
+        description="Chunk size used while streaming uploads into memory",
+        ge=1024,
+    )
+    UPLOAD_JPEG_QUALITY: int = Field(
+        default=95,
+        description="JPEG quality used when re-encoding downscaled reference images",
+        ge=1,
+        le=100,
+    )
+    IMAGE_WORKERS: int = Field(
+        default=2,
+        description="Worker threads used to decode and downscale uploaded images",
+        ge=1,
+    )
+
+    # --- Workflow validation ---
+    WORKFLOW_VALIDATION: bool = Field(
+        default=True,
+        description="Validate workflows against ComfyUI node schemas before /prompt",
+    )
+    COMFY_SCHEMA_VERSION_CHECK_SECONDS: float = Field(
+        default=30.0,
+        description="How often the ComfyUI version is re-checked for schema changes",
+        ge=0,
+    )
+    COMFY_SCHEMA_MAX_AGE_SECONDS: float = Field(
+        default=600.0,
+        description="Maximum age of the cached /object_info before a refetch",
+        ge=0,
+    )
+
+    # --- Generation queue ---
+    GENERATION_DEADLINE_SECONDS: int = Field(
+        default=900,
+        description="Maximum time a generation may take from submission to result",
+        ge=1,
+    )
+    QUEUE_ESTIMATOR_WINDOW: int = Field(
+        default=50,
+        description="Number of recent execution times kept per workflow",
+        ge=1,
+    )
+    QUEUE_DEFAULT_EXECUTION_SECONDS: float = Field(
+        default=120.0,
+        description="Execution time assumed before any job has been measured",
+        gt=0,
+    )
+    QUEUE_DEPTH_TTL_SECONDS: float = Field(
+        default=2.0,
+        description="How long a fetched ComfyUI /queue depth is reused",
+        ge=0,
+    )
+    QUEUE_ESTIMATOR_REFRESH_SECONDS: float = Field(
+        default=60.0,
+        description="How often execution times are reloaded from the database",
+        ge=0,
+    )
+
+    # --- Prompts ---
+    PROMPT_CACHE_SIZE: int = Field(
+        default=2048,
+        description="Number of hot prompt texts kept in the in-process LRU cache",
+        ge=1,
+    )
+    PROMPT_BACKFILL_BATCH_SIZE: int = Field(
+        default=1000,
+        description="Videos migrated per transaction by the prompt backfill",
+        ge=1,
+    )
+
+    # --- Tracing ---
+    TRACE_NODE_EVENTS: bool = Field(
+        default=True,
+        description="Listen to ComfyUI websocket events for per-node trace spans",
+    )
+    TRACE_WS_CONNECT_SECONDS: float = Field(
+        default=1.0,
+        description=(
+            "Connect timeout of the node event websocket; it connects while the "
+            "prompt is submitted and falls back to /history when unreachable"
+        ),
+        gt=0,
+    )
+
+    # --- Generation workers ---
+    WORKER_CONCURRENCY: int = Field(
+        default=2,
+        description="Jobs a single worker process orchestrates at the same time",
+        ge=1,
+    )
+    WORKER_POLL_SECONDS: float = Field(
+        default=1.0,
+        description="How long an idle worker sleeps between claim attempts",
+        gt=0,
+    )
+    JOB_HEARTBEAT_SECONDS: float = Field(
+        default=15.0,
+        description="Interval at which a worker refreshes the heartbeat of its jobs",
+        gt=0,
+    )
+    JOB_STALE_SECONDS: float = Field(
+        default=120.0,
+        description="Running jobs without a heartbeat for this long are requeued",
+        gt=0,
+    )
+    JOB_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Claims after which a repeatedly abandoned job is failed",
+        ge=1,
+    )
+
+    # --- Shutdown ---
+    SHUTDOWN_DRAIN_SECONDS: float = Field(
+        default=25.0,
+        description=(
+            "After SIGTERM, how long in-flight generations may finish before they "
+            "are handed to the worker fleet (keep below the orchestrator grace period)"
+        ),
+        ge=0,
+    )
+
+    # --- Response cache ---
+    RESPONSE_CACHE_MAX_BYTES: int = Field(
+        default=16 * 1024 * 1024,
+        description="Size bound of the in-process cache of serialized read responses",
+        ge=0,
+    )
+    RESPONSE_CACHE_USER_TTL_SECONDS: float = Field(
+        default=30.0,
+        description=(
+            "How long a cached user may be served; bounds staleness after updates "
+            "made by another process"
+        ),
+        ge=0,
+    )
+    RESPONSE_CACHE_VIDEO_TTL_SECONDS: float = Field(
+        default=300.0,
+        description=(
+            "How long a cached video may be served; bounds staleness after "
+            "retention (run in its own process) evicts or archives it"
+        ),
+        ge=0,
+    )
+
+    # --- Idempotency ---
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = Field(
+        default=24 * 3600,
+        description="How long an Idempotency-Key is remembered per user",
+        ge=1,
+    )
+    IDEMPOTENCY_HEARTBEAT_SECONDS: float = Field(
+        default=15.0,
+        description="How often a running request refreshes the lock of its key",
+        gt=0,
+    )
+    IDEMPOTENCY_ABANDON_SECONDS: float = Field(
+        default=120.0,
+        description=(
+            "An in-progress key without a heartbeat for this long belongs to a "
+            "dead process and is taken over (keep several heartbeats long)"
+        ),
+        gt=0,
+    )
+    IDEMPOTENCY_POLL_SECONDS: float = Field(
+        default=2.0,
+        description="Poll interval of a retry waiting for the original request",
+        gt=0,
+    )
+
+    # --- Quotas ---
+    MAX_VIDEOS_PER_USER: int | None = Field(
+        default=None,
+        description="Maximum number of videos a user may generate (unset = unlimited)",
+        ge=1,
+    )
+    MAX_OUTPUT_SECONDS_PER_USER: float | None = Field(
+        default=None,
+        description="Maximum total seconds of generated video per user (unset = unlimited)",
+        gt=0,
+    )
+
+    # --- Retention ---
+    RETENTION_ARCHIVE_AFTER_DAYS: int | None = Field(
+        default=None,
+        description="Default age after which videos move to videos_archive (unset = never)",
+        ge=1,
+    )
+    RETENTION_EVICT_MEDIA_AFTER_DAYS: int | None = Field(
+        default=None,
+        description="Default age after which generated files are deleted (unset = never)",
+        ge=1,
+    )
+    RETENTION_BATCH_SIZE: int = Field(
+        default=200,
+        description="Videos archived or evicted per transaction",
+        ge=1,
+    )
+    RETENTION_BATCH_PAUSE_SECONDS: float = Field(
+        default=0.5,
+        description="Pause between retention batches to leave room for live traffic",
+        ge=0,
+    )
+
+    # --- Generated media ---
+    MEDIA_ROOT: str = Field(
+        default="/app/media",
+        description="Directory where post-processed ComfyUI outputs are stored",
+    )
+    MEDIA_URL: str = Field(
+        default="http://localhost:8000/media",
+        description="Public base URL under which MEDIA_ROOT is served",
+    )
+    MEDIA_WORKERS: int = Field(
+        default=2,
+        description="Worker threads used to remux and probe generated videos",
+        ge=1,
+    )
+    OUTPUT_FETCH_CONCURRENCY: int = Field(
+        default=4,
+        description="Maximum number of workflow outputs downloaded in parallel",
+        ge=1,
+    )
+    DOWNLOAD_CHUNK_BYTES: int = Field(
+        default=1024 * 1024,
+        description="Chunk size used when streaming outputs from ComfyUI",
+        ge=1024,
+    )
 
     # --- Frontend ---
     ALLOWED_ORIGINS: list[str] | str = Field(
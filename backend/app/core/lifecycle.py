@@ -0,0 +1,255 @@
+"""
+Graceful shutdown (drain) of API replicas.
+
+Purpose:
+- On SIGTERM, switch the replica to draining: readiness fails and new
+  generation requests are refused, so traffic moves to other replicas.
+- Track in-flight generations together with a checkpoint of their inputs,
+  stage and ComfyUI prompt_id.
+- Give them SHUTDOWN_DRAIN_SECONDS to finish, then hand the rest to the
+  worker fleet as `generation_jobs` rows. A worker resumes the prompt_id,
+  so GPU work already done is not lost, and the request answers 202 with
+  the job instead of failing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# preparing: validating the workflow / uploading the image
+# ready: inputs are in ComfyUI, the workflow is about to be submitted
+STAGE_PREPARING = "preparing"
+STAGE_READY = "ready"
+STAGE_SUBMITTED = "submitted"
+STAGE_DOWNLOADING = "downloading"
+
+_DRAIN_POLL_SECONDS = 0.2
+
+
+class HandedOffError(Exception):
+    """The generation was moved to a GenerationJob during a drain."""
+
+    def __init__(self, job_id: int):
+        super().__init__(f"Handed off to job {job_id}")
+        self.job_id = job_id
+
+
+@dataclass(eq=False)
+class Checkpoint:
+    """What another process needs to take over one generation."""
+
+    user_id: int
+    positive_prompt: str
+    negative_prompt: str | None
+    workflow: str
+    stage: str = STAGE_PREPARING
+    input_image: str | None = None
+    prompt_id: str | None = None
+    job_id: int | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def can_hand_off(self) -> bool:
+        # While preparing, the uploaded image has no ComfyUI name yet
+        return self.stage != STAGE_PREPARING
+
+
+_current_checkpoint: ContextVar[Checkpoint | None] = ContextVar(
+    "generation_checkpoint", default=None
+)
+
+
+def update_checkpoint(stage: str | None = None, **fields: Any) -> None:
+    """Record progress of the current generation (no-op outside one)."""
+    checkpoint = _current_checkpoint.get()
+    if checkpoint is None:
+        return
+
+    if stage is not None:
+        checkpoint.stage = stage
+    for name, value in fields.items():
+        setattr(checkpoint, name, value)
+
+
+class Lifecycle:
+    """Drain state and in-flight generations of this process."""
+
+    def __init__(self) -> None:
+        self.draining = False
+        self._inflight: set[Checkpoint] = set()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, checkpoint: Checkpoint, coro: Awaitable) -> Any:
+        """
+        Run a generation while tracking its checkpoint. Raises
+        HandedOffError when a drain moved it to a GenerationJob.
+        """
+        token = _current_checkpoint.set(checkpoint)
+        try:
+            # The task copies the context, so it sees the checkpoint
+            task = asyncio.ensure_future(coro)
+        finally:
+            _current_checkpoint.reset(token)
+
+        checkpoint.task = task
+        self._inflight.add(checkpoint)
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # Client went away: stop the generation too
+            task.cancel()
+            raise
+        finally:
+            self._inflight.discard(checkpoint)
+
+        if task.cancelled() and checkpoint.job_id is not None:
+            raise HandedOffError(checkpoint.job_id)
+        return task.result()
+
+    async def drain(self, deadline: float) -> None:
+        """Refuse new work, wait up to deadline, then hand off the rest."""
+        self.draining = True
+        logger.warning(
+            "Draining: waiting up to %.0fs for %d generation(s)",
+            deadline,
+            self.inflight,
+        )
+
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline
+        while self._inflight and loop.time() < end:
+            await asyncio.sleep(_DRAIN_POLL_SECONDS)
+
+        if self._inflight:
+            await self.hand_off()
+
+    async def hand_off(self) -> int:
+        """Turn every checkpointable generation into a queued job."""
+        checkpoints = [
+            checkpoint
+            for checkpoint in self._inflight
+            if not checkpoint.task.done() and checkpoint.can_hand_off
+        ]
+        if not checkpoints:
+            return 0
+
+        # The inserts block; the loop keeps serving other requests meanwhile.
+        # Tasks are only touched back on the loop.
+        job_ids = await run_in_threadpool(_enqueue_jobs, checkpoints)
+
+        handed_off = 0
+        withdrawn = []
+        for checkpoint, job_id in zip(checkpoints, job_ids):
+            if checkpoint.task.done():
+                # Finished while its job was written: do not run it twice
+                withdrawn.append(job_id)
+                continue
+
+            checkpoint.job_id = job_id
+            checkpoint.task.cancel()
+            handed_off += 1
+            logger.warning(
+                "Handed off generation at stage %s (prompt %s) to job %d",
+                checkpoint.stage,
+                checkpoint.prompt_id,
+                job_id,
+            )
+
+        if withdrawn:
+            await run_in_threadpool(_withdraw_jobs, withdrawn)
+
+        return handed_off
+
+
+def _enqueue_jobs(checkpoints: list[Checkpoint]) -> list[int]:
+    from app.db.session import SessionLocal
+    from app.services import job_service
+
+    db = SessionLocal()
+    try:
+        return [
+            job_service.enqueue_job(
+                db,
+                user_id=checkpoint.user_id,
+                positive_prompt=checkpoint.positive_prompt,
+                negative_prompt=checkpoint.negative_prompt,
+                input_image=checkpoint.input_image,
+                workflow=checkpoint.workflow,
+                prompt_id=checkpoint.prompt_id,
+            ).id
+            for checkpoint in checkpoints
+        ]
+    finally:
+        db.close()
+
+
+def _withdraw_jobs(job_ids: list[int]) -> None:
+    from app.db.session import SessionLocal
+    from app.models.generation_job import JOB_QUEUED, GenerationJob
+    from app.services import job_service
+
+    db = SessionLocal()
+    try:
+        for job_id in job_ids:
+            job = db.get(GenerationJob, job_id)
+            if job is not None and job.status == JOB_QUEUED:
+                job_service.fail_job(db, job, "Generation finished before hand-off")
+    finally:
+        db.close()
+
+
+lifecycle = Lifecycle()
+
+
+# ---------------------------------------------------------------------
+# SIGTERM
+# ---------------------------------------------------------------------
+def install_drain_handler(loop: asyncio.AbstractEventLoop) -> Callable[[], None]:
+    """
+    Put a drain in front of the server's own SIGTERM handling (uvicorn
+    installs its handler with signal.signal before the lifespan starts).
+    Returns a function restoring the previous handler.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+
+    previous = signal.getsignal(signal.SIGTERM)
+    pending: list[asyncio.Task] = []
+
+    def forward() -> None:
+        signal.signal(signal.SIGTERM, previous)
+        if callable(previous):
+            previous(signal.SIGTERM, None)
+        else:
+            signal.raise_signal(signal.SIGTERM)
+
+    def start_drain() -> None:
+        task = loop.create_task(lifecycle.drain(settings.SHUTDOWN_DRAIN_SECONDS))
+        task.add_done_callback(lambda _: forward())
+        pending.append(task)
+
+    def handle(sig, frame) -> None:
+        if lifecycle.draining:
+            forward()  # second SIGTERM: stop right away
+        else:
+            loop.call_soon_threadsafe(start_drain)
+
+    signal.signal(signal.SIGTERM, handle)
+    return lambda: signal.signal(signal.SIGTERM, previous)
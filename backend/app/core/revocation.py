@@ -0,0 +1,206 @@
+"""Token revocation checks that avoid database I/O on the request path."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.revoked_token import RevokedToken
+
+settings = get_settings()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationList:
+    """
+    Per-process view of the revoked_tokens table.
+
+    Lookups hit a Bloom filter first; only filter hits (revoked tokens and
+    rare false positives) consult the exact jti -> expiry map. The view is
+    refreshed incrementally at most every refresh_interval seconds.
+
+    Ids and revoked_at are assigned at insert time, but rows may commit in
+    another order, so a refresh re-reads everything revoked within overlap
+    seconds of the newest row already seen; entries are keyed by jti.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float,
+        capacity: int,
+        error_rate: float,
+        overlap: float = 60.0,
+    ):
+        self._refresh_interval = refresh_interval
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._overlap = timedelta(seconds=overlap)
+        self._lock = threading.Lock()
+
+        self._revoked: dict[str, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_revoked_at: datetime | None = None
+        self._refreshed_at = 0.0
+
+    # -----------------------------------------------------------------
+    # Request path
+    # -----------------------------------------------------------------
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._bloom:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._bloom.add(jti)
+
+    # -----------------------------------------------------------------
+    # Synchronisation with the store
+    # -----------------------------------------------------------------
+    def needs_refresh(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= self._refresh_interval
+
+    def refresh(self, db: Session) -> None:
+        """Pull recently revoked rows and drop expired entries."""
+        with self._lock:
+            if not self.needs_refresh():
+                return
+
+            stmt = select(
+                RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at
+            )
+            if self._last_revoked_at is not None:
+                # Compared with the database's own timestamps, not our clock
+                stmt = stmt.where(
+                    RevokedToken.revoked_at >= self._last_revoked_at - self._overlap
+                )
+
+            now = time.time()
+            for jti, expires_at, revoked_at in db.execute(stmt):
+                if revoked_at is not None and (
+                    self._last_revoked_at is None or revoked_at > self._last_revoked_at
+                ):
+                    self._last_revoked_at = revoked_at
+
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                # Tokens that have expired meanwhile need no entry
+                if expires_at.timestamp() > now:
+                    self._revoked[jti] = expires_at.timestamp()
+                    self._bloom.add(jti)
+
+            expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+            for jti in expired:
+                del self._revoked[jti]
+
+            # Bloom filters cannot forget; rebuild once expiries pile up or
+            # the live set outgrows the sizing assumption.
+            if expired or len(self._revoked) > self._capacity:
+                self._capacity = max(self._capacity, len(self._revoked) * 2)
+                bloom = BloomFilter(self._capacity, self._error_rate)
+                for jti in self._revoked:
+                    bloom.add(jti)
+                self._bloom = bloom
+
+            self._refreshed_at = time.monotonic()
+
+
+revocation_list = RevocationList(
+    refresh_interval=settings.REVOCATION_REFRESH_SECONDS,
+    capacity=settings.REVOCATION_FILTER_CAPACITY,
+    error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+    overlap=settings.REVOCATION_REFRESH_OVERLAP_SECONDS,
+)
+
+
+def is_token_revoked(db: Session, payload: dict) -> bool:
+    """
+    Check a decoded token against the revocation list. Touches the
+    database only when the periodic refresh is due.
+    """
+    jti = payload.get("jti")
+    if jti is None:
+        return False  # issued before jti existed; expires naturally
+
+    if revocation_list.needs_refresh():
+        revocation_list.refresh(db)
+
+    return revocation_list.is_revoked(jti)
+
+
+def revoke_token(db: Session, payload: dict) -> None:
+    """Persist a token's jti and apply it to this worker immediately."""
+    jti = payload.get("jti")
+    if jti is None:
+        raise ValueError("Token cannot be revoked: it has no jti claim")
+
+    exp = payload.get("exp")
+    expires_at = (
+        datetime.fromtimestamp(exp, tz=timezone.utc)
+        if exp is not None
+        else datetime.now(tz=timezone.utc)
+    )
+
+    subject = payload.get("sub")
+    db.add(
+        RevokedToken(
+            jti=jti,
+            user_id=int(subject) if subject and subject.isdigit() else None,
+            expires_at=expires_at,
+        )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # already revoked
+
+    revocation_list.add(jti, expires_at.timestamp())
+
+
+def purge_expired_revocations(db: Session) -> int:
+    """Delete store rows for tokens that have expired anyway."""
+    result = db.execute(
+        delete(RevokedToken).where(
+            RevokedToken.expires_at < datetime.now(tz=timezone.utc)
+        )
+    )
+    db.commit()
+    return result.rowcount
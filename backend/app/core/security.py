@@ -6,6 +6,7 @@ import base64
 import hashlib
 import hmac
 import json
+import secrets
 from datetime import datetime, timedelta, timezone
 from typing import Any, Callable, Dict, Optional
 
@@ -54,6 +55,8 @@ def create_access_token(
     payload: Dict[str, Any] = {
         "sub": subject,
         "exp": int(expire.timestamp()),
+        # Unique token id, used for revocation
+        "jti": secrets.token_hex(16),
     }
 
     payload_json = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode(
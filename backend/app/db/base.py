@@ -11,4 +11,13 @@ Base = declarative_base()
 # These imports are required for SQLAlchemy metadata discovery
 def init_models():
     from app.models.user import User
+    from app.models.user_usage import UserUsage
+    from app.models.revoked_token import RevokedToken
+    from app.models.prompt import Prompt
     from app.models.video import Video
+    from app.models.video_artifact import VideoArtifact
+    from app.models.video_trace import VideoTrace
+    from app.models.video_archive import VideoArchive
+    from app.models.retention_policy import RetentionPolicy
+    from app.models.generation_job import GenerationJob
+    from app.models.idempotency_key import IdempotencyKey
@@ -0,0 +1,236 @@
+"""
+SQLAlchemy instrumentation for query performance.
+
+This file:
+- Times every statement and writes slow ones to a structured (JSON) log.
+- Measures connection-pool checkout wait and tracks pool saturation.
+- Flags relationship lazy loads so N+1 patterns surface early.
+- Collects per-request query counts / DB time for debug response headers.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+slow_query_logger = logging.getLogger("app.db.slow_query")
+lazy_load_logger = logging.getLogger("app.db.lazy_load")
+pool_logger = logging.getLogger("app.db.pool")
+
+
+# ---------------------------------------------------------------------
+# Per-request statistics
+# ---------------------------------------------------------------------
+@dataclass
+class QueryStats:
+    """Counters for the statements executed while serving one request."""
+
+    queries: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    lazy_loads: list[str] = field(default_factory=list)
+
+
+# Sync endpoints run in a threadpool with a copy of the request context,
+# so they mutate the same QueryStats object the middleware created.
+_request_stats: ContextVar[QueryStats | None] = ContextVar(
+    "db_request_stats", default=None
+)
+
+
+def start_request_stats():
+    """Begin collecting stats for the current request; returns a reset token."""
+    return _request_stats.set(QueryStats())
+
+
+def get_request_stats() -> QueryStats | None:
+    return _request_stats.get()
+
+
+def reset_request_stats(token) -> None:
+    _request_stats.reset(token)
+
+
+# ---------------------------------------------------------------------
+# Process-wide pool statistics
+# ---------------------------------------------------------------------
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    saturated_checkouts: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_wait(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+
+pool_stats = PoolStats()
+
+# Saturation warnings are rate limited; the counter keeps the full picture.
+_SATURATION_LOG_INTERVAL = 10.0
+_last_saturation_log = 0.0
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that measures how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            pool_stats.record_wait(wait)
+
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.pool_wait += wait
+
+
+def pool_status(engine: Engine) -> dict:
+    """Snapshot of pool usage, suitable for a metrics endpoint or log line."""
+    pool = engine.pool
+    status = {
+        "checkouts": pool_stats.checkouts,
+        "avg_wait_ms": (
+            round(pool_stats.total_wait / pool_stats.checkouts * 1000, 3)
+            if pool_stats.checkouts
+            else 0.0
+        ),
+        "max_wait_ms": round(pool_stats.max_wait * 1000, 3),
+        "saturated_checkouts": pool_stats.saturated_checkouts,
+    }
+
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "saturation": (
+                    round(pool.checkedout() / capacity, 3) if capacity else 0.0
+                ),
+            }
+        )
+
+    return status
+
+
+# ---------------------------------------------------------------------
+# Event hooks
+# ---------------------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms >= settings.SQL_SLOW_QUERY_MS:
+        # Parameters are deliberately omitted: they may contain user data.
+        slow_query_logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_query",
+                    "duration_ms": round(elapsed_ms, 3),
+                    "statement": " ".join(statement.split())[:2000],
+                    "executemany": executemany,
+                    "rowcount": cursor.rowcount,
+                }
+            )
+        )
+
+
+def _handle_error(exception_context) -> None:
+    # A failing statement never reaches after_cursor_execute; drop its start
+    # time so later timings on this pooled connection are not skewed
+    conn = exception_context.connection
+    if conn is None or exception_context.execution_context is None:
+        return
+
+    starts = conn.info.get("query_start_time")
+    if starts:
+        starts.pop()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    global _last_saturation_log
+
+    pool = connection_proxy._pool
+    if not isinstance(pool, QueuePool):
+        return
+
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    if capacity and pool.checkedout() >= capacity:
+        with pool_stats._lock:
+            pool_stats.saturated_checkouts += 1
+
+        now = time.monotonic()
+        if now - _last_saturation_log < _SATURATION_LOG_INTERVAL:
+            return
+        _last_saturation_log = now
+
+        pool_logger.warning(
+            json.dumps(
+                {
+                    "event": "pool_saturated",
+                    "checked_out": pool.checkedout(),
+                    "capacity": capacity,
+                }
+            )
+        )
+
+
+def _detect_lazy_load(orm_execute_state) -> None:
+    # lazy_loaded_from is only set for lazy="select" loads triggered by
+    # attribute access, not for eager selectin/joined loads.
+    if not (
+        orm_execute_state.is_relationship_load
+        and orm_execute_state.lazy_loaded_from is not None
+    ):
+        return
+
+    relationship = str(orm_execute_state.loader_strategy_path[-1])
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.lazy_loads.append(relationship)
+
+    if settings.SQL_WARN_LAZY_LOADS:
+        lazy_load_logger.warning(
+            json.dumps({"event": "lazy_load", "relationship": relationship})
+        )
+
+
+def install_instrumentation(engine: Engine) -> None:
+    """Attach timing, pool and lazy-load hooks to the given engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine.pool, "checkout", _on_checkout)
+
+    if not event.contains(Session, "do_orm_execute", _detect_lazy_load):
+        event.listen(Session, "do_orm_execute", _detect_lazy_load)
@@ -0,0 +1,102 @@
+"""
+Lightweight schema upgrades for existing databases.
+
+This file:
+- Adds nullable columns that were introduced after a table was first
+  created (create_all only creates missing tables, never columns).
+- Creates indexes declared after the table existed (e.g. FULLTEXT).
+- Bundles both with create_all as one explicit step (API startup when
+  DB_AUTO_MIGRATE is set, or `python -m app.cli init-db`).
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.db.base import Base, init_models
+
+
+def add_missing_columns(engine: Engine) -> list[str]:
+    """
+    ALTER existing tables so they contain every column declared on the
+    ORM models. Returns the "table.column" names that were added.
+    """
+    init_models()
+
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(
+                        f"Cannot add NOT NULL column {table.name}.{column.name} "
+                        "without a server default"
+                    )
+
+                column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {column_ddl}"
+                    )
+                )
+                added.append(f"{table.name}.{column.name}")
+
+    return added
+
+
+def create_missing_indexes(engine: Engine) -> None:
+    """Create declared indexes that are absent; dialect-specific ones
+    (ddl_if) are only created on their dialect."""
+    init_models()
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def upgrade_schema(engine: Engine) -> list[str]:
+    """Bring an existing database up to date with the ORM models."""
+    added = add_missing_columns(engine)
+    create_missing_indexes(engine)
+    return added
+
+
+def missing_schema(engine: Engine) -> list[str]:
+    """Tables / "table.column" names declared on the models but absent."""
+    init_models()
+
+    inspector = inspect(engine)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            missing.append(table.name)
+            continue
+
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(
+            f"{table.name}.{column.name}"
+            for column in table.columns
+            if column.name not in existing
+        )
+
+    return missing
+
+
+def init_db(engine: Engine) -> list[str]:
+    """Create missing tables, then upgrade existing ones. Safe to re-run."""
+    init_models()
+    Base.metadata.create_all(bind=engine)
+    return upgrade_schema(engine)
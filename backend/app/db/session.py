@@ -6,11 +6,13 @@ This file:
 - Defines a session factory for transaction management.
 - Exposes a Base class for all ORM models to inherit.
 - Provides a dependency injection function for FastAPI routes.
+- Installs query timing / pool / lazy-load instrumentation.
 """
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import get_settings
+from app.db.instrumentation import InstrumentedQueuePool, install_instrumentation
 
 
 # ---------------------------------------------------------------------
@@ -29,8 +31,12 @@ engine = create_engine(
     pool_pre_ping=True,  # Auto-check if DB connection is alive
     pool_recycle=280,  # Reconnect MySQL after 280 seconds (prevents timeout)
     future=True,  # Use SQLAlchemy 2.0 style engine
+    poolclass=InstrumentedQueuePool,  # Measures connection checkout wait
 )
 
+# Slow-query log, pool saturation and lazy-load detection
+install_instrumentation(engine)
+
 
 # ---------------------------------------------------------------------
 # Session Factory
@@ -1,14 +1,84 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 from app.api.v1.router import api_router
+from app.core.config import get_settings
+from app.core.lifecycle import install_drain_handler
 
-from app.db.base import Base
+from app.db.base import init_models
+from app.db.instrumentation import (
+    get_request_stats,
+    reset_request_stats,
+    start_request_stats,
+)
+from app.db.migrations import init_db
 from app.db.session import engine
 
-app = FastAPI(title="Video Generator API", version="0.1.0")
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_models()
+    Path(settings.MEDIA_ROOT).mkdir(parents=True, exist_ok=True)
+
+    # Not at import time: importing the app must not need a live database
+    if settings.DB_AUTO_MIGRATE:
+        init_db(engine)
+
+    # SIGTERM first drains in-flight generations, then stops the server
+    restore_signal = install_drain_handler(asyncio.get_running_loop())
+    yield
+    restore_signal()
+
+
+app = FastAPI(title="Video Generator API", version="0.1.0", lifespan=lifespan)
+
+logger = logging.getLogger("app.db.requests")
+
+
+@app.middleware("http")
+async def db_query_stats(request: Request, call_next):
+    """Collect per-request query count / DB time and flag N+1 patterns."""
+    token = start_request_stats()
+    try:
+        response = await call_next(request)
+        stats = get_request_stats()
+    finally:
+        reset_request_stats(token)
+
+    if stats.queries > settings.SQL_REQUEST_QUERY_WARN or stats.lazy_loads:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "request_db_usage",
+                    "path": request.url.path,
+                    "queries": stats.queries,
+                    "db_time_ms": round(stats.db_time * 1000, 3),
+                    "lazy_loads": sorted(set(stats.lazy_loads)),
+                }
+            )
+        )
+
+    if settings.SQL_DEBUG_HEADERS:
+        db_ms = stats.db_time * 1000
+        response.headers["X-DB-Query-Count"] = str(stats.queries)
+        response.headers["X-DB-Time-Ms"] = f"{db_ms:.3f}"
+        response.headers["X-DB-Pool-Wait-Ms"] = f"{stats.pool_wait * 1000:.3f}"
+        response.headers["X-DB-Lazy-Loads"] = str(len(stats.lazy_loads))
+        response.headers["Server-Timing"] = (
+            f'db;dur={db_ms:.3f};desc="{stats.queries} queries"'
+        )
+
+    return response
 
-Base.metadata.create_all(bind=engine)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,3 +89,11 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix="/api/v1")
+
+# Post-processed (fast-start) outputs; FileResponse supports Range requests.
+# MEDIA_ROOT is created in the lifespan, not while importing the app.
+app.mount(
+    "/media",
+    StaticFiles(directory=settings.MEDIA_ROOT, check_dir=False),
+    name="media",
+)
@@ -0,0 +1,73 @@
+"""
+Defines the GenerationJob ORM model.
+
+Purpose:
+- Act as the durable queue between API replicas and generation workers.
+- Workers claim rows with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+  of them can poll the same table without handing out a job twice.
+- Keep the ComfyUI prompt_id once submitted, so a job whose worker died
+  can be resumed instead of generated again.
+"""
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class GenerationJob(Base):
+    """SQLAlchemy ORM model for the `generation_jobs` table."""
+
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        # Claim query: oldest queued job first
+        Index("ix_generation_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)
+
+    # Inputs (the image is already uploaded to ComfyUI when the job is queued)
+    positive_prompt = Column(Text, nullable=False)
+    negative_prompt = Column(Text, nullable=True)
+    input_image = Column(String(255), nullable=True)
+    workflow = Column(String(100), nullable=False)
+
+    # Progress
+    prompt_id = Column(String(64), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100), nullable=True)
+    error = Column(Text, nullable=True)
+
+    # Result
+    video_id = Column(
+        Integer, ForeignKey("videos.id", ondelete="SET NULL"), nullable=True
+    )
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    video = relationship("Video")
+
+    def __repr__(self) -> str:
+        return f"<GenerationJob(id={self.id}, status='{self.status}')>"
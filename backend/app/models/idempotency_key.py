@@ -0,0 +1,60 @@
+"""
+Defines the IdempotencyKey ORM model.
+
+Purpose:
+- Remember client-supplied `Idempotency-Key` headers per user, so retried
+  generation requests return the original Video / job instead of
+  starting another GPU run.
+- Expire in bulk via the indexed `expires_at` column.
+"""
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+
+from app.db.base import Base
+
+KEY_IN_PROGRESS = "in_progress"
+KEY_COMPLETED = "completed"
+
+
+class IdempotencyKey(Base):
+    """SQLAlchemy ORM model for the `idempotency_keys` table."""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # The unique index is what makes concurrent retries race-free
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    key = Column(String(255), nullable=False)
+
+    # Which endpoint and payload the key was first used with
+    endpoint = Column(String(50), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+
+    status = Column(String(20), nullable=False, default=KEY_IN_PROGRESS)
+    video_id = Column(
+        Integer, ForeignKey("videos.id", ondelete="SET NULL"), nullable=True
+    )
+    job_id = Column(
+        Integer, ForeignKey("generation_jobs.id", ondelete="SET NULL"), nullable=True
+    )
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey(id={self.id}, key='{self.key}')>"
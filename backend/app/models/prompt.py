@@ -0,0 +1,59 @@
+"""
+Defines the Prompt ORM model.
+
+Purpose:
+- Store every distinct prompt text once, keyed by its SHA-256 hash.
+- Let `videos` reference prompts by id instead of repeating Text blobs
+  (the negative prompt is nearly always the same boilerplate).
+- Carry the full-text index used by prompt search.
+"""
+
+from sqlalchemy import DDL, Column, DateTime, Index, Integer, String, Text, event
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class Prompt(Base):
+    """SQLAlchemy ORM model for the `prompts` table. Rows are immutable."""
+
+    __tablename__ = "prompts"
+    __table_args__ = (
+        # Prompt search; SQLite uses the FTS5 table defined below instead
+        Index("ix_prompts_text_fulltext", "text", mysql_prefix="FULLTEXT").ddl_if(
+            dialect="mysql"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_hash = Column(String(64), unique=True, nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self) -> str:
+        return f"<Prompt(id={self.id}, hash='{self.content_hash[:12]}')>"
+
+
+# ---------------------------------------------------------------------
+# SQLite full-text index (tests / local development)
+# ---------------------------------------------------------------------
+# External-content FTS5 table kept in sync with `prompts` by triggers.
+PROMPTS_FTS_TABLE = "prompts_fts"
+
+_SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PROMPTS_FTS_TABLE} USING fts5(
+        text, content='prompts', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS prompts_fts_ai AFTER INSERT ON prompts BEGIN
+        INSERT INTO {PROMPTS_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS prompts_fts_ad AFTER DELETE ON prompts BEGIN
+        INSERT INTO {PROMPTS_FTS_TABLE}({PROMPTS_FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+]
+
+for _statement in _SQLITE_FTS_DDL:
+    event.listen(
+        Prompt.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
@@ -0,0 +1,38 @@
+"""
+Defines the RetentionPolicy ORM model.
+
+Purpose:
+- Override the global retention defaults (RETENTION_* settings) for a
+  single user, e.g. a paid account that keeps media longer.
+- A NULL column means "never" for that user, not "use the default".
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, func
+
+from app.db.base import Base
+
+
+class RetentionPolicy(Base):
+    """SQLAlchemy ORM model for the `retention_policies` table."""
+
+    __tablename__ = "retention_policies"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Move videos older than this to `videos_archive` (media is evicted too)
+    archive_after_days = Column(Integer, nullable=True)
+    # Delete generated files from MEDIA_ROOT after this, keeping the row hot
+    evict_media_after_days = Column(Integer, nullable=True)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<RetentionPolicy(user_id={self.user_id}, "
+            f"archive={self.archive_after_days}, "
+            f"evict={self.evict_media_after_days})>"
+        )
@@ -0,0 +1,30 @@
+"""
+Defines the RevokedToken ORM model.
+
+Purpose:
+- Record token ids (jti) revoked before their natural expiry.
+- Serve as the shared store every worker's in-memory revocation filter
+  is refreshed from (incrementally, by revoked_at).
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+from app.db.base import Base
+
+
+class RevokedToken(Base):
+    """SQLAlchemy ORM model for the `revoked_tokens` table."""
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+
+    # Rows can be purged once the token would have expired anyway
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # Incremental refreshes read recent rows by revocation time
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken(id={self.id}, jti='{self.jti}')>"
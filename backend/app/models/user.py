@@ -36,6 +36,11 @@ class User(Base):
     # Video reference
     videos = relationship("Video", back_populates="user", cascade="all, delete-orphan")
 
+    # Usage counters (one-to-one)
+    usage = relationship(
+        "UserUsage", back_populates="user", uselist=False, cascade="all, delete-orphan"
+    )
+
     # ------------------------------------------------------------------
     # Representation helper
     # ------------------------------------------------------------------
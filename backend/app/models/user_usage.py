@@ -0,0 +1,43 @@
+"""
+Defines the UserUsage ORM model.
+
+Purpose:
+- Hold per-user aggregate counters used for billing and quota checks.
+- Updated in the same transaction as each Video insert, so reads are a
+  single primary-key lookup instead of COUNT/SUM scans over `videos`.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Integer, func
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class UserUsage(Base):
+    """SQLAlchemy ORM model for the `user_usage` table (one row per user)."""
+
+    __tablename__ = "user_usage"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Counters
+    video_count = Column(Integer, nullable=False, default=0)
+    output_seconds = Column(Float, nullable=False, default=0.0)
+    execution_seconds = Column(Float, nullable=False, default=0.0)
+    bytes_stored = Column(BigInteger, nullable=False, default=0)
+
+    # Audit fields
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+    user = relationship("User", back_populates="usage")
+
+    def __repr__(self) -> str:
+        return (
+            f"<UserUsage(user_id={self.user_id}, videos={self.video_count}, "
+            f"bytes={self.bytes_stored})>"
+        )
@@ -1,5 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    String,
+    DateTime,
+    ForeignKey,
+    Index,
+    event,
+)
+from sqlalchemy.orm import object_session, relationship
+from sqlalchemy.orm.attributes import flag_modified
 from datetime import datetime
 
 from app.db.base import Base
@@ -7,6 +17,12 @@ from app.db.base import Base
 
 class Video(Base):
     __tablename__ = "videos"
+    __table_args__ = (
+        # Retention scans aged rows per user
+        Index("ix_videos_user_created", "user_id", "created_at"),
+        # Queue estimator reads the latest execution times per workflow
+        Index("ix_videos_workflow_id", "workflow", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(
@@ -15,8 +31,13 @@ class Video(Base):
 
     # input data
     input_image = Column(String(255), nullable=True)
-    positive_prompt = Column(Text, nullable=True)
-    negative_prompt = Column(Text, nullable=True)
+    # prompts are deduplicated into `prompts`; see the properties below
+    positive_prompt_id = Column(
+        Integer, ForeignKey("prompts.id"), nullable=True, index=True
+    )
+    negative_prompt_id = Column(
+        Integer, ForeignKey("prompts.id"), nullable=True, index=True
+    )
 
     # metadata
     duration = Column(String(50), nullable=True)
@@ -24,6 +45,9 @@ class Video(Base):
     width = Column(String(255), nullable=True)
     height = Column(String(255), nullable=True)
     fps = Column(String(255), nullable=True)
+    execution_time = Column(Float, nullable=True)  # measured ComfyUI seconds
+    # NULL on rows stored before workflows were recorded (the default one)
+    workflow = Column(String(100), nullable=True)
 
     # generated output
     filename = Column(String(255), nullable=True)
@@ -31,7 +55,67 @@ class Video(Base):
     format = Column(String(255), nullable=True)
     source_video = Column(String(255), nullable=True)
 
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, index=True)
 
     # relationship
     user = relationship("User", back_populates="videos")
+    artifacts = relationship(
+        "VideoArtifact",
+        back_populates="video",
+        cascade="all, delete-orphan",
+        order_by="VideoArtifact.id",
+    )
+    trace = relationship(
+        "VideoTrace",
+        back_populates="video",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+    # -----------------------------------------------------------------
+    # Prompt text (read through the prompt LRU cache)
+    # -----------------------------------------------------------------
+    def _prompt_text(self, field: str):
+        pending = self.__dict__.get("_pending_prompts", {})
+        if field in pending:
+            return pending[field]
+
+        from app.services.prompt_service import prompt_text
+
+        return prompt_text(object_session(self), getattr(self, f"{field}_id"))
+
+    def _set_prompt_text(self, field: str, text):
+        # Interned into `prompts` when the row is flushed. The id column is
+        # flagged even when it already is None, so before_update still runs.
+        self.__dict__.setdefault("_pending_prompts", {})[field] = text
+        setattr(self, f"{field}_id", None)
+        flag_modified(self, f"{field}_id")
+
+    @property
+    def positive_prompt(self):
+        return self._prompt_text("positive_prompt")
+
+    @positive_prompt.setter
+    def positive_prompt(self, text):
+        self._set_prompt_text("positive_prompt", text)
+
+    @property
+    def negative_prompt(self):
+        return self._prompt_text("negative_prompt")
+
+    @negative_prompt.setter
+    def negative_prompt(self, text):
+        self._set_prompt_text("negative_prompt", text)
+
+
+@event.listens_for(Video, "before_insert")
+@event.listens_for(Video, "before_update")
+def _intern_prompts(mapper, connection, target):
+    pending = target.__dict__.pop("_pending_prompts", None)
+    if not pending:
+        return
+
+    from app.services.prompt_service import intern_prompt
+
+    for field, text in pending.items():
+        setattr(target, f"{field}_id", intern_prompt(connection, text))
@@ -0,0 +1,56 @@
+"""
+Defines the VideoArchive ORM model.
+
+Purpose:
+- Hold videos moved out of the hot `videos` table by the retention job,
+  keeping their original id, prompts and metadata.
+- Fold the artifact rows and the generation trace into compact JSON
+  columns; archived media files have already been evicted from MEDIA_ROOT.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
+
+from app.db.base import Base
+
+
+class VideoArchive(Base):
+    """SQLAlchemy ORM model for the `videos_archive` table."""
+
+    __tablename__ = "videos_archive"
+
+    # Same id as the original `videos` row
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    # input data
+    input_image = Column(String(255), nullable=True)
+    positive_prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=True)
+    negative_prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=True)
+
+    # metadata
+    duration = Column(String(50), nullable=True)
+    resolution = Column(String(50), nullable=True)
+    width = Column(String(255), nullable=True)
+    height = Column(String(255), nullable=True)
+    fps = Column(String(255), nullable=True)
+    execution_time = Column(Float, nullable=True)
+    workflow = Column(String(100), nullable=True)
+
+    # generated output (files no longer present in MEDIA_ROOT)
+    filename = Column(String(255), nullable=True)
+    localpath = Column(String(255), nullable=True)
+    format = Column(String(255), nullable=True)
+    source_video = Column(String(255), nullable=True)
+
+    # Compact JSON list of the former video_artifacts rows
+    artifacts = Column(Text, nullable=True)
+    # Compact JSON of the former video_traces row (correlation id, host,
+    # timing and spans), if the generation was traced
+    trace = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.now, nullable=False)
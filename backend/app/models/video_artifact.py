@@ -0,0 +1,55 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class VideoArtifact(Base):
+    """One file produced by a workflow output node for a given video."""
+
+    __tablename__ = "video_artifacts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(
+        Integer,
+        ForeignKey("videos.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # ComfyUI identity: node id + output type ("gifs", "images", ...) + position
+    node_id = Column(String(32), nullable=False)
+    output_type = Column(String(32), nullable=False)
+    output_index = Column(Integer, nullable=False, default=0)
+
+    # file
+    filename = Column(String(255), nullable=False)
+    subfolder = Column(String(255), nullable=True)
+    # ComfyUI folder ("output", "temp"); part of the path under MEDIA_ROOT
+    folder_type = Column(String(16), nullable=True)
+    format = Column(String(255), nullable=True)
+    localpath = Column(String(255), nullable=True)
+    source_url = Column(String(512), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+
+    # metadata (videos only)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    fps = Column(Float, nullable=True)
+    duration = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now)
+    # set when retention deleted the file from MEDIA_ROOT
+    evicted_at = Column(DateTime, nullable=True)
+
+    # relationship
+    video = relationship("Video", back_populates="artifacts")
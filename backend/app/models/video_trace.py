@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class VideoTrace(Base):
+    """
+    Span timeline of the generation that produced a video (one per video).
+
+    Kept out of `videos` so list, search and export queries never read the
+    span JSON.
+    """
+
+    __tablename__ = "video_traces"
+
+    video_id = Column(
+        Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Also sent to ComfyUI as client_id
+    correlation_id = Column(String(32), nullable=False, index=True)
+    host = Column(String(255), nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    total_ms = Column(Integer, nullable=False, default=0)
+
+    # Compact JSON: {"v": 1, "spans": [[name, start_ms, duration_ms, attrs?], ...]}
+    spans = Column(Text, nullable=False)
+
+    # relationship
+    video = relationship("Video", back_populates="trace")
@@ -17,3 +17,10 @@ class TokenPayload(BaseModel):
 
     sub: Optional[str] = None
     exp: Optional[int] = None
+    jti: Optional[str] = None
+
+
+class TokenRevoke(BaseModel):
+    """Request body used to revoke a specific token."""
+
+    token: str
@@ -51,3 +51,20 @@ class UserOut(UserBase):
 class UserLogin(UserBase):
     email: EmailStr
     password: str = Field(..., min_length=6, max_length=50)
+
+
+# ---------------------------------------------------------------------
+# Schema for Usage Counters (Response)
+# ---------------------------------------------------------------------
+class UserUsageOut(BaseModel):
+    """Aggregate generation usage of a user."""
+
+    user_id: int
+    video_count: int = 0
+    output_seconds: float = 0.0
+    execution_seconds: float = 0.0
+    bytes_stored: int = 0
+    updated_at: Optional[datetime] = None
+    reconciled_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
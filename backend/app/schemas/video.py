@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -34,10 +34,36 @@ class VideoBase(BaseModel):
     created_at: datetime
 
 
+# ---------- Artifact Schema ----------
+class VideoArtifactRead(BaseModel):
+    id: int
+    node_id: str = Field(..., description="ComfyUI output node id")
+    output_type: str = Field(..., description="Output kind, e.g. 'gifs' or 'images'")
+    output_index: int = Field(0, description="Position within the node output")
+    filename: str
+    format: Optional[str] = None
+    source_url: Optional[str] = Field(
+        None, description="Public URL of the file (None once evicted)"
+    )
+    evicted_at: Optional[datetime] = Field(
+        None, description="When retention deleted the file from the media store"
+    )
+    size_bytes: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    duration: Optional[float] = None
+
+    model_config = {"from_attributes": True}
+
+
 # ---------- Create Schema ----------
 class VideoCreate(VideoBase):
     id: int = Field(..., description="Identifier")
     user_id: int = Field(..., description="Reference to the owner user ID")
+    artifacts: List[VideoArtifactRead] = Field(
+        default_factory=list, description="Every file produced by the workflow"
+    )
 
     model_config = {"from_attributes": True}
 
@@ -48,3 +74,72 @@ class VideoRead(VideoBase):
     user_id: int
 
     model_config = {"from_attributes": True}
+
+
+# ---------- Search Schemas ----------
+class VideoSearchHit(VideoRead):
+    score: float = Field(..., description="Relevance score (higher is better)")
+
+
+class VideoSearchPage(BaseModel):
+    items: List[VideoSearchHit]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass back as `cursor` to fetch the next page"
+    )
+
+
+# ---------- Queue Schema ----------
+class QueueEstimateOut(BaseModel):
+    workflow: str
+    queue_running: int = Field(..., description="Jobs currently executing")
+    queue_pending: int = Field(..., description="Jobs waiting ahead of a new one")
+    expected_execution_seconds: float
+    eta_seconds: float = Field(..., description="Predicted completion of a new job")
+    samples: int = Field(..., description="Measured executions behind the estimate")
+    deadline_seconds: int
+    accepting: bool = Field(..., description="False when new jobs would be rejected")
+
+
+# ---------- Generation Job Schema ----------
+class GenerationJobOut(BaseModel):
+    id: int
+    user_id: int
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    workflow: str
+    prompt_id: Optional[str] = Field(
+        None, description="ComfyUI prompt id once submitted"
+    )
+    attempts: int = Field(0, description="Times a worker has claimed the job")
+    error: Optional[str] = None
+    video_id: Optional[int] = None
+    video: Optional[VideoCreate] = Field(
+        None, description="The generated video once the job succeeded"
+    )
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    eta_seconds: Optional[float] = Field(
+        None, description="Predicted completion, returned when the job is queued"
+    )
+
+    model_config = {"from_attributes": True}
+
+
+# ---------- Trace Schemas ----------
+class TraceSpan(BaseModel):
+    name: str = Field(
+        ..., description="e.g. upload, submit, queue_wait, node, download"
+    )
+    start_ms: int = Field(..., description="Offset from the start of the trace")
+    duration_ms: int
+    attrs: Dict[str, Any] = Field(default_factory=dict)
+
+
+class VideoTraceOut(BaseModel):
+    video_id: int
+    correlation_id: str = Field(..., description="Also sent to ComfyUI as client_id")
+    host: Optional[str] = Field(
+        None, description="Host that orchestrated the generation"
+    )
+    started_at: datetime
+    total_ms: int
+    spans: List[TraceSpan]
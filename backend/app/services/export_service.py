@@ -0,0 +1,148 @@
+"""
+Contains streaming export of a user's video records.
+
+Purpose:
+- Stream the whole generation history as NDJSON or CSV, including videos
+  the retention job moved to `videos_archive` (flagged by `archived_at`).
+- Read rows through a server-side cursor so memory stays constant
+  regardless of how many videos a user has.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator
+
+from sqlalchemy import DateTime, null, select, type_coerce, union_all
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.prompt import Prompt
+from app.models.video import Video
+from app.models.video_archive import VideoArchive
+
+settings = get_settings()
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Prompt id columns are exported as their text, under the original names
+# (table aliases: ORM ones would configure mappers at import time)
+_positive = Prompt.__table__.alias("positive")
+_negative = Prompt.__table__.alias("negative")
+_PROMPT_COLUMNS = {
+    "positive_prompt_id": _positive.c.text.label("positive_prompt"),
+    "negative_prompt_id": _negative.c.text.label("negative_prompt"),
+}
+
+
+def _export_select(table):
+    """Export columns of `videos` read from `table`, plus its archived_at."""
+    columns = [
+        _PROMPT_COLUMNS.get(column.name, table.c[column.name])
+        for column in Video.__table__.columns
+    ]
+    if "archived_at" in table.c:
+        columns.append(table.c.archived_at)
+    else:
+        columns.append(type_coerce(null(), DateTime).label("archived_at"))
+
+    return (
+        select(*columns)
+        .outerjoin(_positive, _positive.c.id == table.c.positive_prompt_id)
+        .outerjoin(_negative, _negative.c.id == table.c.negative_prompt_id)
+    )
+
+
+EXPORT_COLUMNS = [
+    column.name for column in _export_select(Video.__table__).selected_columns
+]
+
+# Rows in the first batch: small, so the first bytes leave before proxies
+# time out even when a full batch takes long to fetch and serialize
+_FIRST_BATCH_SIZE = 50
+
+
+# ---------------------------------------------------------------------
+# Row source
+# ---------------------------------------------------------------------
+def _iter_partitions(user_id: int) -> Iterator[list]:
+    """
+    Yield batches of row mappings for the user's videos.
+
+    The session is owned by the generator (not the request dependency),
+    because the response body is produced after the endpoint returns.
+    Core rows are used instead of ORM objects so nothing accumulates in
+    the session identity map.
+    """
+    db = SessionLocal()
+    try:
+        # Archived rows keep their original ids, so one id order covers both
+        history = union_all(
+            *(
+                _export_select(table).where(table.c.user_id == user_id)
+                for table in (Video.__table__, VideoArchive.__table__)
+            )
+        ).subquery()
+        stmt = (
+            select(history)
+            .order_by(history.c.id)
+            .execution_options(
+                stream_results=True, yield_per=settings.EXPORT_BATCH_SIZE
+            )
+        )
+        result = db.execute(stmt).mappings()
+
+        first = result.fetchmany(min(_FIRST_BATCH_SIZE, settings.EXPORT_BATCH_SIZE))
+        if first:
+            yield first
+        yield from result.partitions()
+    finally:
+        db.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+# ---------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------
+def iter_ndjson(user_id: int) -> Iterator[bytes]:
+    for partition in _iter_partitions(user_id):
+        yield "".join(
+            json.dumps(dict(row), default=_json_default, separators=(",", ":")) + "\n"
+            for row in partition
+        ).encode("utf-8")
+
+
+def iter_csv(user_id: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # Header goes out before the first query so the first byte is immediate
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+
+    for partition in _iter_partitions(user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [
+                value.isoformat() if isinstance(value, (datetime, date)) else value
+                for value in (row[column] for column in EXPORT_COLUMNS)
+            ]
+            for row in partition
+        )
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_export(user_id: int, export_format: str) -> Iterator[bytes]:
+    if export_format == "csv":
+        return iter_csv(user_id)
+    return iter_ndjson(user_id)
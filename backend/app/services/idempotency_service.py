@@ -0,0 +1,219 @@
+"""
+Contains the Idempotency-Key bookkeeping for generation requests.
+
+Purpose:
+- Claim a (user, key) pair atomically through its unique index, so only
+  the first of several concurrent retries starts a GPU run.
+- Let later retries replay the original Video / job, or wait for it
+  while the first attempt is still running (it keeps a heartbeat).
+- Release keys of failed requests and expire old keys in bulk.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.idempotency_key import KEY_COMPLETED, KEY_IN_PROGRESS, IdempotencyKey
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflictError(ValueError):
+    """Raised when a key is reused for a different request."""
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def request_fingerprint(endpoint: str, **fields) -> str:
+    """Stable hash of the request parameters a key was first used with."""
+    payload = json.dumps({"endpoint": endpoint, **fields}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------
+# Claim / complete / release
+# ---------------------------------------------------------------------
+def claim_key(
+    db: Session, user_id: int, key: str, endpoint: str, request_hash: str
+) -> tuple[IdempotencyKey, bool]:
+    """
+    Return (record, owner). When owner is True the caller must run the
+    request and then complete_key() or release_key(); otherwise record
+    belongs to the original request.
+
+    Expired keys, and in-progress keys whose heartbeat stopped for
+    IDEMPOTENCY_ABANDON_SECONDS (the owning process died), are taken over.
+    A slow generation that still beats keeps its key, however long it runs.
+    """
+    while True:
+        existing = db.scalars(
+            select(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+            )
+        ).first()
+
+        now = _now()
+        values = dict(
+            endpoint=endpoint,
+            request_hash=request_hash,
+            status=KEY_IN_PROGRESS,
+            video_id=None,
+            job_id=None,
+            locked_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+        )
+
+        if existing is None:
+            record = IdempotencyKey(user_id=user_id, key=key, **values)
+            db.add(record)
+            try:
+                db.commit()
+            except IntegrityError:
+                # A concurrent retry inserted the same key first
+                db.rollback()
+                continue
+            return record, True
+
+        abandoned_before = now - timedelta(seconds=settings.IDEMPOTENCY_ABANDON_SECONDS)
+        taken_over = db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.id == existing.id,
+                or_(
+                    IdempotencyKey.expires_at < now,
+                    and_(
+                        IdempotencyKey.status == KEY_IN_PROGRESS,
+                        IdempotencyKey.locked_at < abandoned_before,
+                    ),
+                ),
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+        if taken_over:
+            db.refresh(existing)
+            return existing, True
+
+        if existing.endpoint != endpoint or existing.request_hash != request_hash:
+            raise IdempotencyConflictError(
+                "Idempotency-Key was already used for a different request."
+            )
+
+        return existing, False
+
+
+def complete_key(
+    db: Session,
+    record: IdempotencyKey,
+    video_id: int | None = None,
+    job_id: int | None = None,
+) -> None:
+    record.status = KEY_COMPLETED
+    record.video_id = video_id
+    record.job_id = job_id
+    db.commit()
+
+
+def release_key(db: Session, record: IdempotencyKey) -> None:
+    """Forget the key of a failed request so a retry can run it again."""
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record.id))
+    db.commit()
+
+
+def touch_key(record_id: int) -> None:
+    """Refresh the heartbeat (locked_at) of an in-progress key."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.id == record_id,
+                IdempotencyKey.status == KEY_IN_PROGRESS,
+            )
+            .values(locked_at=_now())
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def keep_alive(record_id: int | None):
+    """
+    Heartbeat the key while the owning request runs, so retries wait for
+    it instead of taking it over. No-op without a key.
+    """
+    if record_id is None:
+        yield
+        return
+
+    async def beat():
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_HEARTBEAT_SECONDS)
+            try:
+                # Own session, off the event loop
+                await run_in_threadpool(touch_key, record_id)
+            except Exception as e:
+                logger.warning("Idempotency-Key heartbeat failed: %s", e)
+
+    task = asyncio.ensure_future(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+async def wait_for_key(record_id: int, timeout: float) -> IdempotencyKey | None:
+    """
+    Poll until the original request completes. Returns the completed
+    record, None if the original failed (key released), or the still
+    in-progress record on timeout.
+
+    Polls in a fresh session each time, so the caller's request session
+    is not held open (or stuck in one snapshot) while waiting.
+    """
+    deadline = time.monotonic() + timeout
+
+    while True:
+        db = SessionLocal()
+        try:
+            record = db.get(IdempotencyKey, record_id)
+        finally:
+            db.close()
+
+        if record is None or record.status == KEY_COMPLETED:
+            return record
+        if time.monotonic() >= deadline:
+            return record
+
+        await asyncio.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+
+
+# ---------------------------------------------------------------------
+# Expiry
+# ---------------------------------------------------------------------
+def purge_expired_keys(db: Session) -> int:
+    """Delete every expired key in one statement (uses ix expires_at)."""
+    result = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at < _now())
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,220 @@
+"""
+Contains the DB-backed generation job queue.
+
+Purpose:
+- Enqueue generation requests from any API replica.
+- Let any number of worker processes claim jobs concurrently using
+  SELECT ... FOR UPDATE SKIP LOCKED (each job goes to exactly one worker).
+- Track heartbeats so jobs of crashed workers are handed out again.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import get_settings
+from app.models.generation_job import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    GenerationJob,
+)
+from app.models.video import Video
+
+settings = get_settings()
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+# ---------------------------------------------------------------------
+# Producer side (API)
+# ---------------------------------------------------------------------
+def enqueue_job(
+    db: Session,
+    user_id: int,
+    positive_prompt: str,
+    negative_prompt: str | None,
+    input_image: str | None,
+    workflow: str,
+    prompt_id: str | None = None,
+) -> GenerationJob:
+    """
+    Queue a generation. A prompt_id (a generation handed off by a draining
+    API replica) makes the worker resume that ComfyUI prompt.
+    """
+    job = GenerationJob(
+        user_id=user_id,
+        status=JOB_QUEUED,
+        positive_prompt=positive_prompt,
+        negative_prompt=negative_prompt,
+        input_image=input_image,
+        workflow=workflow,
+        prompt_id=prompt_id,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: int) -> GenerationJob | None:
+    """Load a job together with its video and artifacts (no lazy loads)."""
+    return db.scalars(
+        select(GenerationJob)
+        .options(selectinload(GenerationJob.video).selectinload(Video.artifacts))
+        .where(GenerationJob.id == job_id)
+    ).first()
+
+
+def count_unsubmitted(db: Session) -> int:
+    """
+    Jobs known to the backend but not yet in ComfyUI's own queue; used as
+    extra_pending by the queue estimator.
+    """
+    return db.scalar(
+        select(func.count())
+        .select_from(GenerationJob)
+        .where(
+            GenerationJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+            GenerationJob.prompt_id.is_(None),
+        )
+    )
+
+
+# ---------------------------------------------------------------------
+# Consumer side (app.worker)
+# ---------------------------------------------------------------------
+def claim_next_job(db: Session, worker_id: str) -> GenerationJob | None:
+    """
+    Atomically take the oldest queued job.
+
+    Rows locked by another worker's claim are skipped rather than waited
+    on, so concurrent workers never block each other. SQLite has no row
+    locks and ignores the clause; it serializes writers instead.
+    """
+    job = db.scalars(
+        select(GenerationJob)
+        .where(GenerationJob.status == JOB_QUEUED)
+        .order_by(GenerationJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+
+    if job is None:
+        db.rollback()
+        return None
+
+    now = _now()
+    job.status = JOB_RUNNING
+    job.worker_id = worker_id
+    job.attempts += 1
+    job.claimed_at = now
+    job.heartbeat_at = now
+    job.error = None
+    db.commit()
+
+    return job
+
+
+def heartbeat(db: Session, job_ids: list[int], worker_id: str) -> None:
+    """Mark jobs as still owned by a live worker."""
+    if not job_ids:
+        return
+
+    db.execute(
+        update(GenerationJob)
+        .where(
+            GenerationJob.id.in_(job_ids),
+            GenerationJob.worker_id == worker_id,
+            GenerationJob.status == JOB_RUNNING,
+        )
+        .values(heartbeat_at=_now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def mark_submitted(db: Session, job: GenerationJob, prompt_id: str) -> None:
+    """Persist the ComfyUI prompt_id so a takeover can resume the job."""
+    job.prompt_id = prompt_id
+    job.heartbeat_at = _now()
+    db.commit()
+
+
+def complete_job(db: Session, job: GenerationJob, video_id: int) -> None:
+    job.status = JOB_SUCCEEDED
+    job.video_id = video_id
+    job.finished_at = _now()
+    db.commit()
+
+
+def fail_job(db: Session, job: GenerationJob, error: str) -> None:
+    job.status = JOB_FAILED
+    job.error = error
+    job.finished_at = _now()
+    db.commit()
+
+
+def release_jobs(db: Session, job_ids: list[int], worker_id: str) -> int:
+    """
+    Put running jobs of a stopping worker back in the queue right away,
+    instead of waiting for them to go stale. prompt_id is kept so the next
+    worker resumes the prompt; the hand-off does not count as an attempt.
+    """
+    if not job_ids:
+        return 0
+
+    released = db.execute(
+        update(GenerationJob)
+        .where(
+            GenerationJob.id.in_(job_ids),
+            GenerationJob.worker_id == worker_id,
+            GenerationJob.status == JOB_RUNNING,
+        )
+        .values(
+            status=JOB_QUEUED,
+            worker_id=None,
+            attempts=GenerationJob.attempts - 1,
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return released
+
+
+def requeue_stale_jobs(db: Session) -> tuple[int, int]:
+    """
+    Return running jobs whose worker stopped heartbeating to the queue.
+    Jobs that already used up JOB_MAX_ATTEMPTS are failed instead.
+
+    Returns (requeued, failed).
+    """
+    cutoff = _now() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    stale = (GenerationJob.status == JOB_RUNNING) & (
+        GenerationJob.heartbeat_at < cutoff
+    )
+
+    failed = db.execute(
+        update(GenerationJob)
+        .where(stale, GenerationJob.attempts >= settings.JOB_MAX_ATTEMPTS)
+        .values(
+            status=JOB_FAILED,
+            error="Worker stopped responding too many times.",
+            finished_at=_now(),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    requeued = db.execute(
+        update(GenerationJob)
+        .where(stale)
+        .values(status=JOB_QUEUED, worker_id=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.commit()
+    return requeued, failed
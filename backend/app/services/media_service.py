@@ -0,0 +1,335 @@
+"""
+Contains post-processing for media produced by ComfyUI.
+
+Purpose:
+- Stream generated outputs from ComfyUI into the backend media directory.
+- Rewrite MP4 files to fast-start layout (moov before mdat) so browsers can
+  start playback after fetching only the first few kilobytes.
+- Run the CPU/disk bound work in a worker pool, off the event loop.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+COMFY_URL = "http://host.docker.internal:8188"
+
+# Boxes on the path moov -> trak -> mdia -> minf -> stbl -> stco/co64.
+# Everything else inside moov is copied through untouched.
+_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+_UINT32_MAX = 0xFFFFFFFF
+
+_media_executor = ThreadPoolExecutor(
+    max_workers=settings.MEDIA_WORKERS, thread_name_prefix="media"
+)
+
+
+class Mp4FormatError(ValueError):
+    """Raised when a file cannot be parsed as an ISO base media file."""
+
+
+# ---------------------------------------------------------------------
+# Box parsing helpers
+# ---------------------------------------------------------------------
+def _read_top_level_boxes(f, file_size: int) -> list[tuple[bytes, int, int]]:
+    """Return (type, offset, size) for every top-level box in the file."""
+    boxes = []
+    offset = 0
+
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            raise Mp4FormatError("Truncated box header")
+
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+
+        if size < header_size or offset + size > file_size:
+            raise Mp4FormatError(f"Invalid size for box {box_type!r}")
+
+        boxes.append((box_type, offset, size))
+        offset += size
+
+    return boxes
+
+
+def _parse_boxes(data: bytes) -> list[tuple[bytes, bytes | list]]:
+    """Parse a run of boxes; container boxes are parsed recursively."""
+    boxes = []
+    offset = 0
+
+    while offset < len(data):
+        if offset + 8 > len(data):
+            raise Mp4FormatError("Truncated box header inside moov")
+
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = len(data) - offset
+
+        if size < header_size or offset + size > len(data):
+            raise Mp4FormatError(f"Invalid size for box {box_type!r}")
+
+        payload = data[offset + header_size : offset + size]
+        if box_type in _CONTAINER_BOXES:
+            boxes.append((box_type, _parse_boxes(payload)))
+        else:
+            boxes.append((box_type, payload))
+
+        offset += size
+
+    return boxes
+
+
+def _serialize_boxes(boxes: list[tuple[bytes, bytes | list]]) -> bytes:
+    out = []
+    for box_type, body in boxes:
+        payload = _serialize_boxes(body) if isinstance(body, list) else body
+        size = len(payload) + 8
+        if size > _UINT32_MAX:
+            out.append(struct.pack(">I4sQ", 1, box_type, size + 8))
+        else:
+            out.append(struct.pack(">I4s", size, box_type))
+        out.append(payload)
+
+    return b"".join(out)
+
+
+def _relocate_chunk_offsets(boxes, relocate, force_co64: bool):
+    """
+    Return a copy of the box tree with every stco/co64 entry passed through
+    relocate(). stco tables are upgraded to co64 when force_co64 is set.
+    """
+    patched = []
+    for box_type, body in boxes:
+        if isinstance(body, list):
+            patched.append(
+                (box_type, _relocate_chunk_offsets(body, relocate, force_co64))
+            )
+            continue
+
+        if box_type not in (b"stco", b"co64"):
+            patched.append((box_type, body))
+            continue
+
+        version_flags, count = struct.unpack_from(">4sI", body)
+        entry_format = ">%dI" if box_type == b"stco" else ">%dQ"
+        offsets = struct.unpack_from(entry_format % count, body, 8)
+        offsets = [relocate(offset) for offset in offsets]
+
+        if box_type == b"stco" and not force_co64:
+            if any(offset > _UINT32_MAX for offset in offsets):
+                raise OverflowError("Chunk offset no longer fits in stco")
+            patched.append(
+                (b"stco", version_flags + struct.pack(">I%dI" % count, count, *offsets))
+            )
+        else:
+            patched.append(
+                (b"co64", version_flags + struct.pack(">I%dQ" % count, count, *offsets))
+            )
+
+    return patched
+
+
+def _copy_range(src, dst, offset: int, length: int, chunk_size: int):
+    src.seek(offset)
+    while length > 0:
+        chunk = src.read(min(chunk_size, length))
+        if not chunk:
+            raise Mp4FormatError("Unexpected end of file while copying")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+# ---------------------------------------------------------------------
+# Fast-start remux
+# ---------------------------------------------------------------------
+def faststart_mp4(path: str | Path, chunk_size: int = 1024 * 1024) -> bool:
+    """
+    Rewrite an MP4 in place so that moov precedes the first mdat.
+
+    Only the moov box is held in memory; media data is streamed box by box
+    into a temporary file that atomically replaces the original.
+    Returns False when the file already has a fast-start layout.
+    """
+    path = Path(path)
+
+    with open(path, "rb") as src:
+        file_size = os.fstat(src.fileno()).st_size
+        boxes = _read_top_level_boxes(src, file_size)
+        types = [box_type for box_type, _, _ in boxes]
+
+        if b"moov" not in types:
+            raise Mp4FormatError("No moov box found")
+
+        moov_index = types.index(b"moov")
+        mdat_index = types.index(b"mdat") if b"mdat" in types else None
+        if mdat_index is None or moov_index < mdat_index:
+            return False
+
+        _, moov_offset, moov_size = boxes[moov_index]
+        src.seek(moov_offset)
+        moov_tree = _parse_boxes(src.read(moov_size))
+
+        layout = [box for box in boxes if box[0] != b"moov"]
+        layout.insert(mdat_index, boxes[moov_index])
+        old_starts = [offset for _, offset, _ in boxes]
+
+        force_co64 = False
+        while True:
+            # stco/co64 entries are fixed width, so the new moov size does
+            # not depend on the offset values themselves.
+            new_moov_size = len(
+                _serialize_boxes(
+                    _relocate_chunk_offsets(moov_tree, lambda o: 0, force_co64)
+                )
+            )
+
+            new_starts = {}
+            cursor = 0
+            for box_type, offset, size in layout:
+                new_starts[offset] = cursor
+                cursor += new_moov_size if box_type == b"moov" else size
+
+            def relocate(offset: int) -> int:
+                index = bisect.bisect_right(old_starts, offset) - 1
+                if index < 0:
+                    raise Mp4FormatError("Chunk offset points before first box")
+                box_start = old_starts[index]
+                return offset - box_start + new_starts[box_start]
+
+            try:
+                new_moov = _serialize_boxes(
+                    _relocate_chunk_offsets(moov_tree, relocate, force_co64)
+                )
+            except OverflowError:
+                force_co64 = True
+                continue
+
+            break
+
+        tmp_path = path.with_name(f".{path.name}.faststart")
+        try:
+            with open(tmp_path, "wb") as dst:
+                for box_type, offset, size in layout:
+                    if box_type == b"moov":
+                        dst.write(new_moov)
+                    else:
+                        _copy_range(src, dst, offset, size, chunk_size)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    return True
+
+
+# ---------------------------------------------------------------------
+# Download + post-process a ComfyUI output
+# ---------------------------------------------------------------------
+async def download_output(
+    session: "aiohttp.ClientSession",
+    filename: str,
+    dest: Path,
+    subfolder: str = "",
+    output_type: str = "output",
+):
+    """Stream a ComfyUI output file to dest without buffering it in memory."""
+    params = {"filename": filename, "subfolder": subfolder, "type": output_type}
+
+    async with session.get(f"{COMFY_URL}/view", params=params) as resp:
+        if resp.status != 200:
+            raise Exception(f"Failed to download {filename}: {resp.status}")
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(dest, "wb") as f:
+                async for chunk in resp.content.iter_chunked(
+                    settings.DOWNLOAD_CHUNK_BYTES
+                ):
+                    f.write(chunk)
+        except BaseException:
+            # Never leave a truncated file behind (failure or cancellation)
+            dest.unlink(missing_ok=True)
+            raise
+
+
+def media_path(
+    filename: str, subfolder: str | None = "", folder_type: str | None = "output"
+) -> Path:
+    """
+    Location under MEDIA_ROOT of a ComfyUI output file:
+    <folder_type>/<subfolder>/<filename>. ComfyUI's temp and output folders
+    may hold files with the same name, so the folder type is part of the
+    path; files stored before that (folder_type None) live at
+    <subfolder>/<filename>.
+    """
+    # Never let ComfyUI-provided names escape MEDIA_ROOT
+    parts = [
+        part
+        for part in PurePosixPath(folder_type or "", subfolder or "").parts
+        if part not in ("/", "..")
+    ]
+    return Path(settings.MEDIA_ROOT).joinpath(*parts, Path(filename).name)
+
+
+async def fetch_output(
+    session: "aiohttp.ClientSession",
+    filename: str,
+    subfolder: str = "",
+    output_type: str = "output",
+) -> Path:
+    """
+    Download an output into MEDIA_ROOT and, for MP4 files, remux it to
+    fast-start layout once in the media worker pool.
+    """
+    dest = media_path(filename, subfolder, output_type)
+
+    await download_output(session, filename, dest, subfolder, output_type)
+
+    if dest.suffix.lower() in (".mp4", ".m4v", ".mov"):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(_media_executor, faststart_mp4, dest)
+        except Mp4FormatError as e:
+            # The remux is an optimisation: the original file (left intact
+            # on failure) still plays, it just cannot start streaming early
+            logger.warning("Serving %s without fast-start remux: %s", dest, e)
+
+    return dest
+
+
+def media_url(path: Path) -> str:
+    """Public URL of a file stored under MEDIA_ROOT."""
+    relative = path.relative_to(settings.MEDIA_ROOT).as_posix()
+    return f"{settings.MEDIA_URL.rstrip('/')}/{relative}"
+
+
+async def run_in_media_pool(func, *args):
+    """Run a blocking media helper (e.g. metadata probing) in the worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_media_executor, func, *args)
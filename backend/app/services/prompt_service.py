@@ -0,0 +1,327 @@
+"""
+Contains storage and caching of deduplicated prompt texts.
+
+Purpose:
+- Intern prompt texts into the content-hashed `prompts` table, so each
+  distinct text is stored once and `videos` only holds two integer ids.
+- Serve reads from an in-process LRU cache of hot prompts (rows are
+  immutable, so cached entries never go stale). Ids interned by a
+  transaction are only shared once it commits.
+- Backfill existing `videos` rows in chunks and drop the legacy Text
+  columns once every row points at `prompts`.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import event, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.core.config import get_settings
+from app.models.prompt import Prompt
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+LEGACY_PROMPT_COLUMNS = ("positive_prompt", "negative_prompt")
+
+# Key in Connection.info holding prompts interned by the open transaction:
+# one {digest: (prompt_id, text)} frame per open savepoint level
+_PENDING_KEY = "interned_prompts"
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# id -> text (reads) and content hash -> id (writes)
+_texts = LRUCache(settings.PROMPT_CACHE_SIZE)
+_ids = LRUCache(settings.PROMPT_CACHE_SIZE)
+
+
+def clear_cache() -> None:
+    _texts.clear()
+    _ids.clear()
+
+
+def content_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------
+def intern_prompt(connection: Connection, prompt: str | None) -> int | None:
+    """
+    Return the id of the `prompts` row holding this text, inserting it if
+    needed. Runs on the flush connection (called from a Video
+    before_insert / before_update hook), so it joins the caller's
+    transaction.
+    """
+    if prompt is None:
+        return None
+
+    digest = content_hash(prompt)
+    prompt_id = _ids.get(digest)
+    if prompt_id is not None:
+        return prompt_id
+
+    frames = _pending(connection)
+    for frame in reversed(frames):
+        if digest in frame:
+            return frame[digest][0]
+
+    prompts = Prompt.__table__
+    lookup = select(prompts.c.id).where(prompts.c.content_hash == digest)
+
+    prompt_id = connection.scalar(lookup)
+    if prompt_id is None:
+        try:
+            with connection.begin_nested():
+                prompt_id = connection.execute(
+                    insert(prompts).values(
+                        content_hash=digest, text=prompt, created_at=datetime.now()
+                    )
+                ).inserted_primary_key[0]
+        except IntegrityError:
+            # Inserted concurrently by another transaction
+            prompt_id = connection.scalar(lookup)
+
+    # Other connections may not see the row yet (or ever, on rollback):
+    # it reaches the shared cache when this transaction commits
+    frames[-1][digest] = (prompt_id, prompt)
+
+    return prompt_id
+
+
+def _pending(conn: Connection) -> list[dict]:
+    return conn.info.setdefault(_PENDING_KEY, [{}])
+
+
+@event.listens_for(Engine, "savepoint")
+def _on_savepoint(conn, name):
+    _pending(conn).append({})
+
+
+@event.listens_for(Engine, "release_savepoint")
+def _on_release_savepoint(conn, name, context):
+    frames = _pending(conn)
+    if len(frames) > 1:
+        released = frames.pop()
+        frames[-1].update(released)
+
+
+@event.listens_for(Engine, "rollback_savepoint")
+def _on_rollback_savepoint(conn, name, context):
+    # Only what was interned inside the rolled back savepoint is lost
+    frames = _pending(conn)
+    if len(frames) > 1:
+        frames.pop()
+
+
+@event.listens_for(Engine, "commit")
+def _on_commit(conn):
+    for frame in conn.info.pop(_PENDING_KEY, ()):
+        for digest, (prompt_id, prompt) in frame.items():
+            _ids.put(digest, prompt_id)
+            _texts.put(prompt_id, prompt)
+
+
+@event.listens_for(Engine, "rollback")
+def _on_rollback(conn):
+    conn.info.pop(_PENDING_KEY, None)
+
+
+# ---------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------
+def prompt_text(db: Session | None, prompt_id: int | None) -> str | None:
+    """
+    Text of a prompt, from the LRU cache when hot. Videos read after their
+    session closed must be warmed with load_video_prompts() beforehand.
+    """
+    if prompt_id is None:
+        return None
+
+    cached = _texts.get(prompt_id)
+    if cached is not None:
+        return cached
+
+    if db is None:
+        # No hidden I/O behind an attribute access on a detached Video
+        raise DetachedInstanceError(
+            f"Prompt {prompt_id} is not cached and the Video has no session; "
+            "call load_video_prompts() while the session is open"
+        )
+
+    value = db.scalar(select(Prompt.text).where(Prompt.id == prompt_id))
+    if value is not None:
+        _texts.put(prompt_id, value)
+    return value
+
+
+def load_prompts(db: Session, prompt_ids: Iterable[int | None]) -> None:
+    """Warm the cache for many prompts with a single IN query (avoids N+1)."""
+    missing = {
+        prompt_id
+        for prompt_id in prompt_ids
+        if prompt_id is not None and _texts.get(prompt_id) is None
+    }
+    if not missing:
+        return
+
+    for prompt_id, value in db.execute(
+        select(Prompt.id, Prompt.text).where(Prompt.id.in_(missing))
+    ):
+        _texts.put(prompt_id, value)
+
+
+def load_video_prompts(db: Session, videos) -> None:
+    load_prompts(
+        db,
+        [video.positive_prompt_id for video in videos]
+        + [video.negative_prompt_id for video in videos],
+    )
+
+
+# ---------------------------------------------------------------------
+# Migration of the legacy Text columns
+# ---------------------------------------------------------------------
+def legacy_columns(engine: Engine) -> list[str]:
+    """Legacy prompt Text columns still present on `videos`."""
+    names = {column["name"] for column in inspect(engine).get_columns("videos")}
+    return [name for name in LEGACY_PROMPT_COLUMNS if name in names]
+
+
+def backfill_prompts(
+    engine: Engine, batch_size: int | None = None, pause: float = 0.0
+) -> int:
+    """
+    Point every legacy `videos` row at interned prompts, one committed
+    chunk at a time (short transactions, bounded lock time). Returns the
+    number of rows updated. Safe to re-run.
+    """
+    batch_size = batch_size or settings.PROMPT_BACKFILL_BATCH_SIZE
+    if legacy_columns(engine) != list(LEGACY_PROMPT_COLUMNS):
+        return 0
+
+    fetch = text(
+        "SELECT id, positive_prompt, negative_prompt FROM videos "
+        "WHERE id > :after AND ("
+        "(positive_prompt_id IS NULL AND positive_prompt IS NOT NULL) OR "
+        "(negative_prompt_id IS NULL AND negative_prompt IS NOT NULL)) "
+        "ORDER BY id LIMIT :limit"
+    )
+    assign = text(
+        "UPDATE videos SET positive_prompt_id = :positive_id, "
+        "negative_prompt_id = :negative_id WHERE id = :video_id"
+    )
+
+    updated = 0
+    after = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(fetch, {"after": after, "limit": batch_size}).all()
+            if not rows:
+                break
+
+            conn.execute(
+                assign,
+                [
+                    {
+                        "video_id": video_id,
+                        "positive_id": intern_prompt(conn, positive),
+                        "negative_id": intern_prompt(conn, negative),
+                    }
+                    for video_id, positive, negative in rows
+                ],
+            )
+
+        updated += len(rows)
+        after = rows[-1][0]
+        logger.info("Backfilled prompts for %d video(s) (up to id %d)", updated, after)
+
+        if pause:
+            time.sleep(pause)
+
+    return updated
+
+
+def drop_legacy_columns(engine: Engine) -> list[str]:
+    """
+    Drop videos.positive_prompt / negative_prompt (and their full-text
+    index) once every row has been backfilled. Returns the dropped names.
+    """
+    columns = legacy_columns(engine)
+    if not columns:
+        return []
+
+    pending = text(
+        "SELECT COUNT(*) FROM videos WHERE "
+        "(positive_prompt_id IS NULL AND positive_prompt IS NOT NULL) OR "
+        "(negative_prompt_id IS NULL AND negative_prompt IS NOT NULL)"
+    )
+
+    with engine.begin() as conn:
+        remaining = conn.scalar(pending)
+        if remaining:
+            raise RuntimeError(
+                f"{remaining} video(s) still need a prompt backfill; "
+                "run it before dropping the legacy columns."
+            )
+
+        if engine.dialect.name == "sqlite":
+            # The FTS5 triggers reference the columns being dropped
+            for trigger in ("videos_fts_ai", "videos_fts_ad", "videos_fts_au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text("DROP TABLE IF EXISTS videos_fts"))
+        elif engine.dialect.name == "mysql":
+            indexes = {index["name"] for index in inspect(conn).get_indexes("videos")}
+            if "ix_videos_prompts_fulltext" in indexes:
+                conn.execute(text("DROP INDEX ix_videos_prompts_fulltext ON videos"))
+
+        for column in columns:
+            conn.execute(text(f"ALTER TABLE videos DROP COLUMN {column}"))
+
+    if engine.dialect.name == "mysql":
+        # Rebuild so the space of the dropped blobs is actually returned
+        with engine.connect() as conn:
+            conn.execute(text("OPTIMIZE TABLE videos"))
+
+    return columns
@@ -0,0 +1,192 @@
+"""
+Estimates how long a new generation will take to complete.
+
+Purpose:
+- Track ComfyUI /queue depth (cached briefly to avoid hammering ComfyUI).
+- Keep rolling per-workflow execution-time statistics from finished jobs.
+- Predict the completion time of a new job so the API can reject work
+  that would only run into the generation deadline.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.video import Video
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+COMFY_URL = "http://host.docker.internal:8188"
+
+# Only one workflow exists today; keep the key explicit so presets can
+# get their own statistics later.
+DEFAULT_WORKFLOW = "api_test_workflow"
+
+
+@dataclass
+class QueueEstimate:
+    """Snapshot returned with every admission decision."""
+
+    workflow: str
+    queue_running: int
+    queue_pending: int
+    expected_execution_seconds: float
+    eta_seconds: float
+    samples: int
+
+
+class QueueEstimator:
+    """Rolling execution-time statistics plus a cached view of /queue."""
+
+    def __init__(
+        self,
+        window: int,
+        default_seconds: float,
+        depth_ttl: float,
+        refresh_interval: float,
+    ):
+        self._window = window
+        self._default_seconds = default_seconds
+        self._depth_ttl = depth_ttl
+        self._refresh_interval = refresh_interval
+        self._durations: dict[str, deque] = {}
+        self._refreshed_at: float | None = None
+
+        self._depth = (0, 0)
+        self._depth_fetched_at = 0.0
+        # asyncio locks belong to one event loop; created per running loop
+        self._depth_lock: asyncio.Lock | None = None
+        self._depth_lock_loop: asyncio.AbstractEventLoop | None = None
+
+    # -----------------------------------------------------------------
+    # Execution-time statistics
+    # -----------------------------------------------------------------
+    def record(self, workflow: str, seconds: float | None) -> None:
+        """Add the measured execution time of a finished job."""
+        if seconds is None or seconds <= 0:
+            return
+        self._durations.setdefault(workflow, deque(maxlen=self._window)).append(seconds)
+
+    def refresh(self, db: Session) -> None:
+        """
+        Reload the recent execution times of every workflow from the videos
+        table (rows without a workflow belong to the default one).
+
+        Generations finished by app.worker processes are only visible here
+        through the database, so the window is reloaded every
+        refresh_interval seconds rather than once per process.
+        """
+        now = time.monotonic()
+        if (
+            self._refreshed_at is not None
+            and now - self._refreshed_at < self._refresh_interval
+        ):
+            return
+        self._refreshed_at = now
+
+        workflows = set(db.scalars(select(Video.workflow).distinct()))
+        for workflow in {DEFAULT_WORKFLOW} | (workflows - {None}):
+            matches = Video.workflow == workflow
+            if workflow == DEFAULT_WORKFLOW:
+                matches = or_(matches, Video.workflow.is_(None))
+
+            recent = db.scalars(
+                select(Video.execution_time)
+                .where(matches, Video.execution_time.is_not(None))
+                .order_by(Video.id.desc())
+                .limit(self._window)
+            ).all()
+
+            durations = deque(maxlen=self._window)
+            durations.extend(seconds for seconds in reversed(recent) if seconds > 0)
+            self._durations[workflow] = durations
+
+    def expected_seconds(self, workflow: str) -> tuple[float, int]:
+        durations = self._durations.get(workflow)
+        if not durations:
+            return self._default_seconds, 0
+        return sum(durations) / len(durations), len(durations)
+
+    # -----------------------------------------------------------------
+    # Queue depth
+    # -----------------------------------------------------------------
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._depth_lock is None or self._depth_lock_loop is not loop:
+            self._depth_lock = asyncio.Lock()
+            self._depth_lock_loop = loop
+        return self._depth_lock
+
+    async def queue_depth(self) -> tuple[int, int]:
+        """Return (running, pending) from ComfyUI, cached for depth_ttl."""
+        if time.monotonic() - self._depth_fetched_at < self._depth_ttl:
+            return self._depth
+
+        async with self._lock():
+            # Another request may have refreshed while we waited
+            if time.monotonic() - self._depth_fetched_at < self._depth_ttl:
+                return self._depth
+
+            import aiohttp
+
+            try:
+                timeout = aiohttp.ClientTimeout(total=5)
+                async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with session.get(f"{COMFY_URL}/queue") as resp:
+                        resp.raise_for_status()
+                        data = await resp.json()
+
+                self._depth = (
+                    len(data.get("queue_running", [])),
+                    len(data.get("queue_pending", [])),
+                )
+            except Exception as e:
+                # Keep the last known depth; admission should not fail
+                # just because the queue could not be inspected.
+                logger.warning("Could not fetch ComfyUI queue: %s", e)
+
+            self._depth_fetched_at = time.monotonic()
+            return self._depth
+
+    # -----------------------------------------------------------------
+    # Prediction
+    # -----------------------------------------------------------------
+    async def estimate(
+        self, workflow: str = DEFAULT_WORKFLOW, extra_pending: int = 0
+    ) -> QueueEstimate:
+        """
+        Predict when a job submitted now would finish.
+
+        Running jobs are assumed half done on average; every pending job
+        (plus extra_pending jobs known to this backend but not yet sent to
+        ComfyUI) costs one expected execution.
+        """
+        running, pending = await self.queue_depth()
+        expected, samples = self.expected_seconds(workflow)
+
+        eta = (running * 0.5 + pending + extra_pending + 1) * expected
+
+        return QueueEstimate(
+            workflow=workflow,
+            queue_running=running,
+            queue_pending=pending + extra_pending,
+            expected_execution_seconds=round(expected, 3),
+            eta_seconds=round(eta, 3),
+            samples=samples,
+        )
+
+
+estimator = QueueEstimator(
+    window=settings.QUEUE_ESTIMATOR_WINDOW,
+    default_seconds=settings.QUEUE_DEFAULT_EXECUTION_SECONDS,
+    depth_ttl=settings.QUEUE_DEPTH_TTL_SECONDS,
+    refresh_interval=settings.QUEUE_ESTIMATOR_REFRESH_SECONDS,
+)
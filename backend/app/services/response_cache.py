@@ -0,0 +1,260 @@
+"""
+Contains conditional GET handling and an in-process response cache.
+
+Purpose:
+- Answer read endpoints with strong ETag / Last-Modified validators and
+  304 Not Modified when the client already holds the current version.
+- Keep pre-serialized JSON bodies in a byte-bounded LRU, so repeat reads
+  skip both the DB query and Pydantic serialization.
+- Invalidate entries when their row is updated or deleted (after the
+  commit); entries also expire after a TTL, which bounds staleness
+  caused by writes made in other processes.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Hashable
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import get_settings
+from app.models.user import User
+from app.models.video import Video
+from app.schemas.user import UserOut
+from app.schemas.video import VideoCreate
+
+settings = get_settings()
+
+# Key in Session.info holding cache keys to drop once the transaction commits
+_PENDING_KEY = "response_cache_invalidations"
+
+
+@dataclass
+class CachedResponse:
+    """Serialized body plus its validators."""
+
+    body: bytes
+    etag: str
+    last_modified: datetime | None
+    cache_control: str
+    expires_at: float | None = None
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+
+class ResponseCache:
+    """Thread-safe LRU bounded by the total size of the cached bodies."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._size = 0
+        # Bumped by every invalidation of a key; one int per changed row
+        self._generations: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def generation(self, key: Hashable) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def put(
+        self, key: Hashable, entry: CachedResponse, generation: int | None = None
+    ) -> None:
+        """
+        Store entry. With a generation (read before building the entry),
+        nothing is stored if key was invalidated since: the entry may have
+        been built from the row as it was before that write.
+        """
+        if len(entry.body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, 0):
+                return
+            self._remove(key)
+            self._data[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._data)))
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+            self._size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+# ---------------------------------------------------------------------
+# Conditional responses
+# ---------------------------------------------------------------------
+def _utc(value: datetime | None) -> datetime | None:
+    if value is None:
+        return None
+    # Naive values (MySQL DATETIME, SQLite) are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    """RFC 9110: If-None-Match wins; If-Modified-Since is the fallback."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or entry.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return entry.last_modified <= _utc(since)
+
+    return False
+
+
+def cached_response(
+    request: Request,
+    key: Hashable,
+    build: Callable[[], CachedResponse],
+    ttl: float | None,
+) -> Response:
+    """
+    Serve key from the cache, or build (query + serialize) and cache it;
+    answers 304 when the client's validators still match.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        generation = response_cache.generation(key)
+        entry = build()
+        if ttl is not None:
+            entry.expires_at = time.monotonic() + ttl
+        response_cache.put(key, entry, generation)
+
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=entry.headers)
+
+    return Response(
+        content=entry.body, media_type="application/json", headers=entry.headers
+    )
+
+
+# ---------------------------------------------------------------------
+# Representations
+# ---------------------------------------------------------------------
+def user_key(user_id: int) -> tuple:
+    return ("user", user_id)
+
+
+def video_key(video_id: int) -> tuple:
+    return ("video", video_id)
+
+
+def user_response(user: User) -> CachedResponse:
+    body = UserOut.model_validate(user).model_dump_json().encode()
+    changed = user.updated_at or user.created_at
+    version = changed.strftime("%Y%m%d%H%M%S") if changed is not None else "0"
+    # updated_at has whole seconds on MySQL; the digest keeps the tag strong
+    # when a user changes twice within one second
+    digest = hashlib.blake2b(body, digest_size=6).hexdigest()
+    return CachedResponse(
+        body=body,
+        etag=f'"user-{user.id}-{version}-{digest}"',
+        last_modified=_utc(changed),
+        cache_control="private, no-cache",
+    )
+
+
+def video_response(video: Video) -> CachedResponse:
+    body = VideoCreate.model_validate(video).model_dump_json().encode()
+    # Videos only change when retention evicts their media, which the
+    # digest picks up (there is no updated_at to version them by)
+    digest = hashlib.blake2b(body, digest_size=6).hexdigest()
+    return CachedResponse(
+        body=body,
+        etag=f'"video-{video.id}-{digest}"',
+        last_modified=_utc(video.created_at),
+        cache_control="no-cache",
+    )
+
+
+# ---------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------
+def invalidate_after_commit(session: Session, keys) -> None:
+    """
+    Drop keys once session commits. Bulk UPDATE/DELETE statements skip the
+    mapper events below, so their callers pass the affected keys here.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_after_commit(session, [user_key(target.id)])
+
+
+@event.listens_for(Video, "after_update")
+@event.listens_for(Video, "after_delete")
+def _video_changed(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_after_commit(session, [video_key(target.id)])
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session) -> None:
+    # After the commit, so the next build reads the new row. A build that
+    # was already running may have read the old one; bumping the key's
+    # generation keeps cached_response() from storing it.
+    for key in session.info.pop(_PENDING_KEY, ()):
+        response_cache.invalidate(key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_rollback(session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
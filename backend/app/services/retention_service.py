@@ -0,0 +1,370 @@
+"""
+Contains the retention job for old generations.
+
+Purpose:
+- Apply per-user retention policies (falling back to the RETENTION_*
+  defaults) to keep `videos`, its indexes and MEDIA_ROOT from growing
+  without bound.
+- Evict generated files of aged videos from MEDIA_ROOT and give the
+  bytes back in the usage counters.
+- Move aged rows to `videos_archive` in small batches, pausing between
+  batches and skipping locked rows so live traffic is not blocked.
+- Report what was (or, in a dry run, would be) reclaimed.
+"""
+
+import json
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import case, delete, insert, select, true, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.retention_policy import RetentionPolicy
+from app.models.user_usage import UserUsage
+from app.models.video import Video
+from app.models.video_archive import VideoArchive
+from app.models.video_artifact import VideoArtifact
+from app.models.video_trace import VideoTrace
+from app.services import prompt_service, response_cache
+from app.services.media_service import media_path
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+_ARCHIVED_ARTIFACT_FIELDS = (
+    "node_id",
+    "output_type",
+    "output_index",
+    "filename",
+    "subfolder",
+    "folder_type",
+    "format",
+    "source_url",
+    "size_bytes",
+    "width",
+    "height",
+    "fps",
+    "duration",
+)
+
+
+@dataclass
+class RetentionReport:
+    """What one retention run reclaimed (or would reclaim in a dry run)."""
+
+    dry_run: bool
+    videos_archived: int = 0
+    artifacts_evicted: int = 0
+    files_deleted: int = 0
+    files_missing: int = 0
+    bytes_reclaimed: int = 0
+    batches: int = 0
+    # Dry runs roll back, so archival would count evicted artifacts again
+    _seen: set = field(default_factory=set, repr=False)
+
+    def as_dict(self) -> dict:
+        return {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if not f.name.startswith("_")
+        }
+
+
+# ---------------------------------------------------------------------
+# Policies
+# ---------------------------------------------------------------------
+def _cohorts(db: Session, field: str, default_days: int | None):
+    """
+    Return (condition, cutoff) pairs: one per user with an override, plus
+    one for everybody else using the default. Each pair can use the
+    (user_id, created_at) / created_at indexes.
+    """
+    now = datetime.now()
+    overrides = db.execute(
+        select(RetentionPolicy.user_id, getattr(RetentionPolicy, field))
+    ).all()
+
+    cohorts = [
+        (Video.user_id == user_id, now - timedelta(days=days))
+        for user_id, days in overrides
+        if days is not None
+    ]
+
+    if default_days is not None:
+        overridden = [user_id for user_id, _ in overrides]
+        condition = Video.user_id.not_in(overridden) if overridden else true()
+        cohorts.append((condition, now - timedelta(days=default_days)))
+
+    return cohorts
+
+
+# ---------------------------------------------------------------------
+# Media eviction
+# ---------------------------------------------------------------------
+def _evict_files(db: Session, artifacts, report: RetentionReport) -> list[Path]:
+    """
+    Mark the given artifact rows evicted (clearing their URLs) and return
+    the files to delete once the batch has committed.
+
+    Files go last: a rolled back batch leaves every file in place, and a
+    crash after the commit leaves orphan files rather than rows pointing
+    at deleted media.
+    """
+    artifacts = [artifact for artifact in artifacts if artifact.id not in report._seen]
+    if not artifacts:
+        return []
+    if report.dry_run:
+        report._seen.update(artifact.id for artifact in artifacts)
+
+    files = []
+    released = defaultdict(int)
+    for artifact in artifacts:
+        path = media_path(artifact.filename, artifact.subfolder, artifact.folder_type)
+        if path.is_file():
+            report.bytes_reclaimed += path.stat().st_size
+            report.files_deleted += 1
+            files.append(path)
+        else:
+            report.files_missing += 1
+        released[artifact.user_id] += artifact.size_bytes or 0
+
+    report.artifacts_evicted += len(artifacts)
+    if report.dry_run:
+        return []
+
+    db.execute(
+        update(VideoArtifact)
+        .where(VideoArtifact.id.in_([artifact.id for artifact in artifacts]))
+        .values(evicted_at=datetime.now(), source_url=None, localpath=None)
+        .execution_options(synchronize_session=False)
+    )
+    # Clients see that the media is gone instead of 404s from /media
+    video_ids = {artifact.video_id for artifact in artifacts}
+    db.execute(
+        update(Video)
+        .where(Video.id.in_(video_ids))
+        .values(source_video=None, localpath=None)
+        .execution_options(synchronize_session=False)
+    )
+    response_cache.invalidate_after_commit(
+        db, [response_cache.video_key(video_id) for video_id in video_ids]
+    )
+
+    for user_id, size in released.items():
+        db.execute(
+            update(UserUsage)
+            .where(UserUsage.user_id == user_id)
+            .values(
+                bytes_stored=case(
+                    (UserUsage.bytes_stored > size, UserUsage.bytes_stored - size),
+                    else_=0,
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    return files
+
+
+def _artifact_rows(where):
+    return (
+        select(
+            VideoArtifact.id,
+            VideoArtifact.video_id,
+            VideoArtifact.filename,
+            VideoArtifact.subfolder,
+            VideoArtifact.folder_type,
+            VideoArtifact.size_bytes,
+            Video.user_id,
+        )
+        .join(Video, Video.id == VideoArtifact.video_id)
+        .where(VideoArtifact.evicted_at.is_(None), *where)
+        .order_by(VideoArtifact.id)
+    )
+
+
+def evict_media(
+    db: Session, report: RetentionReport, batch_size: int, pause: float
+) -> None:
+    """Evict files of videos past their evict_media_after_days."""
+    for condition, cutoff in _cohorts(
+        db, "evict_media_after_days", settings.RETENTION_EVICT_MEDIA_AFTER_DAYS
+    ):
+        after_id = 0
+        while True:
+            artifacts = db.execute(
+                _artifact_rows(
+                    [condition, Video.created_at < cutoff, VideoArtifact.id > after_id]
+                ).limit(batch_size)
+            ).all()
+            if not artifacts:
+                break
+
+            after_id = artifacts[-1].id
+            files = _evict_files(db, artifacts, report)
+            _end_batch(db, report, pause, files)
+
+
+# ---------------------------------------------------------------------
+# Archival
+# ---------------------------------------------------------------------
+def _archived_trace(trace) -> str | None:
+    if trace is None:
+        return None
+    return json.dumps(
+        {
+            "correlation_id": trace["correlation_id"],
+            "host": trace["host"],
+            "started_at": trace["started_at"].isoformat(),
+            "total_ms": trace["total_ms"],
+            # Already compact: {"v": ..., "spans": [...]}
+            **json.loads(trace["spans"]),
+        },
+        separators=(",", ":"),
+    )
+
+
+def _archive_row(video, artifacts, trace) -> dict:
+    row = {
+        column.name: video[column.name]
+        for column in VideoArchive.__table__.columns
+        if column.name in video
+    }
+    row["artifacts"] = json.dumps(
+        [
+            {field: artifact[field] for field in _ARCHIVED_ARTIFACT_FIELDS}
+            for artifact in artifacts
+        ],
+        separators=(",", ":"),
+    )
+    row["trace"] = _archived_trace(trace)
+    row["archived_at"] = datetime.now()
+    return row
+
+
+def archive_videos(
+    db: Session, report: RetentionReport, batch_size: int, pause: float
+) -> None:
+    """Move videos past their archive_after_days to `videos_archive`."""
+    cohorts = _cohorts(db, "archive_after_days", settings.RETENTION_ARCHIVE_AFTER_DAYS)
+    if cohorts and prompt_service.legacy_columns(db.get_bind()):
+        # Archived rows only keep prompt ids
+        raise RuntimeError(
+            "Legacy prompt columns are still present; run "
+            "`python -m app.cli migrate-prompts --drop-legacy` first."
+        )
+
+    for condition, cutoff in cohorts:
+        after_id = 0
+        while True:
+            stmt = (
+                select(*Video.__table__.columns)
+                .where(condition, Video.created_at < cutoff, Video.id > after_id)
+                .order_by(Video.id)
+                .limit(batch_size)
+            )
+            if not report.dry_run:
+                # Rows a live request holds are picked up by the next run
+                stmt = stmt.with_for_update(skip_locked=True)
+
+            videos = db.execute(stmt).mappings().all()
+            if not videos:
+                break
+
+            after_id = videos[-1]["id"]
+            video_ids = [video["id"] for video in videos]
+
+            # Archived videos never keep their files
+            files = _evict_files(
+                db,
+                db.execute(
+                    _artifact_rows([VideoArtifact.video_id.in_(video_ids)])
+                ).all(),
+                report,
+            )
+
+            artifacts = (
+                db.execute(
+                    select(*VideoArtifact.__table__.columns)
+                    .where(VideoArtifact.video_id.in_(video_ids))
+                    .order_by(VideoArtifact.id)
+                )
+                .mappings()
+                .all()
+            )
+
+            report.videos_archived += len(videos)
+            if not report.dry_run:
+                by_video = defaultdict(list)
+                for artifact in artifacts:
+                    by_video[artifact["video_id"]].append(artifact)
+                traces = {
+                    trace["video_id"]: trace
+                    for trace in db.execute(
+                        select(*VideoTrace.__table__.columns).where(
+                            VideoTrace.video_id.in_(video_ids)
+                        )
+                    ).mappings()
+                }
+
+                db.execute(
+                    insert(VideoArchive),
+                    [
+                        _archive_row(
+                            video, by_video[video["id"]], traces.get(video["id"])
+                        )
+                        for video in videos
+                    ],
+                )
+                for child in (VideoTrace, VideoArtifact):
+                    db.execute(delete(child).where(child.video_id.in_(video_ids)))
+                db.execute(delete(Video).where(Video.id.in_(video_ids)))
+                # The bulk delete bypasses the after_delete listener
+                response_cache.invalidate_after_commit(
+                    db, [response_cache.video_key(video_id) for video_id in video_ids]
+                )
+
+            _end_batch(db, report, pause, files)
+
+
+# ---------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------
+def _end_batch(
+    db: Session, report: RetentionReport, pause: float, files: list[Path] = ()
+) -> None:
+    if report.dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        # Only after the commit: rows never point at files already deleted
+        for path in files:
+            path.unlink(missing_ok=True)
+    report.batches += 1
+
+    if pause:
+        time.sleep(pause)
+
+
+def run_retention(
+    db: Session,
+    dry_run: bool = False,
+    batch_size: int | None = None,
+    pause: float | None = None,
+) -> RetentionReport:
+    """Evict aged media, then archive aged videos. Safe to re-run."""
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    pause = settings.RETENTION_BATCH_PAUSE_SECONDS if pause is None else pause
+
+    report = RetentionReport(dry_run=dry_run)
+    evict_media(db, report, batch_size, pause)
+    archive_videos(db, report, batch_size, pause)
+
+    logger.info(json.dumps({"event": "retention", **report.as_dict()}))
+    return report
@@ -0,0 +1,150 @@
+"""
+Contains full-text search over prompt history.
+
+Purpose:
+- Rank a user's videos by relevance of their prompts to a query.
+- Use the FULLTEXT index on `prompts` in production and SQLite FTS5 in tests,
+  so no query ever falls back to a LIKE '%...%' scan.
+- Paginate with a keyset cursor (score, id) instead of OFFSET.
+"""
+
+import base64
+import json
+import re
+from typing import Optional
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from app.models.prompt import PROMPTS_FTS_TABLE, Prompt
+from app.models.video import Video
+from app.services.prompt_service import load_video_prompts
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class SearchUnavailableError(RuntimeError):
+    """Raised when the database has no supported full-text index."""
+
+
+# ---------------------------------------------------------------------
+# Cursor helpers
+# ---------------------------------------------------------------------
+def encode_cursor(score: float, video_id: int) -> str:
+    raw = json.dumps([score, video_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        score, video_id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return float(score), int(video_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid search cursor") from exc
+
+
+# ---------------------------------------------------------------------
+# Query builders
+# ---------------------------------------------------------------------
+def _query_terms(query: str) -> list[str]:
+    return _TERM_RE.findall(query.lower())
+
+
+def _matching_prompts(db: Session, terms: list[str]):
+    """Subquery of (id, score) for every prompt matching the terms."""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        score = match(Prompt.text, against=" ".join(terms)).in_natural_language_mode()
+        return (
+            select(Prompt.id.label("id"), score.label("score"))
+            .where(score > 0)
+            .subquery()
+        )
+
+    if dialect == "sqlite":
+        fts_table = table(PROMPTS_FTS_TABLE, column("rowid"))
+        fts = literal_column(PROMPTS_FTS_TABLE)
+        # Quote every term so user input can't inject FTS5 query syntax
+        fts_query = " OR ".join(f'"{term}"' for term in terms)
+        return (
+            select(fts_table.c.rowid.label("id"), (-func.bm25(fts)).label("score"))
+            .where(fts.match(fts_query))
+            .subquery()
+        )
+
+    raise SearchUnavailableError(f"Full-text search is not supported on {dialect}")
+
+
+def _scored_matches(db: Session, user_id: int, terms: list[str]):
+    """
+    Subquery of (id, score) for the user's matching videos; higher is better.
+
+    Prompts are deduplicated, so each distinct text is matched once and a
+    video scores the sum of its positive and negative prompt scores.
+    """
+    prompts = _matching_prompts(db, terms)
+    positive = prompts.alias("positive_match")
+    negative = prompts.alias("negative_match")
+
+    score = func.coalesce(positive.c.score, 0) + func.coalesce(negative.c.score, 0)
+    return (
+        select(Video.id.label("id"), score.label("score"))
+        .outerjoin(positive, positive.c.id == Video.positive_prompt_id)
+        .outerjoin(negative, negative.c.id == Video.negative_prompt_id)
+        .where(
+            Video.user_id == user_id,
+            or_(positive.c.id.is_not(None), negative.c.id.is_not(None)),
+        )
+        .subquery()
+    )
+
+
+def search_videos(
+    db: Session,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> tuple[list[tuple[Video, float]], Optional[str]]:
+    """
+    Return one page of (video, score) ordered by relevance, plus the cursor
+    for the next page (None when exhausted).
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return [], None
+
+    scored = _scored_matches(db, user_id, terms)
+    stmt = (
+        select(Video, scored.c.score)
+        .join(scored, scored.c.id == Video.id)
+        .order_by(scored.c.score.desc(), Video.id.desc())
+        .limit(limit + 1)
+    )
+
+    if cursor is not None:
+        after_score, after_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                scored.c.score < after_score,
+                and_(scored.c.score == after_score, Video.id < after_id),
+            )
+        )
+
+    rows = [(video, float(score)) for video, score in db.execute(stmt).all()]
+    load_video_prompts(db, [video for video, _ in rows])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_video, last_score = rows[-1]
+        next_cursor = encode_cursor(last_score, last_video.id)
+
+    return rows, next_cursor
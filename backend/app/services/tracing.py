@@ -0,0 +1,327 @@
+"""
+Per-generation trace timelines.
+
+Purpose:
+- Record a span timeline for one generation: upload, submit, queue wait,
+  every ComfyUI node execution, download, metadata probing and DB save.
+- Carry a correlation id that is also sent to ComfyUI as `client_id`, so
+  ComfyUI logs and websocket events can be matched to the stored trace.
+- Listen to ComfyUI's `executing` websocket events for per-node timings,
+  falling back to the /history status messages when the websocket is
+  unreachable (e.g. Docker <-> ComfyUI Desktop on macOS).
+- Serialize to compact JSON for the `video_traces` table.
+"""
+
+import asyncio
+import json
+import logging
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+COMFY_URL = "http://host.docker.internal:8188"
+
+# Bumped whenever the stored span layout changes
+TRACE_FORMAT_VERSION = 1
+
+
+class GenerationTrace:
+    """
+    Span timeline of one generation.
+
+    Spans are stored as [name, start_ms, duration_ms, attrs] with start_ms
+    relative to the start of the trace, which keeps the JSON small.
+    """
+
+    def __init__(self, correlation_id: str | None = None):
+        self.correlation_id = correlation_id or uuid.uuid4().hex
+        self.host = socket.gethostname()
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: list[list] = []
+
+    def _offset_ms(self, perf_time: float) -> int:
+        return round((perf_time - self._t0) * 1000)
+
+    def add_span(self, name: str, start_ms: int, duration_ms: int, **attrs) -> None:
+        span = [name, start_ms, max(0, duration_ms)]
+        if attrs:
+            span.append(attrs)
+        self.spans.append(span)
+
+    def add_wall_span(self, name: str, start: float, end: float, **attrs) -> None:
+        """Add a span from wall-clock timestamps (seconds since the epoch)."""
+        start_ms = round((start - self.started_at) * 1000)
+        self.add_span(name, start_ms, round((end - start) * 1000), **attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            end = time.perf_counter()
+            self.add_span(
+                name, self._offset_ms(start), round((end - start) * 1000), **attrs
+            )
+
+    @property
+    def total_ms(self) -> int:
+        return max(
+            (start + duration for _, start, duration, *_ in self.spans), default=0
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"v": TRACE_FORMAT_VERSION, "spans": self.spans}, separators=(",", ":")
+        )
+
+
+def parse_spans(data: str) -> list[dict]:
+    """Expand stored compact spans into dicts (for API responses)."""
+    spans = json.loads(data).get("spans", [])
+    return [
+        {
+            "name": span[0],
+            "start_ms": span[1],
+            "duration_ms": span[2],
+            "attrs": span[3] if len(span) > 3 else {},
+        }
+        for span in spans
+    ]
+
+
+# ---------------------------------------------------------------------
+# Current trace (set per generation, read by the service steps)
+# ---------------------------------------------------------------------
+_current_trace: ContextVar[GenerationTrace | None] = ContextVar(
+    "generation_trace", default=None
+)
+
+
+def start_trace(correlation_id: str | None = None) -> GenerationTrace:
+    """Begin a trace for the generation running in the current context."""
+    trace = GenerationTrace(correlation_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> GenerationTrace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a span on the current trace; a no-op outside a generation."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+
+    with trace.span(name, **attrs) as span_attrs:
+        yield span_attrs
+
+
+# ---------------------------------------------------------------------
+# ComfyUI node timings
+# ---------------------------------------------------------------------
+class NodeEventListener:
+    """
+    Collects ComfyUI websocket events for one client_id.
+
+    Connects while the prompt is submitted, so the earliest events of a
+    prompt that starts at once may be missed; record_execution() then
+    falls back to /history. Timestamps are taken on arrival, in wall-clock
+    seconds.
+    """
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.execution_start: float | None = None
+        self.execution_end: float | None = None
+        self.cached_nodes: list[str] = []
+        # (node_id, start, end)
+        self.nodes: list[tuple[str, float, float]] = []
+
+        self._current: tuple[str, float] | None = None
+        self._session: "aiohttp.ClientSession | None" = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> bool:
+        """Open the websocket; returns False if ComfyUI is unreachable."""
+        import aiohttp
+
+        ws_url = COMFY_URL.replace("http", "ws", 1) + f"/ws?clientId={self.client_id}"
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None))
+        try:
+            ws = await self._session.ws_connect(
+                ws_url, timeout=settings.TRACE_WS_CONNECT_SECONDS, heartbeat=30
+            )
+        except Exception as e:
+            logger.info("ComfyUI websocket unavailable, using history: %s", e)
+            await self._session.close()
+            self._session = None
+            return False
+
+        self._task = asyncio.create_task(self._listen(ws))
+        return True
+
+    async def stop(self) -> None:
+        # Tracing is a side channel: it must never fail the generation
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.warning("ComfyUI websocket listener failed: %s", e)
+        if self._session is not None:
+            await self._session.close()
+
+    def _switch_node(self, node_id: str | None, now: float) -> None:
+        if self._current is not None:
+            current_id, started = self._current
+            self.nodes.append((current_id, started, now))
+        self._current = (node_id, now) if node_id is not None else None
+
+    async def _listen(self, ws) -> None:
+        import aiohttp
+
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue  # binary previews
+
+                try:
+                    self._handle_event(json.loads(message.data), time.time())
+                except Exception as e:
+                    logger.warning("Ignoring malformed ComfyUI event: %s", e)
+        except Exception as e:
+            logger.warning("ComfyUI websocket listener stopped: %s", e)
+
+    def _handle_event(self, event: dict, now: float) -> None:
+        data = event.get("data") or {}
+
+        if event.get("type") == "execution_start":
+            self.execution_start = now
+        elif event.get("type") == "execution_cached":
+            self.cached_nodes.extend(data.get("nodes") or [])
+        elif event.get("type") == "executing":
+            # node is None once the whole prompt finished
+            self._switch_node(data.get("node"), now)
+            if data.get("node") is None:
+                self.execution_end = now
+
+
+def _history_events(history_entry: dict) -> dict[str, dict]:
+    """Event name -> data of the /history status messages."""
+    events = {}
+    for message in history_entry.get("status", {}).get("messages", []):
+        if isinstance(message, (list, tuple)) and len(message) == 2:
+            event, data = message
+            if isinstance(data, dict):
+                events[event] = data
+    return events
+
+
+def _history_timestamps(events: dict[str, dict]) -> dict[str, float]:
+    """Event name -> wall-clock seconds (ComfyUI's clock)."""
+    return {
+        event: data["timestamp"] / 1000
+        for event, data in events.items()
+        if "timestamp" in data
+    }
+
+
+def _queued_at(history_entry: dict) -> float | None:
+    """When ComfyUI queued the prompt (its clock), if it stamps create_time."""
+    prompt = history_entry.get("prompt")
+    if isinstance(prompt, (list, tuple)) and len(prompt) > 3:
+        extra_data = prompt[3]
+        if isinstance(extra_data, dict) and "create_time" in extra_data:
+            return extra_data["create_time"] / 1000
+    return None
+
+
+def record_execution(
+    trace: GenerationTrace,
+    workflow: dict,
+    submitted_at: float | None,
+    history_entry: dict,
+    listener: NodeEventListener | None = None,
+    completed_at: float | None = None,
+) -> None:
+    """
+    Add queue wait, per-node and total execution spans to the trace.
+
+    Every duration is measured on one clock, so skew between the backend
+    and the ComfyUI host cannot distort it:
+    - websocket: from /prompt returning (submitted_at) to the arrival of
+      `execution_start`, both on the backend clock;
+    - /history: from ComfyUI's queue time to `execution_start`, both on
+      the ComfyUI clock (no queue_wait when ComfyUI does not stamp it).
+      These spans are placed on the timeline by aligning the end of the
+      execution with completed_at, when the backend saw the result.
+
+    Per-node timings only come from the websocket. Without it (or when it
+    connected too late), /history still tells which nodes were cached.
+    """
+    events = _history_events(history_entry)
+    seen_start = listener is not None and listener.execution_start is not None
+
+    if seen_start:
+        start = listener.execution_start
+        end = listener.execution_end or completed_at
+        if submitted_at is not None:
+            # Events may arrive before the /prompt response does
+            trace.add_wall_span("queue_wait", submitted_at, max(start, submitted_at))
+    else:
+        timestamps = _history_timestamps(events)
+        start = timestamps.get("execution_start")
+        end = timestamps.get("execution_success") or timestamps.get("execution_error")
+        queued = _queued_at(history_entry)
+
+        if start is not None:
+            anchor = end if end is not None else start
+            shift = completed_at - anchor if completed_at is not None else 0.0
+            start += shift
+            end = end + shift if end is not None else None
+            if queued is not None:
+                trace.add_wall_span("queue_wait", queued + shift, start)
+
+    if start is not None and end is not None:
+        trace.add_wall_span("execute", start, end)
+
+    if seen_start:
+        cached_nodes = listener.cached_nodes
+    else:
+        cached_nodes = events.get("execution_cached", {}).get("nodes") or []
+
+    cached_at = start if start is not None else submitted_at or trace.started_at
+    for node_id in cached_nodes:
+        class_type = workflow.get(node_id, {}).get("class_type")
+        trace.add_wall_span(
+            "node",
+            cached_at,
+            cached_at,
+            node=node_id,
+            type=class_type,
+            cached=True,
+        )
+
+    for node_id, node_start, node_end in listener.nodes if listener else ():
+        class_type = workflow.get(node_id, {}).get("class_type")
+        trace.add_wall_span("node", node_start, node_end, node=node_id, type=class_type)
@@ -0,0 +1,223 @@
+"""
+Contains business logic for per-user usage accounting.
+
+Purpose:
+- Increment usage counters atomically alongside each Video insert.
+- Answer quota checks with a single primary-key read.
+- Periodically reconcile counters against the source rows.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Numeric, cast, func, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.user_usage import UserUsage
+from app.models.video import Video
+from app.models.video_archive import VideoArchive
+from app.models.video_artifact import VideoArtifact
+
+settings = get_settings()
+
+
+# ---------------------------------------------------------------------
+# Incremental updates
+# ---------------------------------------------------------------------
+def record_video(
+    db: Session,
+    user_id: int,
+    output_seconds: float | None,
+    execution_seconds: float | None,
+    bytes_stored: int | None,
+) -> None:
+    """
+    Add one video to the user's counters inside the caller's transaction.
+
+    Uses relative UPDATEs (count = count + 1) so concurrent inserts for the
+    same user never lose increments. The caller is responsible for commit.
+    """
+    output_seconds = output_seconds or 0.0
+    execution_seconds = execution_seconds or 0.0
+    bytes_stored = bytes_stored or 0
+
+    increment = (
+        update(UserUsage)
+        .where(UserUsage.user_id == user_id)
+        .values(
+            video_count=UserUsage.video_count + 1,
+            output_seconds=UserUsage.output_seconds + output_seconds,
+            execution_seconds=UserUsage.execution_seconds + execution_seconds,
+            bytes_stored=UserUsage.bytes_stored + bytes_stored,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.execute(increment).rowcount:
+        return
+
+    # First video for this user: create the row, unless another
+    # transaction beat us to it, in which case increment theirs.
+    try:
+        with db.begin_nested():
+            db.add(
+                UserUsage(
+                    user_id=user_id,
+                    video_count=1,
+                    output_seconds=output_seconds,
+                    execution_seconds=execution_seconds,
+                    bytes_stored=bytes_stored,
+                )
+            )
+    except IntegrityError:
+        db.execute(increment)
+
+
+def get_usage(db: Session, user_id: int) -> Optional[UserUsage]:
+    """Retrieve the usage row of a user (None before the first video)."""
+    return db.get(UserUsage, user_id)
+
+
+# ---------------------------------------------------------------------
+# Quota checks
+# ---------------------------------------------------------------------
+def check_quota(db: Session, user_id: int) -> Optional[str]:
+    """Return a human readable reason when the user is over quota."""
+    if (
+        settings.MAX_VIDEOS_PER_USER is None
+        and settings.MAX_OUTPUT_SECONDS_PER_USER is None
+    ):
+        return None
+
+    usage = get_usage(db, user_id)
+    if usage is None:
+        return None
+
+    if (
+        settings.MAX_VIDEOS_PER_USER is not None
+        and usage.video_count >= settings.MAX_VIDEOS_PER_USER
+    ):
+        return f"Video quota of {settings.MAX_VIDEOS_PER_USER} reached."
+
+    if (
+        settings.MAX_OUTPUT_SECONDS_PER_USER is not None
+        and usage.output_seconds >= settings.MAX_OUTPUT_SECONDS_PER_USER
+    ):
+        return (
+            f"Output quota of {settings.MAX_OUTPUT_SECONDS_PER_USER} seconds reached."
+        )
+
+    return None
+
+
+# ---------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------
+_COUNTERS = ("video_count", "output_seconds", "execution_seconds", "bytes_stored")
+
+
+def _snapshot(db: Session, user_id: int | None) -> tuple[dict, dict]:
+    """
+    Totals from the source rows and the counters, read in one transaction.
+
+    A video and its counter increment commit together, so a consistent
+    snapshot (REPEATABLE READ, MySQL's default) sees both or neither.
+    """
+    sources = []
+    for table in (Video, VideoArchive):
+        source = select(
+            table.user_id,
+            table.id.label("video_id"),
+            table.duration,
+            table.execution_time,
+        )
+        if user_id is not None:
+            source = source.where(table.user_id == user_id)
+        sources.append(source)
+    all_videos = union_all(*sources).subquery()
+
+    video_totals = select(
+        all_videos.c.user_id,
+        func.count(all_videos.c.video_id),
+        # duration is stored as a string; DECIMAL casts work on MySQL and SQLite
+        func.coalesce(func.sum(cast(all_videos.c.duration, Numeric(12, 3))), 0),
+        func.coalesce(func.sum(all_videos.c.execution_time), 0),
+    ).group_by(all_videos.c.user_id)
+
+    byte_totals = (
+        select(Video.user_id, func.coalesce(func.sum(VideoArtifact.size_bytes), 0))
+        .join(VideoArtifact, VideoArtifact.video_id == Video.id)
+        .where(VideoArtifact.evicted_at.is_(None))
+        .group_by(Video.user_id)
+    )
+
+    counters = select(
+        UserUsage.user_id, *(getattr(UserUsage, name) for name in _COUNTERS)
+    )
+
+    if user_id is not None:
+        byte_totals = byte_totals.where(Video.user_id == user_id)
+        counters = counters.where(UserUsage.user_id == user_id)
+
+    bytes_by_user = dict(db.execute(byte_totals).all())
+    totals = {
+        uid: (
+            count,
+            float(output_seconds),
+            float(execution_seconds),
+            int(bytes_by_user.get(uid, 0)),
+        )
+        for uid, count, output_seconds, execution_seconds in db.execute(video_totals)
+    }
+    current = {uid: tuple(values) for uid, *values in db.execute(counters)}
+    return totals, current
+
+
+def reconcile_usage(db: Session, user_id: int | None = None) -> int:
+    """
+    Recompute counters from `videos` / `video_archive` / `video_artifacts`.
+    Archived videos still count towards the quotas, but evicted files no
+    longer count as stored bytes. Returns the number of users reconciled.
+
+    The correction is applied as a delta (count = count + drift), so
+    record_video increments committed after the snapshot are kept.
+    """
+    totals, current = _snapshot(db, user_id)
+    now = datetime.now(tz=timezone.utc)
+    zeros = (0, 0.0, 0.0, 0)
+
+    # Users whose videos are all gone keep a row, reset to zero
+    for uid in totals.keys() | current.keys():
+        target = totals.get(uid, zeros)
+        before = current.get(uid)
+
+        if before is None:
+            try:
+                with db.begin_nested():
+                    db.add(
+                        UserUsage(
+                            user_id=uid,
+                            **dict(zip(_COUNTERS, target)),
+                            reconciled_at=now,
+                        )
+                    )
+                continue
+            except IntegrityError:
+                # The user's first video created the row meanwhile
+                before = zeros
+
+        drift = {
+            name: getattr(UserUsage, name) + (value - old)
+            for name, value, old in zip(_COUNTERS, target, before)
+        }
+        db.execute(
+            update(UserUsage)
+            .where(UserUsage.user_id == uid)
+            .values(**drift, reconciled_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+    return len(totals.keys() | current.keys())
@@ -1,15 +1,53 @@
-import cv2
 import json
-import requests
-import tempfile
 import os
 import asyncio
-import aiohttp
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 
 from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.core import lifecycle
+from app.core.config import get_settings
+from app.models.video import Video
+from app.models.video_artifact import VideoArtifact
+from app.models.video_trace import VideoTrace
+from app.services import tracing, usage_service
+from app.services.media_service import (
+    fetch_output,
+    media_path,
+    media_url,
+    run_in_media_pool,
+)
+from app.services.prompt_service import load_video_prompts
+from app.services.workflow_validator import (
+    WorkflowValidationError,
+    ensure_valid_workflow,
+)
+
+settings = get_settings()
 
 COMFY_URL = "http://host.docker.internal:8188"
 
+WORKFLOW_PATH = "/app/app/public/api_test_workflow.json"
+
+# Node ids inside api_test_workflow.json
+SAMPLER_NODE_ID = "1338"
+
+# Decoding and resizing release the GIL inside OpenCV, so a small thread
+# pool keeps large uploads off the event loop without extra processes.
+_image_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS, thread_name_prefix="image-ingest"
+)
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an uploaded image exceeds MAX_UPLOAD_BYTES."""
+
 
 # -----------------------------------------------------------
 # Load workflow JSON
@@ -20,19 +58,91 @@ def load_workflow(path: str):
 
 
 # -----------------------------------------------------------
-# Upload image to ComfyUI
+# Read the workflow's sampler resolution
 # -----------------------------------------------------------
-def upload_image_to_comfy(image: UploadFile):
-    if not image:
+def get_workflow_target_size(workflow: dict) -> tuple[int, int] | None:
+    inputs = workflow.get(SAMPLER_NODE_ID, {}).get("inputs", {})
+    width, height = inputs.get("width"), inputs.get("height")
+
+    if not isinstance(width, int) or not isinstance(height, int):
         return None
 
-    img_bytes = image.file.read()
+    return width, height
+
+
+# -----------------------------------------------------------
+# Stream an upload into memory, enforcing the size limit
+# -----------------------------------------------------------
+async def read_upload_limited(image: UploadFile, max_bytes: int) -> bytes:
+    # Reject early when the multipart parser already knows the size
+    if image.size is not None and image.size > max_bytes:
+        raise ImageTooLargeError(f"Image exceeds the {max_bytes} byte upload limit")
+
+    chunks = []
+    total = 0
+
+    while True:
+        chunk = await image.read(settings.UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+
+        total += len(chunk)
+        if total > max_bytes:
+            raise ImageTooLargeError(f"Image exceeds the {max_bytes} byte upload limit")
+
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+# -----------------------------------------------------------
+# Decode + downscale an image to the sampler resolution
+# -----------------------------------------------------------
+def downscale_image(data: bytes, width: int, height: int) -> bytes | None:
+    """
+    Shrink the image so it still covers width x height (the sampler
+    center-crops afterwards) and re-encode it as JPEG.
+    Returns None when the original bytes should be forwarded as-is.
+    """
+    # OpenCV / numpy are only imported once an image is actually processed
+    import cv2
+    import numpy as np
+
+    # IMREAD_COLOR also applies the EXIF orientation of phone photos
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+
+    src_height, src_width = img.shape[:2]
+    scale = max(width / src_width, height / src_height)
+
+    if scale < 1:
+        size = (
+            max(1, round(src_width * scale)),
+            max(1, round(src_height * scale)),
+        )
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    ok, encoded = cv2.imencode(
+        ".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, settings.UPLOAD_JPEG_QUALITY]
+    )
+    if not ok or encoded.nbytes >= len(data):
+        return None
+
+    return encoded.tobytes()
+
+
+# -----------------------------------------------------------
+# Upload image to ComfyUI
+# -----------------------------------------------------------
+def upload_image_to_comfy(filename: str, img_bytes: bytes, content_type: str):
+    import requests
 
     files = {
         "image": (
-            image.filename,
+            filename,
             img_bytes,
-            image.content_type or "image/png",
+            content_type,
         )
     }
 
@@ -40,6 +150,35 @@ def upload_image_to_comfy(image: UploadFile):
     return res.json()["name"]
 
 
+# -----------------------------------------------------------
+# Ingest an uploaded image: bounded read, downscale, upload
+# -----------------------------------------------------------
+async def ingest_image(image: UploadFile, target_size: tuple[int, int] | None):
+    data = await read_upload_limited(image, settings.MAX_UPLOAD_BYTES)
+    if not data:
+        return None
+
+    filename = image.filename or "upload.png"
+    content_type = image.content_type or "image/png"
+
+    loop = asyncio.get_running_loop()
+
+    if target_size is not None:
+        with tracing.span("downscale", bytes=len(data)):
+            compact = await loop.run_in_executor(
+                _image_executor, downscale_image, data, *target_size
+            )
+        if compact is not None:
+            data = compact
+            filename = f"{Path(filename).stem}.jpg"
+            content_type = "image/jpeg"
+
+    with tracing.span("upload", bytes=len(data)):
+        return await loop.run_in_executor(
+            None, upload_image_to_comfy, filename, data, content_type
+        )
+
+
 # -----------------------------------------------------------
 # Inject dynamic params (image_name is a STRING)
 # -----------------------------------------------------------
@@ -59,9 +198,15 @@ def inject_workflow_params(
 # -----------------------------------------------------------
 # Send workflow to ComfyUI
 # -----------------------------------------------------------
-def submit_workflow(workflow: dict):
+def submit_workflow(workflow: dict, client_id: str | None = None):
+    import requests
+
     payload = {"prompt": workflow}
-    res = requests.post(f"{COMFY_URL}/prompt", json=payload)
+    if client_id:
+        # Ties ComfyUI logs / websocket events to our trace
+        payload["client_id"] = client_id
+
+    res = requests.post(f"{COMFY_URL}/prompt", json=payload, timeout=30)
     res.raise_for_status()
 
     return res.json()["prompt_id"]
@@ -72,13 +217,18 @@ def submit_workflow(workflow: dict):
 # -----------------------------------------------------------
 
 
-async def wait_for_comfy_result(prompt_id: str, timeout: int = 900):
+async def wait_for_comfy_result(
+    prompt_id: str, timeout: int = settings.GENERATION_DEADLINE_SECONDS
+):
     """
     Poll ComfyUI /history/{prompt_id} until output is ready.
+    Returns the full history entry (outputs + status).
     Works in Docker + ComfyUI Desktop.
     Replaces WebSocket (which cannot cross macOS <-> Docker boundary).
     """
 
+    import aiohttp
+
     start = asyncio.get_event_loop().time()
 
     async with aiohttp.ClientSession() as session:
@@ -99,7 +249,7 @@ async def wait_for_comfy_result(prompt_id: str, timeout: int = 900):
                             and "outputs" in data[prompt_id]
                             and data[prompt_id]["outputs"]
                         ):
-                            return data[prompt_id]["outputs"]
+                            return data[prompt_id]
 
             except Exception as e:
                 print(f"[wait_for_comfy_result] Error: {e}")
@@ -109,31 +259,38 @@ async def wait_for_comfy_result(prompt_id: str, timeout: int = 900):
 
 
 # -----------------------------------------------------------
-# Extract metadata from ComfyUI output video
+# Measured execution time from the history status messages
 # -----------------------------------------------------------
+def get_execution_seconds(history_entry: dict) -> float | None:
+    timestamps = {}
+    for message in history_entry.get("status", {}).get("messages", []):
+        if isinstance(message, (list, tuple)) and len(message) == 2:
+            event, data = message
+            if isinstance(data, dict) and "timestamp" in data:
+                timestamps[event] = data["timestamp"]
+
+    start = timestamps.get("execution_start")
+    end = timestamps.get("execution_success")
+    if start is None or end is None:
+        return None
 
+    # ComfyUI timestamps are in milliseconds
+    return max(0.0, (end - start) / 1000)
 
-def extract_video_metadata(filename: str | None):
-    """
-    1. Download video from ComfyUI output endpoint
-    2. Save temporarily
-    3. Extract duration, width, height, fps
-    """
-    try:
-        # --- 1. Download video bytes from ComfyUI ---
-        url = f"http://host.docker.internal:8188/view?filename={filename}&type=output"
 
-        resp = requests.get(url)
+# -----------------------------------------------------------
+# Extract metadata from ComfyUI output video
+# -----------------------------------------------------------
 
-        if resp.status_code != 200:
-            raise Exception(f"Failed to download video: {resp.status_code}")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-            tmp.write(resp.content)
-            tmp_path = tmp.name
+def extract_video_metadata(path: str | os.PathLike):
+    """
+    Extract duration, width, height, fps from a local video file.
+    """
+    import cv2
 
-        # --- 2. Extract metadata using OpenCV ---
-        cap = cv2.VideoCapture(tmp_path)
+    try:
+        cap = cv2.VideoCapture(str(path))
 
         if not cap.isOpened():
             raise Exception("OpenCV failed to open video")
@@ -142,6 +299,7 @@ def extract_video_metadata(filename: str | None):
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = cap.get(cv2.CAP_PROP_FPS)
         frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        cap.release()
 
         duration = frames / fps if (fps > 0 and frames > 0) else None
 
@@ -158,33 +316,216 @@ def extract_video_metadata(filename: str | None):
     except Exception as e:
         raise Exception(f"OpenCV metadata extraction failed: {str(e)}")
 
-    finally:
-        if "tmp_path" in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+
+# -----------------------------------------------------------
+# Enumerate every file produced by the workflow
+# -----------------------------------------------------------
+def _node_sort_key(node_id: str):
+    return (0, int(node_id), "") if node_id.isdigit() else (1, 0, node_id)
+
+
+def extract_video_outputs(result_json):
+    """
+    Flatten ComfyUI's {node_id: {output_type: [file, ...]}} mapping into a
+    list of files, ordered by node id and position (not dict order).
+    """
+    outputs = []
+
+    for node_id in sorted(result_json, key=_node_sort_key):
+        node_output = result_json[node_id] or {}
+
+        for output_type in sorted(node_output):
+            files = node_output[output_type]
+            if not isinstance(files, list):
+                continue
+
+            for index, file_info in enumerate(files):
+                if not isinstance(file_info, dict) or not file_info.get("filename"):
+                    continue
+
+                outputs.append(
+                    {
+                        "node_id": str(node_id),
+                        "output_type": output_type,
+                        "index": index,
+                        "filename": file_info["filename"],
+                        "subfolder": file_info.get("subfolder", ""),
+                        "type": file_info.get("type", "output"),
+                        "localpath": file_info.get("fullpath"),
+                        "format": file_info.get("format"),
+                    }
+                )
+
+    return outputs
+
+
+def is_video_output(output: dict) -> bool:
+    fmt = output.get("format") or ""
+    return fmt.startswith("video/") or output["output_type"] in ("gifs", "videos")
 
 
 # extract video output
 def extract_video_output(result_json):
-    # 1. Get the first key ("1336")
-    key = list(result_json.keys())[0]
-
-    # 2. Access the gifs list
-    gifs = result_json[key].get("gifs", [])
+    """Return the primary (first video) output of the workflow."""
+    videos = [o for o in extract_video_outputs(result_json) if is_video_output(o)]
 
-    if not gifs:
+    if not videos:
         raise ValueError("No GIF/MP4 outputs found in ComfyUI response")
 
-    file_info = gifs[0]
+    return videos[0]
+
+
+# -----------------------------------------------------------
+# Download + probe all outputs with bounded parallelism
+# -----------------------------------------------------------
+async def collect_outputs(outputs: list[dict]) -> list[dict]:
+    """
+    Download and probe every output. If one fails (or the generation is
+    cancelled), the other downloads are cancelled and every file written
+    here is removed, so no file is left without an artifact row.
+    """
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(settings.OUTPUT_FETCH_CONCURRENCY)
+    downloads: dict[Path, asyncio.Task] = {}
+
+    async def download(session, output: dict) -> Path:
+        async with semaphore:
+            with tracing.span("download", file=output["filename"]) as attrs:
+                path = await fetch_output(
+                    session,
+                    output["filename"],
+                    subfolder=output["subfolder"],
+                    output_type=output["type"],
+                )
+                attrs["bytes"] = path.stat().st_size
+        return path
+
+    async def collect(group, session, output: dict) -> dict:
+        # Several nodes may report the same file: fetch it once
+        dest = media_path(output["filename"], output["subfolder"], output["type"])
+        if dest not in downloads:
+            downloads[dest] = group.create_task(download(session, output))
+        path = await downloads[dest]
+
+        metadata = {}
+        if is_video_output(output):
+            with tracing.span("metadata", file=output["filename"]):
+                metadata = await run_in_media_pool(extract_video_metadata, path)
+
+        return {
+            **output,
+            "source_url": media_url(path),
+            "size_bytes": path.stat().st_size,
+            "metadata": metadata,
+        }
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(collect(group, session, output))
+                    for output in outputs
+                ]
+    except BaseException as e:
+        for dest in downloads:
+            dest.unlink(missing_ok=True)
+        if isinstance(e, ExceptionGroup):
+            raise e.exceptions[0]
+        raise
+
+    return [task.result() for task in tasks]
+
+
+# -----------------------------------------------------------
+# Generation steps (shared by the API and app.worker)
+# -----------------------------------------------------------
+async def prepare_workflow(positive_prompt, negative_prompt):
+    """Load the workflow, inject prompts and validate it locally."""
+    workflow = load_workflow(WORKFLOW_PATH)
+
+    workflow = inject_workflow_params(
+        workflow,
+        positive_prompt=positive_prompt,
+        negative_prompt=negative_prompt,
+        image_name=None,
+    )
+    with tracing.span("validate"):
+        await ensure_valid_workflow(workflow)
+
+    return workflow
+
+
+async def execute_workflow(workflow: dict, prompt_id=None, on_submitted=None):
+    """
+    Submit the workflow (unless resuming an already submitted prompt_id),
+    wait for the result and collect every output. on_submitted may block:
+    it runs in the default executor, like the submission itself.
+    """
+    trace = tracing.current_trace()
+    loop = asyncio.get_running_loop()
+
+    # Per-node timings: connect while submitting, so an unreachable
+    # websocket never delays the generation
+    listener = connecting = None
+    if trace is not None and prompt_id is None and settings.TRACE_NODE_EVENTS:
+        listener = tracing.NodeEventListener(trace.correlation_id)
+        connecting = asyncio.ensure_future(listener.start())
+
+    submitted_at = None
+    try:
+        if prompt_id is None:
+            with tracing.span("submit"):
+                prompt_id = await loop.run_in_executor(
+                    None,
+                    submit_workflow,
+                    workflow,
+                    trace.correlation_id if trace else None,
+                )
+            # Backend clock; queue wait ends at the execution_start event
+            submitted_at = time.time()
+            if on_submitted is not None:
+                await loop.run_in_executor(None, on_submitted, prompt_id)
+            lifecycle.update_checkpoint(lifecycle.STAGE_SUBMITTED, prompt_id=prompt_id)
+
+        # Wait for final output
+        history = await wait_for_comfy_result(prompt_id)
+        completed_at = time.time()
+        lifecycle.update_checkpoint(lifecycle.STAGE_DOWNLOADING)
+    finally:
+        if connecting is not None:
+            connecting.cancel()
+            await asyncio.gather(connecting, return_exceptions=True)
+            await listener.stop()
+
+    if trace is not None:
+        tracing.record_execution(
+            trace, workflow, submitted_at, history, listener, completed_at
+        )
+
+    result = history["outputs"]
 
-    # 3. Extract fields
-    filename = file_info.get("filename")
-    fullpath = file_info.get("fullpath")
-    format = file_info.get("format")
+    primary = extract_video_output(result_json=result)
+
+    # Download, remux and probe every output in one parallel round
+    artifacts = await collect_outputs(extract_video_outputs(result))
+    primary = next(
+        a
+        for a in artifacts
+        if a["node_id"] == primary["node_id"]
+        and a["output_type"] == primary["output_type"]
+        and a["index"] == primary["index"]
+    )
 
     return {
-        "filename": filename,
-        "localpath": fullpath,
-        "format": format,
+        "prompt_id": prompt_id,
+        "filename": primary["filename"],
+        "format": primary["format"],
+        "localpath": primary["localpath"],
+        "metadata": primary["metadata"],
+        "source_video": primary["source_url"],
+        "artifacts": artifacts,
+        "execution_seconds": get_execution_seconds(history),
     }
 
 
@@ -193,45 +534,135 @@ def extract_video_output(result_json):
 # -----------------------------------------------------------
 async def generate_video_flow(positive_prompt, negative_prompt, image):
     try:
-        # Upload input image
-        input_image = upload_image_to_comfy(image) if image else None
-
-        # Load workflow file
-        workflow = load_workflow("/app/app/public/api_test_workflow.json")
+        # Prompts are injected and validated before any upload or GPU work
+        workflow = await prepare_workflow(positive_prompt, negative_prompt)
+
+        # Upload input image, downscaled to the sampler resolution
+        input_image = (
+            await ingest_image(image, get_workflow_target_size(workflow))
+            if image
+            else None
+        )
 
-        # Inject prompts + image
+        # Inject image
         workflow = inject_workflow_params(
             workflow,
             positive_prompt=positive_prompt,
             negative_prompt=negative_prompt,
             image_name=input_image,
         )
+        # From here on a draining replica can hand the generation off
+        lifecycle.update_checkpoint(lifecycle.STAGE_READY, input_image=input_image)
 
-        # Trigger comfyUI
-        prompt_id = submit_workflow(workflow)
+        # Submit, wait and collect outputs
+        result = await execute_workflow(workflow)
 
-        # Wait for final output
-        result = await wait_for_comfy_result(prompt_id)
+        return {**result, "input_image": input_image}
+
+    except (ImageTooLargeError, WorkflowValidationError):
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Video generation flow failed: {str(e)}")
+
+
+# -----------------------------------------------------------
+# Persist a finished generation
+# -----------------------------------------------------------
+def save_video(
+    db: Session,
+    user_id: int,
+    positive_prompt,
+    negative_prompt,
+    result,
+    trace: tracing.GenerationTrace | None = None,
+    workflow: str | None = None,
+):
+    """
+    Store the Video, one VideoArtifact per output, the usage counters and
+    the generation trace in a single transaction.
+    """
+    metadata = result.get("metadata", {})
+
+    new_video = Video(
+        user_id=user_id,
+        # output
+        filename=result.get("filename"),
+        format=result.get("format"),
+        localpath=result.get("localpath"),
+        source_video=result.get("source_video"),
+        # input
+        input_image=result.get("input_image"),
+        positive_prompt=positive_prompt,
+        negative_prompt=negative_prompt,
+        # metadata
+        duration=metadata.get("duration"),
+        resolution=metadata.get("resolution"),
+        width=metadata.get("width"),
+        height=metadata.get("height"),
+        fps=metadata.get("fps"),
+        execution_time=result.get("execution_seconds"),
+        workflow=workflow,
+        # created_at
+        created_at=datetime.now(),
+        # every output file, keyed by node id + type
+        artifacts=[
+            VideoArtifact(
+                node_id=artifact["node_id"],
+                output_type=artifact["output_type"],
+                output_index=artifact["index"],
+                filename=artifact["filename"],
+                subfolder=artifact["subfolder"],
+                folder_type=artifact["type"],
+                format=artifact["format"],
+                localpath=artifact["localpath"],
+                source_url=artifact["source_url"],
+                size_bytes=artifact["size_bytes"],
+                width=artifact["metadata"].get("width"),
+                height=artifact["metadata"].get("height"),
+                fps=artifact["metadata"].get("fps"),
+                duration=artifact["metadata"].get("duration"),
+            )
+            for artifact in result.get("artifacts", [])
+        ],
+    )
+
+    with tracing.span("db.save"):
+        db.add(new_video)
+
+        # Update usage counters in the same transaction
+        usage_service.record_video(
+            db,
+            user_id,
+            output_seconds=metadata.get("duration"),
+            execution_seconds=result.get("execution_seconds"),
+            bytes_stored=sum(a["size_bytes"] or 0 for a in result.get("artifacts", [])),
+        )
+        db.flush()
+
+    if trace is not None:
+        new_video.trace = VideoTrace(
+            correlation_id=trace.correlation_id,
+            host=trace.host,
+            started_at=datetime.fromtimestamp(trace.started_at),
+            total_ms=trace.total_ms,
+            spans=trace.to_json(),
+        )
 
-        result_json = extract_video_output(result_json=result)
+    db.commit()
+    db.refresh(new_video)
 
-        filename = result_json.get("filename")
-        localpath = result_json.get("localpath")
-        format = result_json.get("format")
-        source_video = f"http://localhost:8188/view?filename={filename}"
+    return new_video
 
-        # Extract ffprobe metadata
-        metadata = extract_video_metadata(filename)
 
-        return {
-            "prompt_id": prompt_id,
-            "input_image": input_image,
-            "filename": filename,
-            "format": format,
-            "localpath": localpath,
-            "metadata": metadata,
-            "source_video": source_video,
-        }
+def get_video(db: Session, video_id: int) -> Video | None:
+    """Load a video together with its artifacts and prompts (no lazy loads)."""
+    video = db.scalars(
+        select(Video).options(selectinload(Video.artifacts)).where(Video.id == video_id)
+    ).first()
+    if video is not None:
+        load_video_prompts(db, [video])
+    return video
 
-    except Exception as e:
-        raise RuntimeError(f"Video generation flow failed: {str(e)}")
+
+def get_video_trace(db: Session, video_id: int) -> VideoTrace | None:
+    return db.get(VideoTrace, video_id)
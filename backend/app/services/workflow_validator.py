@@ -0,0 +1,248 @@
+"""
+Validates instantiated workflows against ComfyUI's node schemas.
+
+Purpose:
+- Fetch and cache /object_info, refreshing it when the ComfyUI version
+  changes (checked via /system_stats) or the cache gets old.
+- Check every node locally before /prompt: known class types, required
+  inputs, link targets and output types, numeric ranges and enum values
+  such as sampler_name or checkpoint names.
+- Reject invalid workflows without spending a round trip or a queue slot.
+"""
+
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+COMFY_URL = "http://host.docker.internal:8188"
+
+# Seconds a schema must be cached before a failed validation triggers
+# one forced refresh (new models / custom nodes added without restart).
+_REFRESH_ON_FAILURE_AFTER = 10.0
+
+
+class WorkflowValidationError(ValueError):
+    """Raised when a workflow does not match the ComfyUI node schemas."""
+
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+# ---------------------------------------------------------------------
+# Pure validation
+# ---------------------------------------------------------------------
+def _is_link(value) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) == 2
+        and isinstance(value[0], str)
+        and isinstance(value[1], int)
+    )
+
+
+def _types_compatible(output_type: str, input_type: str) -> bool:
+    if output_type == "*" or input_type == "*":
+        return True
+    return bool(set(output_type.split(",")) & set(input_type.split(",")))
+
+
+def _combo_options(spec_type, config: dict) -> list | None:
+    if isinstance(spec_type, list):
+        return spec_type
+    if spec_type == "COMBO":
+        return config.get("options", [])
+    return None
+
+
+def _check_literal(where: str, spec_type, config: dict, value) -> str | None:
+    options = _combo_options(spec_type, config)
+    if options is not None:
+        # Upload pickers (LoadImage) list files that change with every
+        # upload, so membership cannot be checked against a cached schema.
+        if config.get("image_upload") or config.get("upload"):
+            return None
+        if value not in options:
+            return f"{where}: {value!r} is not one of the allowed values"
+        return None
+
+    if spec_type == "INT":
+        if not isinstance(value, int) or isinstance(value, bool):
+            return f"{where}: expected INT, got {type(value).__name__}"
+    elif spec_type == "FLOAT":
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return f"{where}: expected FLOAT, got {type(value).__name__}"
+    elif spec_type == "STRING":
+        if not isinstance(value, str):
+            return f"{where}: expected STRING, got {type(value).__name__}"
+        return None
+    elif spec_type == "BOOLEAN":
+        if not isinstance(value, bool):
+            return f"{where}: expected BOOLEAN, got {type(value).__name__}"
+        return None
+    else:
+        return f"{where}: expects a link of type {spec_type}"
+
+    if "min" in config and value < config["min"]:
+        return f"{where}: {value} is below the minimum {config['min']}"
+    if "max" in config and value > config["max"]:
+        return f"{where}: {value} is above the maximum {config['max']}"
+    return None
+
+
+def validate_workflow(workflow: dict, object_info: dict) -> list[str]:
+    """Return a list of human readable errors (empty when valid)."""
+    errors = []
+
+    for node_id, node in workflow.items():
+        class_type = node.get("class_type")
+        schema = object_info.get(class_type)
+        if schema is None:
+            errors.append(f"node {node_id}: unknown node class {class_type!r}")
+            continue
+
+        inputs = node.get("inputs", {})
+        declared = schema.get("input", {})
+        required = declared.get("required", {})
+        optional = declared.get("optional", {})
+
+        for name in required:
+            if name not in inputs:
+                errors.append(f"node {node_id} ({class_type}): missing input {name!r}")
+
+        for name, value in inputs.items():
+            spec = required.get(name) or optional.get(name)
+            if spec is None:
+                continue  # ComfyUI ignores undeclared inputs
+
+            spec_type = spec[0]
+            config = spec[1] if len(spec) > 1 and isinstance(spec[1], dict) else {}
+            where = f"node {node_id} ({class_type}).{name}"
+
+            if not _is_link(value):
+                error = _check_literal(where, spec_type, config, value)
+                if error:
+                    errors.append(error)
+                continue
+
+            source_id, output_index = value
+            source = workflow.get(source_id)
+            if source is None:
+                errors.append(f"{where}: links to missing node {source_id}")
+                continue
+
+            source_schema = object_info.get(source.get("class_type"))
+            if source_schema is None:
+                continue  # already reported as an unknown class
+
+            outputs = source_schema.get("output", [])
+            if not 0 <= output_index < len(outputs):
+                errors.append(
+                    f"{where}: node {source_id} has no output #{output_index}"
+                )
+                continue
+
+            input_type = "COMBO" if isinstance(spec_type, list) else spec_type
+            output_type = outputs[output_index]
+            if isinstance(output_type, list):
+                output_type = "COMBO"
+            if not _types_compatible(output_type, input_type):
+                errors.append(
+                    f"{where}: expects {input_type}, "
+                    f"but node {source_id} output #{output_index} is {output_type}"
+                )
+
+    return errors
+
+
+# ---------------------------------------------------------------------
+# Schema cache
+# ---------------------------------------------------------------------
+class NodeSchemaCache:
+    """In-process cache of /object_info keyed by the ComfyUI version."""
+
+    def __init__(self, version_check_interval: float, max_age: float):
+        self._version_check_interval = version_check_interval
+        self._max_age = max_age
+        self._schema: dict | None = None
+        self._version: str | None = None
+        self._fetched_at = 0.0
+        self._version_checked_at = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    async def _fetch_json(self, session: "aiohttp.ClientSession", path: str):
+        async with session.get(f"{COMFY_URL}{path}") as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    async def get(self, force: bool = False) -> dict | None:
+        """Return the cached schema, refreshing it when stale or outdated."""
+        now = time.monotonic()
+        if (
+            not force
+            and self._schema is not None
+            and now - self._version_checked_at < self._version_check_interval
+            and now - self._fetched_at < self._max_age
+        ):
+            return self._schema
+
+        import aiohttp
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=30)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                stats = await self._fetch_json(session, "/system_stats")
+                version = stats.get("system", {}).get("comfyui_version")
+                self._version_checked_at = time.monotonic()
+
+                if (
+                    force
+                    or self._schema is None
+                    or version != self._version
+                    or self.age >= self._max_age
+                ):
+                    self._schema = await self._fetch_json(session, "/object_info")
+                    self._version = version
+                    self._fetched_at = time.monotonic()
+        except Exception as e:
+            # Fall back to the last known schema (or skip validation)
+            logger.warning("Could not refresh ComfyUI node schemas: %s", e)
+
+        return self._schema
+
+
+schema_cache = NodeSchemaCache(
+    version_check_interval=settings.COMFY_SCHEMA_VERSION_CHECK_SECONDS,
+    max_age=settings.COMFY_SCHEMA_MAX_AGE_SECONDS,
+)
+
+
+async def ensure_valid_workflow(workflow: dict) -> None:
+    """Raise WorkflowValidationError before the workflow reaches ComfyUI."""
+    if not settings.WORKFLOW_VALIDATION:
+        return
+
+    schema = await schema_cache.get()
+    if schema is None:
+        return
+
+    errors = validate_workflow(workflow, schema)
+    if errors and schema_cache.age > _REFRESH_ON_FAILURE_AFTER:
+        # The server may have gained models or nodes since the last fetch
+        schema = await schema_cache.get(force=True)
+        errors = validate_workflow(workflow, schema)
+
+    if errors:
+        raise WorkflowValidationError(errors)
@@ -0,0 +1,243 @@
+"""
+Out-of-process generation worker.
+
+Usage:
+    python -m app.worker [--concurrency N] [--worker-id ID]
+
+Claims queued rows from `generation_jobs` (SELECT ... FOR UPDATE SKIP
+LOCKED), runs the generation steps against ComfyUI and writes the Video
+back. Any number of workers can run against the same database, so API
+replicas and orchestration capacity scale independently.
+
+All jobs share one event loop, so every blocking DB call runs in a thread
+(asyncio.to_thread, which keeps the trace context): a slow round trip
+must not stall the other jobs' polling or the heartbeat.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from app.core.config import get_settings
+from app.db.base import init_models
+from app.db.session import SessionLocal
+from app.models.generation_job import GenerationJob
+from app.services import idempotency_service, job_service, tracing
+from app.services.video_service import (
+    execute_workflow,
+    inject_workflow_params,
+    prepare_workflow,
+    save_video,
+)
+
+settings = get_settings()
+
+logger = logging.getLogger("app.worker")
+
+
+class Worker:
+    """Claims jobs up to `concurrency` and keeps their heartbeats alive."""
+
+    def __init__(self, worker_id: str, concurrency: int):
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._stopping = False
+        # Set when a slot frees up or on stop, to skip the poll sleep
+        self._wakeup = asyncio.Event()
+
+    def stop(self) -> None:
+        """
+        Stop claiming. Running jobs get SHUTDOWN_DRAIN_SECONDS to finish;
+        the rest go back to the queue for another worker to resume.
+        """
+        if not self._stopping:
+            logger.info(
+                "Worker %s draining %d job(s)", self.worker_id, len(self._tasks)
+            )
+            self._stopping = True
+            self._wakeup.set()
+
+    def _job_done(self, job_id: int) -> None:
+        self._tasks.pop(job_id)
+        self._wakeup.set()
+
+    # -----------------------------------------------------------------
+    # Main loop
+    # -----------------------------------------------------------------
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+
+        maintenance = asyncio.create_task(self._maintenance())
+        logger.info(
+            "Worker %s started (concurrency=%d)", self.worker_id, self.concurrency
+        )
+
+        try:
+            while not self._stopping:
+                job_id = None
+                if len(self._tasks) < self.concurrency:
+                    job_id = await asyncio.to_thread(self._claim)
+
+                if job_id is not None:
+                    task = asyncio.create_task(self._run_job(job_id))
+                    self._tasks[job_id] = task
+                    task.add_done_callback(lambda _, j=job_id: self._job_done(j))
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=settings.WORKER_POLL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+            if self._tasks:
+                await self._drain()
+        finally:
+            maintenance.cancel()
+
+        logger.info("Worker %s stopped", self.worker_id)
+
+    async def _drain(self) -> None:
+        _, pending = await asyncio.wait(
+            self._tasks.values(), timeout=settings.SHUTDOWN_DRAIN_SECONDS
+        )
+        if not pending:
+            return
+
+        # Copy: done callbacks remove finished jobs from self._tasks
+        job_ids = list(self._tasks)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        released = await asyncio.to_thread(self._release, job_ids)
+        logger.warning("Handed %d unfinished job(s) back to the queue", released)
+
+    def _release(self, job_ids: list[int]) -> int:
+        db = SessionLocal()
+        try:
+            return job_service.release_jobs(db, job_ids, self.worker_id)
+        finally:
+            db.close()
+
+    def _claim(self) -> int | None:
+        db = SessionLocal()
+        try:
+            job = job_service.claim_next_job(db, self.worker_id)
+            return job.id if job else None
+        except Exception:
+            logger.exception("Could not claim a job")
+            return None
+        finally:
+            db.close()
+
+    async def _maintenance(self) -> None:
+        """
+        Heartbeat own jobs, requeue jobs of dead workers and expire old
+        Idempotency-Keys.
+        """
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            # Snapshot on the loop: done callbacks mutate self._tasks
+            await asyncio.to_thread(self._maintain, list(self._tasks))
+
+    def _maintain(self, job_ids: list[int]) -> None:
+        db = SessionLocal()
+        try:
+            job_service.heartbeat(db, job_ids, self.worker_id)
+            requeued, failed = job_service.requeue_stale_jobs(db)
+            if requeued or failed:
+                logger.warning(
+                    "Recovered stale jobs: %d requeued, %d failed", requeued, failed
+                )
+            idempotency_service.purge_expired_keys(db)
+        except Exception:
+            logger.exception("Job maintenance failed")
+        finally:
+            db.close()
+
+    # -----------------------------------------------------------------
+    # One job
+    # -----------------------------------------------------------------
+    async def _run_job(self, job_id: int) -> None:
+        # One session per job, used by one thread at a time. Attributes are
+        # read on the loop, so a commit must not expire them (no refresh I/O)
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            job = await asyncio.to_thread(db.get, GenerationJob, job_id)
+            trace = tracing.start_trace()
+            logger.info(
+                "Job %d: attempt %d (correlation id %s)",
+                job.id,
+                job.attempts,
+                trace.correlation_id,
+            )
+
+            try:
+                workflow = await prepare_workflow(
+                    job.positive_prompt, job.negative_prompt
+                )
+                workflow = inject_workflow_params(
+                    workflow,
+                    positive_prompt=job.positive_prompt,
+                    negative_prompt=job.negative_prompt,
+                    image_name=job.input_image,
+                )
+
+                # A job taken over from a dead worker resumes its prompt
+                result = await execute_workflow(
+                    workflow,
+                    prompt_id=job.prompt_id,
+                    on_submitted=lambda prompt_id: job_service.mark_submitted(
+                        db, job, prompt_id
+                    ),
+                )
+                if result["filename"] is None:
+                    raise RuntimeError("Model did not return any video file.")
+
+                video = await asyncio.to_thread(
+                    save_video,
+                    db,
+                    job.user_id,
+                    job.positive_prompt,
+                    job.negative_prompt,
+                    {**result, "input_image": job.input_image},
+                    trace=trace,
+                    workflow=job.workflow,
+                )
+            except Exception as e:
+                await asyncio.to_thread(db.rollback)
+                logger.exception("Job %d failed", job.id)
+                await asyncio.to_thread(job_service.fail_job, db, job, str(e))
+                return
+
+            await asyncio.to_thread(job_service.complete_job, db, job, video.id)
+            logger.info("Job %d: stored video %d", job.id, video.id)
+        finally:
+            await asyncio.to_thread(db.close)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.worker")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+
+    init_models()
+    asyncio.run(Worker(args.worker_id, args.concurrency).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Runs the micro-benchmark suite against the recorded baselines.
+
+Usage (from backend/):
+    python -m benchmarks [-k SUBSTRING] [--repeat N] [--tolerance 0.3]
+    python -m benchmarks --update     # re-record baselines.json
+
+Exits with status 1 when a benchmark is slower than its baseline by more
+than the tolerance (baselines.json "tolerance", optionally overridden per
+benchmark, or --tolerance for the whole run). Baselines are machine
+specific: record them on the hardware the comparison runs on.
+"""
+
+import argparse
+import os
+import sys
+
+# Same placeholders as tests/conftest.py; nothing connects to MySQL
+_OFFLINE_ENV = {
+    "MYSQL_USER": "bench",
+    "MYSQL_PASSWORD": "bench",
+    "MYSQL_DATABASE": "bench",
+    "MYSQL_HOST": "localhost",
+    "MYSQL_PORT": "3306",
+    "SECRET_KEY": "bench-secret-key",
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-k", dest="match", default=None, help="Only run matching")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="Allowed slowdown as a fraction (0.3 = 30%%) for every benchmark",
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Record the results as baselines"
+    )
+    args = parser.parse_args(argv)
+
+    for key, value in _OFFLINE_ENV.items():
+        os.environ.setdefault(key, value)
+
+    from benchmarks import harness, suite  # noqa: F401 - registers benchmarks
+
+    results = {}
+    for name, setup in harness.BENCHMARKS.items():
+        if args.match and args.match not in name:
+            continue
+        results[name] = harness.measure(setup(), args.repeat)
+
+    if not results:
+        parser.error("no benchmark matched")
+
+    baselines = harness.load_baselines()
+    comparisons = harness.compare(results, baselines, tolerance=args.tolerance)
+
+    # Re-measure apparent regressions once, so a noisy moment does not fail
+    # the run; the faster of both measurements counts
+    retry = [c.name for c in comparisons if c.status == "SLOWER"]
+    if retry and not args.update:
+        for name in retry:
+            again = harness.measure(harness.BENCHMARKS[name](), args.repeat)
+            results[name] = min(results[name], again)
+        comparisons = harness.compare(results, baselines, tolerance=args.tolerance)
+
+    print(harness.format_report(comparisons))
+
+    if args.update:
+        harness.save_baselines(results)
+        print(f"\nRecorded {len(results)} baseline(s) in {harness.BASELINES_PATH}.")
+        return 0
+
+    slower = [c for c in comparisons if c.status == "SLOWER"]
+    if slower:
+        print(
+            f"\n{len(slower)} benchmark(s) regressed beyond tolerance: "
+            + ", ".join(c.name for c in slower)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Timing and baseline comparison for the micro-benchmark suite.
+
+Purpose:
+- Register benchmarks: a setup function returning the callable to time.
+- Time each callable with timeit (auto-ranged loops, best of N repeats).
+- Compare against the recorded baselines and flag slowdowns beyond the
+  configured tolerance.
+"""
+
+import json
+import timeit
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+DEFAULT_TOLERANCE = 0.5
+
+# name -> setup function returning the callable to time
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function under name."""
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Microseconds per call: best of `repeat` auto-ranged runs."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+# ---------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------
+@dataclass
+class Comparison:
+    name: str
+    current_us: float
+    baseline_us: float | None
+    tolerance: float
+
+    @property
+    def change(self) -> float | None:
+        if not self.baseline_us:
+            return None
+        return self.current_us / self.baseline_us - 1
+
+    @property
+    def status(self) -> str:
+        if self.change is None:
+            return "new"
+        return "SLOWER" if self.change > self.tolerance else "ok"
+
+
+def load_baselines(path: Path = BASELINES_PATH) -> dict:
+    if not path.exists():
+        return {"tolerance": DEFAULT_TOLERANCE, "benchmarks": {}}
+    return json.loads(path.read_text())
+
+
+def save_baselines(results: dict[str, float], path: Path = BASELINES_PATH) -> None:
+    """Record results, keeping the global and per-benchmark tolerances."""
+    baselines = load_baselines(path)
+    entries = baselines.setdefault("benchmarks", {})
+    for name, current_us in results.items():
+        entries.setdefault(name, {})["us_per_op"] = round(current_us, 3)
+
+    baselines["benchmarks"] = dict(sorted(entries.items()))
+    path.write_text(json.dumps(baselines, indent=2) + "\n")
+
+
+def compare(
+    results: dict[str, float], baselines: dict, tolerance: float | None = None
+) -> list[Comparison]:
+    """
+    Compare results with baselines. An explicit tolerance overrides both
+    the file-wide and the per-benchmark ones.
+    """
+    default = baselines.get("tolerance", DEFAULT_TOLERANCE)
+    entries = baselines.get("benchmarks", {})
+
+    comparisons = []
+    for name, current_us in results.items():
+        entry = entries.get(name, {})
+        comparisons.append(
+            Comparison(
+                name=name,
+                current_us=current_us,
+                baseline_us=entry.get("us_per_op"),
+                tolerance=(
+                    tolerance
+                    if tolerance is not None
+                    else entry.get("tolerance", default)
+                ),
+            )
+        )
+    return comparisons
+
+
+def format_report(comparisons: list[Comparison]) -> str:
+    width = max(len(c.name) for c in comparisons)
+    lines = [
+        f"{'benchmark':<{width}}  {'baseline':>12}  {'current':>12}  "
+        f"{'change':>8}  {'allowed':>8}  status"
+    ]
+    for c in comparisons:
+        baseline = f"{c.baseline_us:.2f} us" if c.baseline_us else "-"
+        change = f"{c.change:+.1%}" if c.change is not None else "-"
+        lines.append(
+            f"{c.name:<{width}}  {baseline:>12}  {c.current_us:>9.2f} us  "
+            f"{change:>8}  {c.tolerance:>+8.0%}  {c.status}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,95 @@
+"""
+Startup-time benchmark for the API process.
+
+Purpose:
+- Measure, in fresh interpreters, how long `import app.main` takes and
+  how long until the lifespan startup finished (the app is ready).
+- Report heavy modules (OpenCV, numpy, aiohttp, ...) that ended up on
+  the import path, since those should only load on first use.
+
+Usage (from backend/, with the usual environment variables set):
+    python -m benchmarks.startup [--runs N] [--no-db]
+
+--no-db sets DB_AUTO_MIGRATE=false, so the ready time is measured
+without a reachable database.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("cv2", "numpy", "aiohttp", "requests", "passlib")
+
+# Runs in the child interpreter; prints one JSON line
+_PROBE = f"""
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+
+ready = asyncio.run(startup())
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "ready_ms": (ready - start) * 1000,
+    "heavy_modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(runs: int, no_db: bool) -> dict:
+    env = dict(os.environ)
+    if no_db:
+        env["DB_AUTO_MIGRATE"] = "false"
+
+    samples = [probe(env) for _ in range(runs)]
+
+    report = {"runs": runs, "db": not no_db}
+    for key in ("import_ms", "ready_ms"):
+        values = [sample[key] for sample in samples]
+        report[key] = {
+            "median": round(statistics.median(values), 1),
+            "min": round(min(values), 1),
+            "max": round(max(values), 1),
+        }
+    report["heavy_modules"] = samples[-1]["heavy_modules"]
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--no-db", action="store_true", help="Skip the schema step at startup"
+    )
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run(args.runs, args.no_db), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Micro-benchmarks of the backend hot helpers.
+
+Everything runs offline: no ComfyUI, no MySQL (SQLite in memory), and
+the sample MP4s are rendered with OpenCV into a temporary directory.
+"""
+
+import copy
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.security import create_access_token, decode_access_token
+from app.db.base import Base, init_models
+from app.schemas.video import VideoCreate
+from app.services.video_service import (
+    extract_video_metadata,
+    extract_video_output,
+    get_video,
+    inject_workflow_params,
+    load_workflow,
+)
+from benchmarks.harness import benchmark
+
+WORKFLOW_PATH = (
+    Path(__file__).resolve().parent.parent / "app/public/api_test_workflow.json"
+)
+
+POSITIVE = "a red fox running through fresh snow, cinematic lighting, 4k"
+NEGATIVE = "blurry, low quality, watermark, text, deformed"
+
+# Shaped like ComfyUI /history outputs: previews first, video last
+HISTORY_OUTPUTS = {
+    "1340": {
+        "images": [
+            {"filename": f"preview_{i:05d}.png", "subfolder": "", "type": "temp"}
+            for i in range(8)
+        ]
+    },
+    "1348": {
+        "gifs": [
+            {
+                "filename": "AnimateDiff_00001.mp4",
+                "subfolder": "",
+                "type": "output",
+                "format": "video/h264-mp4",
+                "fullpath": "/comfy/output/AnimateDiff_00001.mp4",
+            }
+        ]
+    },
+    "98": {"text": ["not a file"]},
+}
+
+VIDEO_PAYLOAD = {
+    "id": 1,
+    "user_id": 1,
+    "positive_prompt": POSITIVE,
+    "negative_prompt": NEGATIVE,
+    "duration": 2.0,
+    "resolution": "448x448",
+    "width": 448,
+    "height": 448,
+    "fps": 24.0,
+    "filename": "AnimateDiff_00001.mp4",
+    "format": "video/h264-mp4",
+    "source_video": "/media/AnimateDiff_00001.mp4",
+    "created_at": datetime(2024, 1, 1, 12, 0, 0),
+    "artifacts": [
+        {
+            "id": i,
+            "node_id": "1348",
+            "output_type": "gifs",
+            "output_index": i,
+            "filename": f"AnimateDiff_{i:05d}.mp4",
+            "format": "video/h264-mp4",
+            "source_url": f"/media/AnimateDiff_{i:05d}.mp4",
+            "size_bytes": 1_048_576,
+            "width": 448,
+            "height": 448,
+            "fps": 24.0,
+            "duration": 2.0,
+        }
+        for i in range(3)
+    ],
+}
+
+
+# ---------------------------------------------------------------------
+# Tokens
+# ---------------------------------------------------------------------
+@benchmark("security.create_access_token")
+def bench_create_token():
+    return lambda: create_access_token(42)
+
+
+@benchmark("security.decode_access_token")
+def bench_decode_token():
+    token = create_access_token(42, expires_delta=timedelta(days=1))
+    return lambda: decode_access_token(token)
+
+
+# ---------------------------------------------------------------------
+# Workflows and ComfyUI results
+# ---------------------------------------------------------------------
+@benchmark("workflow.load_and_inject")
+def bench_load_and_inject():
+    return lambda: inject_workflow_params(
+        load_workflow(WORKFLOW_PATH), NEGATIVE, POSITIVE, "upload.jpg"
+    )
+
+
+@benchmark("workflow.copy_and_inject")
+def bench_copy_and_inject():
+    template = load_workflow(WORKFLOW_PATH)
+    return lambda: inject_workflow_params(
+        copy.deepcopy(template), NEGATIVE, POSITIVE, "upload.jpg"
+    )
+
+
+@benchmark("video.extract_video_output")
+def bench_extract_video_output():
+    return lambda: extract_video_output(HISTORY_OUTPUTS)
+
+
+# ---------------------------------------------------------------------
+# Metadata of generated MP4s
+# ---------------------------------------------------------------------
+_samples = tempfile.TemporaryDirectory(prefix="bench-media-")
+
+
+def _sample_mp4(name: str, size: int, frames: int) -> Path:
+    import cv2
+    import numpy as np
+
+    path = Path(_samples.name) / name
+    if not path.exists():
+        writer = cv2.VideoWriter(
+            str(path), cv2.VideoWriter_fourcc(*"mp4v"), 24, (size, size)
+        )
+        for i in range(frames):
+            writer.write(np.full((size, size, 3), i % 256, dtype=np.uint8))
+        writer.release()
+    return path
+
+
+@benchmark("video.extract_metadata_64px")
+def bench_metadata_small():
+    path = _sample_mp4("small.mp4", 64, 24)
+    return lambda: extract_video_metadata(path)
+
+
+@benchmark("video.extract_metadata_448px")
+def bench_metadata_sampler_size():
+    path = _sample_mp4("sampler.mp4", 448, 48)
+    return lambda: extract_video_metadata(path)
+
+
+# ---------------------------------------------------------------------
+# Schemas
+# ---------------------------------------------------------------------
+@benchmark("schemas.video_create_json")
+def bench_video_create_json():
+    return lambda: VideoCreate.model_validate(VIDEO_PAYLOAD).model_dump_json()
+
+
+# ---------------------------------------------------------------------
+# ORM on SQLite
+# ---------------------------------------------------------------------
+def _engine():
+    init_models()
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+
+    from app.models.user import User
+    from app.services.prompt_service import clear_cache
+
+    # Fresh database, so cached prompt ids from another engine must go
+    clear_cache()
+    with Session(engine) as db:
+        db.add(User(id=1, email="bench@x.io", username="bench"))
+        db.commit()
+    return engine
+
+
+def _insert_video(engine) -> int:
+    from app.models.video import Video
+    from app.models.video_artifact import VideoArtifact
+
+    with Session(engine) as db:
+        video = Video(
+            user_id=1,
+            positive_prompt=POSITIVE,
+            negative_prompt=NEGATIVE,
+            duration="2.0",
+            resolution="448x448",
+            filename="AnimateDiff_00001.mp4",
+        )
+        video.artifacts.append(
+            VideoArtifact(
+                node_id="1348",
+                output_type="gifs",
+                filename="AnimateDiff_00001.mp4",
+                size_bytes=1_048_576,
+            )
+        )
+        db.add(video)
+        db.commit()
+        return video.id
+
+
+@benchmark("orm.insert_video")
+def bench_orm_insert():
+    engine = _engine()
+    return lambda: _insert_video(engine)
+
+
+@benchmark("orm.get_video")
+def bench_orm_get():
+    engine = _engine()
+    video_id = _insert_video(engine)
+
+    def run():
+        with Session(engine) as db:
+            video = get_video(db, video_id)
+            return video.positive_prompt, len(video.artifacts)
+
+    return run
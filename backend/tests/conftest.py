@@ -0,0 +1,83 @@
+"""
+Shared pytest configuration.
+
+Modules such as app.core.security load settings at import time, so the
+required environment variables must exist before any test module imports
+them. Real values from the environment always win over these defaults.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+_TEST_ENV = {
+    "MYSQL_USER": "test_user",
+    "MYSQL_PASSWORD": "test_password",
+    "MYSQL_DATABASE": "test_db",
+    "MYSQL_HOST": "localhost",
+    "MYSQL_PORT": "3306",
+    "SECRET_KEY": "test-secret-key",
+}
+
+for key, value in _TEST_ENV.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture(autouse=True)
+def _clear_prompt_cache():
+    """Each test uses a fresh database, so cached prompt ids must not leak."""
+    from app.services.prompt_service import clear_cache
+
+    clear_cache()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _clear_response_cache():
+    """Cached responses are keyed by row id, so they must not leak either."""
+    from app.services.response_cache import response_cache
+
+    response_cache.clear()
+    yield
+
+
+@pytest.fixture()
+def engine():
+    """In-memory SQLite database with the full schema and users 1 and 2."""
+    from app.db.base import Base, init_models
+    from app.models.user import User
+
+    init_models()
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="a@x.io", username="a"),
+                User(id=2, email="b@x.io", username="b"),
+            ]
+        )
+        session.commit()
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db(engine):
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture()
+def session_factory(engine, monkeypatch):
+    """Sessions for code that opens its own (SessionLocal) connections."""
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr("app.db.session.SessionLocal", factory)
+    return factory
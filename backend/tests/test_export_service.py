@@ -0,0 +1,77 @@
+"""
+Unit tests for services/export_service.py
+
+Exports from an in-memory SQLite database.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models.video import Video
+from app.models.video_archive import VideoArchive
+from app.services import export_service
+
+
+@pytest.fixture(autouse=True)
+def videos(db, session_factory, monkeypatch):
+    monkeypatch.setattr(export_service, "SessionLocal", session_factory)
+    monkeypatch.setattr(export_service, "_FIRST_BATCH_SIZE", 2)
+    monkeypatch.setattr(export_service.settings, "EXPORT_BATCH_SIZE", 3)
+
+    db.add_all(
+        [
+            Video(user_id=1, positive_prompt=f"fox {i}", negative_prompt="blurry")
+            for i in range(7)
+        ]
+        + [Video(user_id=2, positive_prompt="owl")]
+    )
+    db.commit()
+
+
+def test_ndjson_rows_in_id_order_with_prompt_texts():
+    chunks = list(export_service.iter_export(1, "ndjson"))
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    # Small first batch, then full ones
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 3, 2]
+    assert [row["positive_prompt"] for row in rows] == [f"fox {i}" for i in range(7)]
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert {row["negative_prompt"] for row in rows} == {"blurry"}
+    assert list(rows[0]) == export_service.EXPORT_COLUMNS
+
+
+def test_csv_header_comes_first():
+    chunks = list(export_service.iter_export(2, "csv"))
+    assert chunks[0].decode().strip() == ",".join(export_service.EXPORT_COLUMNS)
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [(row["user_id"], row["positive_prompt"]) for row in rows] == [("2", "owl")]
+
+
+def test_archived_videos_are_exported_in_id_order(db):
+    live = db.scalar(select(Video).where(Video.user_id == 2))
+    db.add(
+        VideoArchive(
+            id=live.id + 1,
+            user_id=2,
+            positive_prompt_id=live.positive_prompt_id,
+            workflow="wan-i2v",
+            archived_at=datetime(2026, 1, 2),
+        )
+    )
+    db.commit()
+
+    chunks = list(export_service.iter_export(2, "ndjson"))
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    assert [(row["id"], row["archived_at"]) for row in rows] == [
+        (live.id, None),
+        (live.id + 1, "2026-01-02T00:00:00"),
+    ]
+    assert [row["positive_prompt"] for row in rows] == ["owl", "owl"]
+    assert rows[1]["workflow"] == "wan-i2v"
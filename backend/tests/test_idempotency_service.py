@@ -0,0 +1,79 @@
+"""
+Unit tests for services/idempotency_service.py
+
+Runs against an in-memory SQLite database.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.idempotency_key import KEY_COMPLETED, KEY_IN_PROGRESS
+from app.services import idempotency_service as service
+
+
+def test_retry_gets_original_record(db):
+    fingerprint = service.request_fingerprint("generate", positive_prompt="fox")
+
+    record, owner = service.claim_key(db, 1, "k1", "generate", fingerprint)
+    assert owner and record.status == KEY_IN_PROGRESS
+
+    retry, owner = service.claim_key(db, 1, "k1", "generate", fingerprint)
+    assert not owner and retry.id == record.id
+
+    service.complete_key(db, record, video_id=None)
+    retry, owner = service.claim_key(db, 1, "k1", "generate", fingerprint)
+    assert not owner and retry.status == KEY_COMPLETED
+
+    with pytest.raises(service.IdempotencyConflictError):
+        service.claim_key(db, 1, "k1", "generate", "other-request")
+
+
+def test_released_and_expired_keys_can_be_claimed_again(db):
+    record, _ = service.claim_key(db, 1, "k1", "jobs", "h")
+    service.release_key(db, record)
+
+    record, owner = service.claim_key(db, 1, "k1", "jobs", "h")
+    assert owner
+
+    record.expires_at = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+    db.commit()
+
+    _, owner = service.claim_key(db, 1, "k1", "jobs", "different")
+    assert owner
+
+    record.expires_at = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    assert service.purge_expired_keys(db) == 1
+
+
+def test_running_original_keeps_its_key_past_the_deadline(
+    db, session_factory, monkeypatch
+):
+    monkeypatch.setattr(service, "SessionLocal", session_factory)
+    monkeypatch.setattr(service.settings, "IDEMPOTENCY_HEARTBEAT_SECONDS", 0.01)
+
+    record, _ = service.claim_key(db, 1, "k1", "generate", "h")
+    deadline = service.settings.GENERATION_DEADLINE_SECONDS
+    record.locked_at = datetime.now(tz=timezone.utc) - timedelta(seconds=deadline + 1)
+    db.commit()
+
+    async def original_still_running():
+        async with service.keep_alive(record.id):
+            await asyncio.sleep(0.1)
+
+    asyncio.run(original_still_running())
+
+    # A late retry waits for the original instead of a second GPU run
+    _, owner = service.claim_key(db, 1, "k1", "generate", "h")
+    assert not owner
+
+    # Once the heartbeat stops (process died), the key is taken over
+    db.refresh(record)
+    abandon = service.settings.IDEMPOTENCY_ABANDON_SECONDS
+    record.locked_at = datetime.now(tz=timezone.utc) - timedelta(seconds=abandon + 1)
+    db.commit()
+
+    _, owner = service.claim_key(db, 1, "k1", "generate", "h")
+    assert owner
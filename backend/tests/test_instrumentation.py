@@ -0,0 +1,70 @@
+"""
+Unit tests for db/instrumentation.py
+
+Instruments the shared in-memory SQLite engine.
+"""
+
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.db import instrumentation
+from app.models.video import Video
+
+
+@pytest.fixture()
+def stats(engine):
+    instrumentation.install_instrumentation(engine)
+    token = instrumentation.start_request_stats()
+    yield instrumentation.get_request_stats()
+    instrumentation.reset_request_stats(token)
+
+
+def test_counts_queries_and_time_per_request(engine, stats):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+
+    assert stats.queries == 2
+    assert stats.db_time > 0
+
+
+def test_failed_statement_leaves_no_stale_start_time(engine, stats):
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert conn.info.get("query_start_time") == []
+
+        conn.execute(text("SELECT 1"))
+
+    assert stats.queries == 1
+
+
+def test_slow_query_log_threshold(engine, stats, monkeypatch, caplog):
+    caplog.set_level(logging.WARNING, logger="app.db.slow_query")
+
+    monkeypatch.setattr(instrumentation.settings, "SQL_SLOW_QUERY_MS", 10_000)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert not caplog.records
+
+    monkeypatch.setattr(instrumentation.settings, "SQL_SLOW_QUERY_MS", 0)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert '"event": "slow_query"' in caplog.records[0].getMessage()
+
+
+def test_lazy_loads_are_recorded(engine, stats):
+    with Session(engine) as db:
+        db.add(Video(user_id=1, positive_prompt="fox"))
+        db.commit()
+
+    with Session(engine) as db:
+        video = db.get(Video, 1)
+        stats.lazy_loads.clear()
+
+        video.artifacts  # lazy="select" by default
+        assert stats.lazy_loads == ["Video.artifacts"]
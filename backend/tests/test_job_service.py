@@ -0,0 +1,69 @@
+"""
+Unit tests for services/job_service.py
+
+Runs against an in-memory SQLite database; SKIP LOCKED itself is MySQL
+behaviour, so these tests cover claim order and stale-job recovery.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import get_settings
+from app.models.generation_job import JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from app.services import job_service
+
+settings = get_settings()
+
+
+def _enqueue(db, prompt):
+    return job_service.enqueue_job(
+        db,
+        user_id=1,
+        positive_prompt=prompt,
+        negative_prompt="",
+        input_image=None,
+        workflow="api_test_workflow",
+    )
+
+
+def test_claims_oldest_job_once(db):
+    first = _enqueue(db, "first")
+    second = _enqueue(db, "second")
+
+    assert job_service.count_unsubmitted(db) == 2
+
+    claimed = job_service.claim_next_job(db, "w1")
+    assert claimed.id == first.id
+    assert (claimed.status, claimed.attempts, claimed.worker_id) == (
+        JOB_RUNNING,
+        1,
+        "w1",
+    )
+
+    assert job_service.claim_next_job(db, "w2").id == second.id
+    assert job_service.claim_next_job(db, "w3") is None
+
+    # Submitted jobs are counted by ComfyUI's own queue instead
+    job_service.mark_submitted(db, claimed, "prompt-1")
+    assert job_service.count_unsubmitted(db) == 1
+
+
+def test_stale_jobs_are_requeued_then_failed(db):
+    job = _enqueue(db, "stale")
+    job_service.claim_next_job(db, "w1")
+
+    job.heartbeat_at = datetime.now(tz=timezone.utc) - timedelta(
+        seconds=settings.JOB_STALE_SECONDS + 1
+    )
+    db.commit()
+
+    assert job_service.requeue_stale_jobs(db) == (1, 0)
+    db.refresh(job)
+    assert job.status == JOB_QUEUED
+
+    job.status = JOB_RUNNING
+    job.attempts = settings.JOB_MAX_ATTEMPTS
+    db.commit()
+
+    assert job_service.requeue_stale_jobs(db) == (0, 1)
+    db.refresh(job)
+    assert job.status == JOB_FAILED
@@ -0,0 +1,86 @@
+"""
+Unit tests for core/lifecycle.py
+
+Runs the drain against an in-memory SQLite database with stand-in
+generations instead of ComfyUI.
+"""
+
+import asyncio
+import time
+
+from app.core import lifecycle as lifecycle_module
+from app.core.lifecycle import Checkpoint, HandedOffError, Lifecycle
+from app.models.generation_job import JOB_FAILED, JOB_QUEUED, GenerationJob
+
+
+async def _submitted_generation():
+    lifecycle_module.update_checkpoint(
+        lifecycle_module.STAGE_SUBMITTED, prompt_id="prompt-1"
+    )
+    await asyncio.sleep(3600)  # waiting for ComfyUI
+
+
+async def _quick_generation():
+    await asyncio.sleep(0.05)
+    return {"filename": "out.mp4"}
+
+
+def test_drain_hands_off_unfinished_generations(session_factory):
+    lifecycle = Lifecycle()
+
+    async def scenario():
+        slow = asyncio.ensure_future(
+            lifecycle.run(
+                Checkpoint(1, "fox", "blurry", "wan-i2v"), _submitted_generation()
+            )
+        )
+        quick = asyncio.ensure_future(
+            lifecycle.run(Checkpoint(1, "owl", "", "wan-i2v"), _quick_generation())
+        )
+        await asyncio.sleep(0)
+
+        await lifecycle.drain(deadline=0.2)
+        return await asyncio.gather(slow, quick, return_exceptions=True)
+
+    handed_off, finished = asyncio.run(scenario())
+
+    assert lifecycle.draining and lifecycle.inflight == 0
+    assert finished == {"filename": "out.mp4"}
+    assert isinstance(handed_off, HandedOffError)
+
+    with session_factory() as db:
+        job = db.get(GenerationJob, handed_off.job_id)
+        assert (job.status, job.prompt_id, job.positive_prompt, job.workflow) == (
+            JOB_QUEUED,
+            "prompt-1",
+            "fox",
+            "wan-i2v",
+        )
+
+
+def test_hand_off_withdraws_jobs_of_generations_that_finished(
+    session_factory, monkeypatch
+):
+    lifecycle = Lifecycle()
+    enqueue_jobs = lifecycle_module._enqueue_jobs
+
+    def slow_enqueue(checkpoints):
+        job_ids = enqueue_jobs(checkpoints)
+        time.sleep(0.2)  # the generation finishes meanwhile
+        return job_ids
+
+    monkeypatch.setattr(lifecycle_module, "_enqueue_jobs", slow_enqueue)
+
+    async def scenario():
+        checkpoint = Checkpoint(1, "owl", "", "wan-i2v", stage="ready")
+        run = asyncio.ensure_future(lifecycle.run(checkpoint, _quick_generation()))
+        await asyncio.sleep(0)
+
+        assert await lifecycle.hand_off() == 0
+        return await run
+
+    assert asyncio.run(scenario()) == {"filename": "out.mp4"}
+
+    with session_factory() as db:
+        (job,) = db.query(GenerationJob).all()
+        assert job.status == JOB_FAILED
@@ -0,0 +1,99 @@
+"""
+Unit tests for services/media_service.py
+
+A minimal MP4 (ftyp, mdat, moov) is assembled by hand so the fast-start
+remux can be checked without any codec or external tool.
+"""
+
+import asyncio
+import struct
+
+import pytest
+
+from app.services import media_service
+from app.services.media_service import Mp4FormatError, faststart_mp4
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", len(payload) + 8, box_type) + payload
+
+
+def _stco(offsets: list[int]) -> bytes:
+    return _box(
+        b"stco",
+        b"\x00\x00\x00\x00"
+        + struct.pack(">I%dI" % len(offsets), len(offsets), *offsets),
+    )
+
+
+def _moov(offsets: list[int]) -> bytes:
+    stbl = _box(b"stbl", _stco(offsets))
+    minf = _box(b"minf", stbl)
+    mdia = _box(b"mdia", _box(b"mdhd", b"\x00" * 24) + minf)
+    trak = _box(b"trak", _box(b"tkhd", b"\x00" * 84) + mdia)
+    return _box(b"moov", _box(b"mvhd", b"\x00" * 100) + trak)
+
+
+def _read_offsets(data: bytes) -> list[int]:
+    index = data.index(b"stco")
+    count = struct.unpack_from(">I", data, index + 8)[0]
+    return list(struct.unpack_from(">%dI" % count, data, index + 12))
+
+
+def _top_level_types(data: bytes) -> list[bytes]:
+    types, offset = [], 0
+    while offset < len(data):
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        types.append(box_type)
+        offset += size
+    return types
+
+
+def test_faststart_moves_moov_and_patches_offsets(tmp_path):
+    """Chunk offsets must still point at the same sample bytes."""
+    ftyp = _box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2mp41")
+    samples = [b"AAAA" * 8, b"BBBB" * 8, b"CCCC" * 8]
+    mdat = _box(b"mdat", b"".join(samples))
+
+    first = len(ftyp) + 8
+    offsets = [first + i * 32 for i in range(len(samples))]
+    original = ftyp + mdat + _moov(offsets)
+
+    path = tmp_path / "video.mp4"
+    path.write_bytes(original)
+
+    assert faststart_mp4(path, chunk_size=7) is True
+
+    data = path.read_bytes()
+    assert len(data) == len(original)
+    assert _top_level_types(data) == [b"ftyp", b"moov", b"mdat"]
+    for offset, sample in zip(_read_offsets(data), samples):
+        assert data[offset : offset + 32] == sample
+
+    # A second pass is a no-op.
+    assert faststart_mp4(path) is False
+    assert path.read_bytes() == data
+
+
+def test_faststart_rejects_files_without_moov(tmp_path):
+    path = tmp_path / "broken.mp4"
+    path.write_bytes(_box(b"ftyp", b"isom") + _box(b"mdat", b"xxxx"))
+
+    with pytest.raises(Mp4FormatError):
+        faststart_mp4(path)
+
+
+def test_fetch_output_keeps_file_the_remux_cannot_parse(tmp_path, monkeypatch):
+    broken = _box(b"ftyp", b"isom") + _box(b"mdat", b"xxxx")
+    monkeypatch.setattr(media_service.settings, "MEDIA_ROOT", str(tmp_path))
+
+    async def download(session, filename, dest, subfolder, output_type):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(broken)
+
+    monkeypatch.setattr(media_service, "download_output", download)
+
+    path = asyncio.run(media_service.fetch_output(None, "odd.mp4"))
+
+    assert path == tmp_path / "output" / "odd.mp4"
+    assert path.read_bytes() == broken
@@ -0,0 +1,120 @@
+"""
+Unit tests for services/prompt_service.py
+
+Runs against an in-memory SQLite database.
+"""
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.models.prompt import Prompt
+from app.models.video import Video
+from app.services import prompt_service
+
+
+def test_prompts_are_stored_once(engine):
+    with Session(engine) as db:
+        db.add_all(
+            [
+                Video(user_id=1, positive_prompt="fox", negative_prompt="blurry"),
+                Video(user_id=1, positive_prompt="owl", negative_prompt="blurry"),
+            ]
+        )
+        db.commit()
+
+        assert db.scalar(select(func.count()).select_from(Prompt)) == 3
+
+        first, second = db.scalars(select(Video).order_by(Video.id)).all()
+        assert first.negative_prompt_id == second.negative_prompt_id
+        assert (second.positive_prompt, second.negative_prompt) == ("owl", "blurry")
+
+    # Texts are resolved without the cache as well
+    prompt_service.clear_cache()
+    with Session(engine) as db:
+        assert db.get(Video, 1).positive_prompt == "fox"
+
+    # A detached Video never opens a session behind an attribute access
+    prompt_service.clear_cache()
+    with Session(engine) as db:
+        detached = db.get(Video, 2)
+    with pytest.raises(DetachedInstanceError):
+        detached.positive_prompt
+
+
+def test_prompt_assigned_on_a_persistent_row_is_stored(engine):
+    with Session(engine) as db:
+        db.add(Video(user_id=1))
+        db.commit()
+
+        video = db.get(Video, 1)
+        assert video.positive_prompt_id is None
+        video.positive_prompt = "late fox"
+        db.commit()
+
+    prompt_service.clear_cache()
+    with Session(engine) as db:
+        video = db.get(Video, 1)
+        assert video.positive_prompt_id is not None
+        assert video.positive_prompt == "late fox"
+
+
+def test_interned_ids_are_shared_only_after_commit(engine):
+    fox, owl = prompt_service.content_hash("fox"), prompt_service.content_hash("owl")
+
+    with engine.connect() as conn:
+        with conn.begin():
+            fox_id = prompt_service.intern_prompt(conn, "fox")
+            # Reused within the transaction, invisible to everybody else
+            assert prompt_service.intern_prompt(conn, "fox") == fox_id
+            assert prompt_service._ids.get(fox) is None
+
+            # An unrelated savepoint rolling back keeps "fox"
+            savepoint = conn.begin_nested()
+            prompt_service.intern_prompt(conn, "owl")
+            savepoint.rollback()
+
+        assert prompt_service._ids.get(fox) == fox_id
+        assert prompt_service._texts.get(fox_id) == "fox"
+        # "owl" was rolled back with its savepoint
+        assert prompt_service._ids.get(owl) is None
+
+        transaction = conn.begin()
+        prompt_service.intern_prompt(conn, "owl")
+        transaction.rollback()
+        assert prompt_service._ids.get(owl) is None
+
+
+def test_backfill_then_drop_legacy_columns(engine):
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE videos ADD COLUMN positive_prompt TEXT"))
+        conn.execute(text("ALTER TABLE videos ADD COLUMN negative_prompt TEXT"))
+        conn.execute(
+            text(
+                "INSERT INTO videos (user_id, positive_prompt, negative_prompt) "
+                "VALUES (1, 'fox', 'blurry'), (1, 'owl', 'blurry'), (1, NULL, NULL)"
+            )
+        )
+
+    with pytest.raises(RuntimeError):
+        prompt_service.drop_legacy_columns(engine)
+
+    assert prompt_service.backfill_prompts(engine, batch_size=1) == 2
+    assert prompt_service.backfill_prompts(engine) == 0
+
+    assert prompt_service.drop_legacy_columns(engine) == [
+        "positive_prompt",
+        "negative_prompt",
+    ]
+    assert prompt_service.legacy_columns(engine) == []
+
+    prompt_service.clear_cache()
+    with Session(engine) as db:
+        videos = db.scalars(select(Video).order_by(Video.id)).all()
+        prompt_service.load_video_prompts(db, videos)
+        assert [(v.positive_prompt, v.negative_prompt) for v in videos] == [
+            ("fox", "blurry"),
+            ("owl", "blurry"),
+            (None, None),
+        ]
@@ -0,0 +1,102 @@
+"""
+Unit tests for services/queue_estimator.py
+
+The ComfyUI queue depth is preset, so no request leaves the process.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import video as video_endpoints
+from app.models.video import Video
+from app.services.queue_estimator import DEFAULT_WORKFLOW, QueueEstimator
+
+
+def _estimator(running: int, pending: int) -> QueueEstimator:
+    estimator = QueueEstimator(
+        window=3, default_seconds=60.0, depth_ttl=3600, refresh_interval=0
+    )
+    estimator._depth = (running, pending)
+    estimator._depth_fetched_at = time.monotonic()
+    return estimator
+
+
+def test_eta_from_queue_depth_and_rolling_window():
+    estimator = _estimator(running=2, pending=3)
+    for seconds in (100.0, 10.0, 20.0, 30.0):  # window keeps the last 3
+        estimator.record(DEFAULT_WORKFLOW, seconds)
+
+    estimate = asyncio.run(estimator.estimate(DEFAULT_WORKFLOW, extra_pending=1))
+
+    # (2 running * 0.5 + 3 pending + 1 extra + 1 new) * 20s
+    assert (estimate.expected_execution_seconds, estimate.samples) == (20.0, 3)
+    assert (estimate.queue_pending, estimate.eta_seconds) == (4, 120.0)
+
+    # No samples yet: the configured default applies
+    other = asyncio.run(estimator.estimate("other_workflow"))
+    assert (other.expected_execution_seconds, other.eta_seconds) == (60.0, 300.0)
+
+
+def test_refresh_keeps_statistics_per_workflow(db):
+    db.add_all(
+        [
+            Video(user_id=1, execution_time=10.0),  # stored before workflows
+            Video(user_id=1, execution_time=20.0, workflow=DEFAULT_WORKFLOW),
+            Video(user_id=1, execution_time=90.0, workflow="upscale"),
+        ]
+    )
+    db.commit()
+
+    estimator = _estimator(0, 0)
+    estimator.refresh(db)
+
+    assert estimator.expected_seconds(DEFAULT_WORKFLOW) == (15.0, 2)
+    assert estimator.expected_seconds("upscale") == (90.0, 1)
+
+
+def test_depth_lock_works_across_event_loops():
+    estimator = _estimator(1, 0)
+
+    async def contended():
+        # Waiting on a held lock binds it to the running loop
+        async with estimator._lock():
+            waiter = asyncio.ensure_future(estimator._lock().acquire())
+            await asyncio.sleep(0)
+        await waiter
+        estimator._lock().release()
+
+    asyncio.run(contended())
+    asyncio.run(contended())
+
+
+def test_admission_rejects_work_that_would_miss_the_deadline(db, monkeypatch):
+    monkeypatch.setattr(video_endpoints, "estimator", _estimator(0, 9))
+    monkeypatch.setattr(video_endpoints.settings, "GENERATION_DEADLINE_SECONDS", 500)
+    monkeypatch.setattr(
+        video_endpoints.usage_service.settings, "MAX_VIDEOS_PER_USER", None
+    )
+
+    # (9 pending + 1) * 60s default = 600s > 500s
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(video_endpoints._admit(db, 1))
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers["Retry-After"] == "100"
+
+    monkeypatch.setattr(video_endpoints, "estimator", _estimator(0, 6))
+    estimate = asyncio.run(video_endpoints._admit(db, 1))
+    assert estimate.eta_seconds == 420.0
+
+
+def test_admission_rejects_users_over_quota(db, monkeypatch):
+    monkeypatch.setattr(
+        video_endpoints.usage_service.settings, "MAX_VIDEOS_PER_USER", 1
+    )
+    video_endpoints.usage_service.record_video(db, 1, 1.0, 1.0, 0)
+    db.commit()
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(video_endpoints._admit(db, 1))
+    assert rejected.value.status_code == 429
@@ -0,0 +1,104 @@
+"""
+Unit tests for services/response_cache.py
+
+Serves a user through the cache from an in-memory SQLite database.
+"""
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.models.user import User
+from app.services import response_cache as cache_module
+from app.services.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    cached_response,
+    user_key,
+    user_response,
+)
+
+
+def _request(**headers) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+def _entry(size: int) -> CachedResponse:
+    return CachedResponse(b"x" * size, '"e"', None, "no-cache")
+
+
+def test_lru_is_bounded_by_body_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", _entry(4))
+    cache.put("b", _entry(4))
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", _entry(4))
+    cache.put("huge", _entry(11))
+
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get("b") is None and cache.get("huge") is None
+    assert cache.size == 8
+
+
+def test_repeat_reads_skip_the_query_and_revalidate(session_factory):
+    db = session_factory()
+    loads = []
+
+    def build():
+        loads.append(1)
+        return user_response(db.get(User, 1))
+
+    first = cached_response(_request(), user_key(1), build, ttl=60)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and b'"username":"a"' in first.body
+
+    not_modified = cached_response(
+        _request(if_none_match=f'"other", {etag}'), user_key(1), build, ttl=60
+    )
+    by_date = cached_response(
+        _request(if_modified_since=first.headers["last-modified"]),
+        user_key(1),
+        build,
+        ttl=60,
+    )
+    assert (not_modified.status_code, by_date.status_code) == (304, 304)
+    assert not_modified.headers["etag"] == etag
+    assert len(loads) == 1
+
+    # An update invalidates the entry once committed
+    db.get(User, 1).username = "renamed"
+    db.commit()
+    assert cache_module.response_cache.get(user_key(1)) is None
+
+    changed = cached_response(_request(if_none_match=etag), user_key(1), build, 60)
+    assert changed.status_code == 200 and b'"username":"renamed"' in changed.body
+    assert len(loads) == 2
+    db.close()
+
+
+def test_missing_rows_are_not_cached(session_factory):
+    def build():
+        raise HTTPException(status_code=404)
+
+    with pytest.raises(HTTPException):
+        cached_response(_request(), user_key(2), build, ttl=60)
+    assert cache_module.response_cache.get(user_key(2)) is None
+
+
+def test_a_build_racing_an_invalidation_is_not_cached(session_factory):
+    db = session_factory()
+    writer = session_factory()
+
+    def stale_build():
+        entry = user_response(db.get(User, 1))
+        # Another request commits an update while this one serializes
+        writer.get(User, 1).username = "renamed"
+        writer.commit()
+        return entry
+
+    served = cached_response(_request(), user_key(1), stale_build, ttl=60)
+    assert b'"username":"a"' in served.body
+    assert cache_module.response_cache.get(user_key(1)) is None
+    db.close()
+    writer.close()
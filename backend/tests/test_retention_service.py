@@ -0,0 +1,156 @@
+"""
+Unit tests for services/retention_service.py
+
+Runs against an in-memory SQLite database and a temporary MEDIA_ROOT.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.retention_policy import RetentionPolicy
+from app.models.user_usage import UserUsage
+from app.models.video import Video
+from app.models.video_archive import VideoArchive
+from app.models.video_artifact import VideoArtifact
+from app.models.video_trace import VideoTrace
+from app.services import (
+    media_service,
+    response_cache,
+    retention_service,
+    usage_service,
+)
+
+
+@pytest.fixture()
+def db(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(media_service.settings, "MEDIA_ROOT", str(tmp_path))
+    monkeypatch.setattr(
+        retention_service.settings, "RETENTION_EVICT_MEDIA_AFTER_DAYS", 30
+    )
+    monkeypatch.setattr(retention_service.settings, "RETENTION_ARCHIVE_AFTER_DAYS", 90)
+
+    # User 2 keeps everything
+    db.add(RetentionPolicy(user_id=2))
+    db.commit()
+    return db
+
+
+def _add_video(db, tmp_path, user_id, age_days, name):
+    (tmp_path / name).write_bytes(b"x" * 100)
+    video = Video(
+        user_id=user_id,
+        positive_prompt="fox",
+        duration="2.0",
+        workflow="wan-i2v",
+        source_video=f"/media/{name}",
+        created_at=datetime.now() - timedelta(days=age_days),
+    )
+    video.artifacts.append(
+        VideoArtifact(
+            node_id="9",
+            output_type="gifs",
+            filename=name,
+            subfolder="",
+            source_url=f"/media/{name}",
+            size_bytes=100,
+        )
+    )
+    db.add(video)
+    db.flush()
+    usage_service.record_video(db, user_id, 2.0, 1.0, 100)
+    db.commit()
+    return video.id
+
+
+def test_retention_evicts_and_archives(db, tmp_path):
+    recent = _add_video(db, tmp_path, 1, 1, "recent.mp4")
+    aged = _add_video(db, tmp_path, 1, 45, "aged.mp4")
+    old = _add_video(db, tmp_path, 1, 120, "old.mp4")
+    kept = _add_video(db, tmp_path, 2, 120, "kept.mp4")
+    db.add(
+        VideoTrace(
+            video_id=old,
+            correlation_id="abc123",
+            host="gpu-1",
+            started_at=datetime(2026, 1, 2, 3, 4, 5),
+            total_ms=1500,
+            spans='{"v":1,"spans":[["execute",0,1500]]}',
+        )
+    )
+    db.commit()
+
+    dry = retention_service.run_retention(db, dry_run=True, pause=0)
+    assert (dry.videos_archived, dry.artifacts_evicted) == (1, 2)
+    assert (tmp_path / "old.mp4").exists()
+
+    report = retention_service.run_retention(db, pause=0)
+    assert report.as_dict() == dict(dry.as_dict(), dry_run=False)
+    assert report.bytes_reclaimed == 200
+
+    assert {p.name for p in tmp_path.iterdir()} == {"recent.mp4", "kept.mp4"}
+    evicted = db.scalar(select(VideoArtifact).where(VideoArtifact.video_id == aged))
+    assert evicted.evicted_at is not None
+    assert evicted.source_url is None
+    assert db.get(Video, aged).source_video is None
+    assert db.get(Video, recent).source_video == "/media/recent.mp4"
+    assert db.get(Video, old) is None
+    assert {v.id for v in db.scalars(select(Video))} == {recent, aged, kept}
+
+    archived = db.get(VideoArchive, old)
+    assert archived.positive_prompt_id is not None
+    assert json.loads(archived.artifacts)[0]["filename"] == "old.mp4"
+    assert archived.workflow == "wan-i2v"
+    assert json.loads(archived.trace) == {
+        "correlation_id": "abc123",
+        "host": "gpu-1",
+        "started_at": "2026-01-02T03:04:05",
+        "total_ms": 1500,
+        "v": 1,
+        "spans": [["execute", 0, 1500]],
+    }
+    assert db.scalar(select(func.count()).select_from(VideoTrace)) == 0
+
+    # Archived videos still count; evicted bytes do not
+    usage = db.get(UserUsage, 1)
+    assert (usage.video_count, usage.bytes_stored) == (3, 100)
+    usage_service.reconcile_usage(db)
+    db.refresh(usage)
+    assert (usage.video_count, usage.bytes_stored) == (3, 100)
+
+    # Nothing left to do
+    again = retention_service.run_retention(db, pause=0)
+    assert (again.videos_archived, again.artifacts_evicted) == (0, 0)
+    assert db.scalar(select(func.count()).select_from(VideoArchive)) == 1
+
+
+def test_retention_keeps_files_when_the_batch_fails(db, tmp_path, monkeypatch):
+    aged = _add_video(db, tmp_path, 1, 45, "aged.mp4")
+
+    def fail():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(db, "commit", fail)
+    with pytest.raises(RuntimeError):
+        retention_service.run_retention(db, pause=0)
+    db.rollback()
+
+    # The rows still point at the file, so the file must still be there
+    assert (tmp_path / "aged.mp4").exists()
+    assert db.get(Video, aged).source_video == "/media/aged.mp4"
+
+
+def test_retention_invalidates_cached_videos(db, tmp_path):
+    aged = _add_video(db, tmp_path, 1, 45, "aged.mp4")
+    old = _add_video(db, tmp_path, 1, 120, "old.mp4")
+    for video_id in (aged, old):
+        entry = response_cache.video_response(db.get(Video, video_id))
+        response_cache.response_cache.put(response_cache.video_key(video_id), entry)
+
+    retention_service.run_retention(db, pause=0)
+
+    for video_id in (aged, old):
+        key = response_cache.video_key(video_id)
+        assert response_cache.response_cache.get(key) is None
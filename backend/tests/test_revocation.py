@@ -0,0 +1,115 @@
+"""
+Unit tests for core/revocation.py and the token revocation endpoints.
+
+Runs against an in-memory SQLite database with a fresh revocation list.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import user as user_endpoints
+from app.core import revocation, security
+from app.core.revocation import BloomFilter, RevocationList
+from app.models.revoked_token import RevokedToken
+from app.schemas.auth import TokenRevoke
+
+
+@pytest.fixture()
+def revocation_list(monkeypatch):
+    revocations = RevocationList(
+        refresh_interval=0, capacity=100, error_rate=0.01, overlap=60
+    )
+    monkeypatch.setattr(revocation, "revocation_list", revocations)
+    return revocations
+
+
+def _revoked(jti, revoked_at, row_id=None, expires_in=3600):
+    now = datetime.now(tz=timezone.utc)
+    return RevokedToken(
+        id=row_id,
+        jti=jti,
+        expires_at=now + timedelta(seconds=expires_in),
+        revoked_at=revoked_at,
+    )
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_refresh_picks_up_rows_committed_out_of_order(db, revocation_list):
+    now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    db.add(_revoked("late-id", now, row_id=10))
+    db.commit()
+    revocation_list.refresh(db)
+    assert revocation_list.is_revoked("late-id")
+
+    # Lower id and earlier revoked_at, but committed after the refresh above
+    db.add(_revoked("early-id", now - timedelta(seconds=5), row_id=5))
+    db.commit()
+    revocation_list.refresh(db)
+
+    assert revocation_list.is_revoked("early-id")
+    assert not revocation_list.is_revoked("never-revoked")
+
+
+def test_expired_entries_are_dropped_and_purged(db, revocation_list):
+    now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    db.add_all([_revoked("old", now, expires_in=-1), _revoked("live", now)])
+    db.commit()
+
+    revocation_list.refresh(db)
+    assert not revocation_list.is_revoked("old")
+    assert revocation_list.is_revoked("live")
+
+    assert revocation.purge_expired_revocations(db) == 1
+    assert db.query(RevokedToken.jti).all() == [("live",)]
+
+
+def _payload(user_id):
+    token = security.create_access_token(user_id)
+    return token, security.decode_access_token(token)
+
+
+def test_logout_revokes_the_current_token(db, revocation_list):
+    token, payload = _payload(1)
+    assert user_endpoints.get_token_payload(f"Bearer {token}", db) == payload
+
+    user_endpoints.logout_user(payload, db)
+
+    with pytest.raises(HTTPException) as rejected:
+        user_endpoints.get_token_payload(f"Bearer {token}", db)
+    assert rejected.value.status_code == 401
+
+    # Other workers learn about it from the table
+    other_worker = RevocationList(refresh_interval=0, capacity=10, error_rate=0.01)
+    other_worker.refresh(db)
+    assert other_worker.is_revoked(payload["jti"])
+
+
+def test_revoke_another_token_of_the_same_user_only(db, revocation_list):
+    _, current = _payload(1)
+    lost_token, lost = _payload(1)
+    foreign_token, foreign = _payload(2)
+
+    user_endpoints.revoke_user_token(TokenRevoke(token=lost_token), current, db)
+    assert revocation_list.is_revoked(lost["jti"])
+    assert not revocation_list.is_revoked(current["jti"])
+
+    with pytest.raises(HTTPException) as forbidden:
+        user_endpoints.revoke_user_token(TokenRevoke(token=foreign_token), current, db)
+    assert forbidden.value.status_code == 403
+    assert not revocation_list.is_revoked(foreign["jti"])
+
+    # Garbage needs no revocation
+    user_endpoints.revoke_user_token(TokenRevoke(token="not-a-token"), current, db)
@@ -0,0 +1,60 @@
+"""
+Unit tests for services/search_service.py
+
+Runs against an in-memory SQLite database, where prompts are indexed by
+the FTS5 table that mirrors `videos`.
+"""
+
+import pytest
+
+from app.models.video import Video
+from app.services.search_service import SearchUnavailableError, search_videos
+
+
+@pytest.fixture()
+def db(db):
+    db.add_all(
+        [
+            Video(user_id=1, positive_prompt=f"a red fox in the snow {i}")
+            for i in range(5)
+        ]
+        + [
+            Video(user_id=1, positive_prompt="fox fox fox portrait"),
+            Video(user_id=1, positive_prompt="city at night"),
+            Video(user_id=2, positive_prompt="fox"),
+        ]
+    )
+    db.commit()
+    return db
+
+
+def test_search_ranks_and_scopes_per_user(db):
+    rows, _ = search_videos(db, user_id=1, query="fox", limit=10)
+
+    assert len(rows) == 6
+    assert {video.user_id for video, _ in rows} == {1}
+    assert rows[0][0].positive_prompt == "fox fox fox portrait"
+
+
+def test_search_keyset_pagination_visits_each_hit_once(db):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = search_videos(db, user_id=1, query="fox", limit=4, cursor=cursor)
+        seen.extend(video.id for video, _ in rows)
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 6
+
+
+def test_search_ignores_query_syntax(db):
+    """Operators in user input are treated as plain terms."""
+    rows, _ = search_videos(db, user_id=1, query='night" OR -(', limit=10)
+    assert [video.positive_prompt for video, _ in rows] == ["city at night"]
+
+
+def test_unsupported_dialect_raises_domain_error(db, monkeypatch):
+    monkeypatch.setattr(db.get_bind().dialect, "name", "postgresql")
+
+    with pytest.raises(SearchUnavailableError):
+        search_videos(db, user_id=1, query="fox")
@@ -0,0 +1,137 @@
+"""
+Unit tests for services/tracing.py
+"""
+
+import asyncio
+
+import aiohttp
+
+from app.services import tracing
+
+
+def test_execution_spans_from_node_events():
+    trace = tracing.GenerationTrace("cid")
+    t0 = trace.started_at
+
+    listener = tracing.NodeEventListener("cid")
+    listener.execution_start = t0 + 2.0
+    listener.execution_end = t0 + 7.0
+    listener.cached_nodes = ["6"]
+    listener.nodes = [("1338", t0 + 2.0, t0 + 6.5), ("1336", t0 + 6.5, t0 + 7.0)]
+
+    workflow = {"1338": {"class_type": "KSampler"}, "6": {"class_type": "CLIP"}}
+    tracing.record_execution(trace, workflow, t0 + 0.5, {}, listener)
+
+    spans = {
+        (span["name"], span["attrs"].get("node")): span
+        for span in tracing.parse_spans(trace.to_json())
+    }
+
+    assert spans[("queue_wait", None)]["start_ms"] == 500
+    assert spans[("queue_wait", None)]["duration_ms"] == 1500
+    assert spans[("execute", None)]["duration_ms"] == 5000
+    assert spans[("node", "1338")]["duration_ms"] == 4500
+    assert spans[("node", "1338")]["attrs"]["type"] == "KSampler"
+    assert spans[("node", "6")]["attrs"]["cached"] is True
+    assert trace.total_ms == 7000
+
+
+def test_history_fallback_and_noop_outside_generation():
+    trace = tracing.GenerationTrace()
+    start_ms = trace.started_at * 1000
+    history = {
+        "status": {
+            "messages": [
+                ["execution_start", {"timestamp": start_ms + 1000}],
+                ["execution_success", {"timestamp": start_ms + 4000}],
+            ]
+        }
+    }
+
+    tracing.record_execution(trace, {}, trace.started_at, history)
+    names = [span[0] for span in trace.spans]
+    # No ComfyUI queue time: queue wait is not measured across two clocks
+    assert names == ["execute"]
+
+    # Cached nodes come from /history when the websocket saw nothing
+    history["status"]["messages"].insert(
+        1, ["execution_cached", {"nodes": ["6"], "timestamp": start_ms + 1000}]
+    )
+    trace = tracing.GenerationTrace()
+    tracing.record_execution(
+        trace, {}, trace.started_at, history, tracing.NodeEventListener("cid")
+    )
+    cached = tracing.parse_spans(trace.to_json())[-1]
+    assert (cached["name"], cached["attrs"]) == (
+        "node",
+        {"node": "6", "type": None, "cached": True},
+    )
+
+    # No current trace: spans are silently dropped
+    with tracing.span("upload") as attrs:
+        attrs["bytes"] = 1
+
+
+def test_history_queue_wait_ignores_clock_skew():
+    trace = tracing.GenerationTrace()
+    t0 = trace.started_at
+    comfy_ms = (t0 + 3600) * 1000  # the ComfyUI host is an hour ahead
+    history = {
+        "prompt": [0, "prompt-1", {}, {"create_time": comfy_ms + 500}, []],
+        "status": {
+            "messages": [
+                ["execution_start", {"timestamp": comfy_ms + 2000}],
+                ["execution_success", {"timestamp": comfy_ms + 7000}],
+            ]
+        },
+    }
+
+    # Submitted at 0.4s, result seen at 7.2s on the backend clock
+    tracing.record_execution(trace, {}, t0 + 0.4, history, completed_at=t0 + 7.2)
+    spans = {span["name"]: span for span in tracing.parse_spans(trace.to_json())}
+
+    assert spans["queue_wait"]["duration_ms"] == 1500
+    assert spans["execute"]["duration_ms"] == 5000
+    assert spans["execute"]["start_ms"] == 2200
+
+
+class _Message:
+    def __init__(self, data):
+        self.type = aiohttp.WSMsgType.TEXT
+        self.data = data
+
+
+class _Websocket:
+    def __init__(self, frames, error=None):
+        self._frames = frames
+        self._error = error
+
+    async def __aiter__(self):
+        for frame in self._frames:
+            yield _Message(frame)
+        if self._error is not None:
+            raise self._error
+
+
+def test_malformed_events_never_fail_the_generation():
+    listener = tracing.NodeEventListener("cid")
+    frames = [
+        '{"type": "execution_start", "data": null}',
+        '{"type": "executing", "data": null}',
+        "not json",
+        '{"type": "executing", "data": {"node": "1338"}}',
+        '{"type": "executing", "data": {"node": null}}',
+    ]
+
+    async def run():
+        listener._task = asyncio.ensure_future(
+            listener._listen(_Websocket(frames, error=RuntimeError("closed")))
+        )
+        await asyncio.sleep(0)
+        await listener.stop()
+
+    asyncio.run(run())
+
+    assert listener.execution_start is not None
+    assert [node for node, _, _ in listener.nodes] == ["1338"]
+    assert listener.execution_end is not None
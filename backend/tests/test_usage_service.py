@@ -0,0 +1,87 @@
+"""
+Unit tests for services/usage_service.py
+
+Runs against an in-memory SQLite database.
+"""
+
+from app.models.user_usage import UserUsage
+from app.models.video import Video
+from app.services import usage_service
+
+
+def _counters(db, user_id):
+    db.expire_all()
+    usage = db.get(UserUsage, user_id)
+    return (
+        usage.video_count,
+        usage.output_seconds,
+        usage.execution_seconds,
+        usage.bytes_stored,
+    )
+
+
+def _add_video(db, user_id, duration, execution_time):
+    db.add(
+        Video(
+            user_id=user_id,
+            positive_prompt="fox",
+            duration=str(duration),
+            execution_time=execution_time,
+        )
+    )
+    usage_service.record_video(db, user_id, duration, execution_time, 0)
+    db.commit()
+
+
+def test_first_video_creates_the_row_then_increments(db):
+    assert usage_service.get_usage(db, 1) is None
+
+    usage_service.record_video(db, 1, 2.0, 10.0, 100)
+    db.commit()
+    assert _counters(db, 1) == (1, 2.0, 10.0, 100)
+
+    usage_service.record_video(db, 1, None, 5.0, None)
+    db.commit()
+    assert _counters(db, 1) == (2, 2.0, 15.0, 100)
+
+
+def test_check_quota(db, monkeypatch):
+    settings = usage_service.settings
+    monkeypatch.setattr(settings, "MAX_VIDEOS_PER_USER", 2)
+    monkeypatch.setattr(settings, "MAX_OUTPUT_SECONDS_PER_USER", 5.0)
+
+    assert usage_service.check_quota(db, 1) is None  # no videos yet
+
+    _add_video(db, 1, 2.0, 1.0)
+    assert usage_service.check_quota(db, 1) is None
+
+    _add_video(db, 1, 2.0, 1.0)
+    assert "Video quota of 2" in usage_service.check_quota(db, 1)
+
+    monkeypatch.setattr(settings, "MAX_VIDEOS_PER_USER", None)
+    _add_video(db, 1, 2.0, 1.0)
+    assert "Output quota of 5.0" in usage_service.check_quota(db, 1)
+
+
+def test_reconcile_fixes_drift_and_keeps_concurrent_increments(db, monkeypatch):
+    _add_video(db, 1, 2.0, 10.0)
+    _add_video(db, 1, 3.0, 20.0)
+    db.add(UserUsage(user_id=2, video_count=4, output_seconds=8.0))
+    db.execute(
+        UserUsage.__table__.update().values(video_count=UserUsage.video_count + 5)
+    )
+    db.commit()
+
+    snapshot = usage_service._snapshot
+
+    def snapshot_then_concurrent_video(db, user_id):
+        result = snapshot(db, user_id)
+        # Committed by another request after the reconcile read its totals
+        usage_service.record_video(db, 1, 1.0, 1.0, 0)
+        return result
+
+    monkeypatch.setattr(usage_service, "_snapshot", snapshot_then_concurrent_video)
+
+    assert usage_service.reconcile_usage(db) == 2
+    assert _counters(db, 1) == (3, 6.0, 31.0, 0)
+    assert _counters(db, 2) == (0, 0.0, 0.0, 0)
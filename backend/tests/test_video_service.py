@@ -0,0 +1,182 @@
+"""
+Unit tests for the pure helpers in services/video_service.py
+
+These tests exercise image ingestion without a running ComfyUI instance.
+"""
+
+import asyncio
+import io
+import time
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import UploadFile
+
+from app.services import media_service, tracing, video_service
+from app.services.video_service import (
+    ImageTooLargeError,
+    collect_outputs,
+    downscale_image,
+    extract_video_output,
+    extract_video_outputs,
+    get_workflow_target_size,
+    load_workflow,
+    read_upload_limited,
+)
+
+
+def _encode_png(width: int, height: int) -> bytes:
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".png", img)
+    assert ok
+    return encoded.tobytes()
+
+
+def test_workflow_target_size():
+    """The bundled workflow samples at 448x448."""
+    workflow = load_workflow("app/public/api_test_workflow.json")
+    assert get_workflow_target_size(workflow) == (448, 448)
+
+
+def test_downscale_keeps_aspect_and_covers_target():
+    """Large images shrink until their short side matches the target."""
+    data = _encode_png(1600, 900)
+
+    compact = downscale_image(data, 448, 448)
+
+    assert compact is not None
+    assert len(compact) < len(data)
+    img = cv2.imdecode(np.frombuffer(compact, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert img.shape[:2] == (448, 796)
+
+
+def test_downscale_ignores_undecodable_bytes():
+    """Unknown formats are forwarded untouched."""
+    assert downscale_image(b"not an image", 448, 448) is None
+
+
+def test_read_upload_limited_rejects_oversized_upload():
+    """The size limit is enforced while reading, not after."""
+    upload = UploadFile(io.BytesIO(b"x" * 2048), filename="big.png")
+
+    with pytest.raises(ImageTooLargeError):
+        asyncio.run(read_upload_limited(upload, max_bytes=1024))
+
+    upload = UploadFile(io.BytesIO(b"x" * 512), filename="small.png")
+    assert asyncio.run(read_upload_limited(upload, max_bytes=1024)) == b"x" * 512
+
+
+def test_extract_video_outputs_enumerates_every_node_and_file():
+    """Outputs are ordered by numeric node id, never by dict order."""
+    result = {
+        "1336": {
+            "gifs": [
+                {"filename": "a.mp4", "format": "video/h264-mp4", "type": "output"},
+                {"filename": "b.mp4", "format": "video/h264-mp4", "type": "output"},
+            ]
+        },
+        "99": {"images": [{"filename": "preview.png", "type": "temp"}]},
+    }
+
+    outputs = extract_video_outputs(result)
+
+    assert [(o["node_id"], o["filename"]) for o in outputs] == [
+        ("99", "preview.png"),
+        ("1336", "a.mp4"),
+        ("1336", "b.mp4"),
+    ]
+    assert extract_video_output(result)["filename"] == "a.mp4"
+
+
+def _image_output(name, folder_type, node_id="9"):
+    return {
+        "node_id": node_id,
+        "output_type": "images",
+        "index": 0,
+        "filename": name,
+        "subfolder": "",
+        "type": folder_type,
+        "localpath": None,
+        "format": None,
+    }
+
+
+def test_collect_outputs_keeps_same_named_temp_and_output_files_apart(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(media_service.settings, "MEDIA_ROOT", str(tmp_path))
+    fetched = []
+
+    async def download(session, filename, dest, subfolder, output_type):
+        fetched.append(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(output_type.encode())
+
+    monkeypatch.setattr(media_service, "download_output", download)
+
+    outputs = [
+        _image_output("frame.png", "temp"),
+        _image_output("frame.png", "output"),
+        _image_output("frame.png", "output", node_id="10"),  # same file again
+    ]
+    collected = asyncio.run(collect_outputs(outputs))
+
+    assert len(fetched) == 2
+    assert [o["source_url"].split("/media/")[-1] for o in collected] == [
+        "temp/frame.png",
+        "output/frame.png",
+        "output/frame.png",
+    ]
+    assert (tmp_path / "temp" / "frame.png").read_bytes() == b"temp"
+    assert (tmp_path / "output" / "frame.png").read_bytes() == b"output"
+
+
+def test_collect_outputs_removes_every_file_when_one_download_fails(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(media_service.settings, "MEDIA_ROOT", str(tmp_path))
+
+    async def download(session, filename, dest, subfolder, output_type):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(b"partial")
+        if filename == "broken.png":
+            raise RuntimeError("Failed to download broken.png: 500")
+        await asyncio.sleep(0.05)
+
+    monkeypatch.setattr(media_service, "download_output", download)
+
+    outputs = [_image_output(f"ok_{i}.png", "output") for i in range(3)]
+    with pytest.raises(RuntimeError, match="broken.png"):
+        asyncio.run(collect_outputs(outputs + [_image_output("broken.png", "output")]))
+
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+
+
+def test_an_unreachable_websocket_does_not_delay_the_generation(monkeypatch):
+    async def start(self):
+        await asyncio.sleep(10)  # connect hangs until its timeout
+        return False
+
+    async def wait_for_comfy_result(prompt_id):
+        return {"outputs": {"9": {"gifs": [{"filename": "out.mp4"}]}}}
+
+    async def collect_outputs(outputs):
+        return [dict(o, source_url=None, metadata={}) for o in outputs]
+
+    monkeypatch.setattr(tracing.NodeEventListener, "start", start)
+    monkeypatch.setattr(video_service.settings, "TRACE_NODE_EVENTS", True)
+    monkeypatch.setattr(video_service, "submit_workflow", lambda w, c: "prompt-1")
+    monkeypatch.setattr(video_service, "wait_for_comfy_result", wait_for_comfy_result)
+    monkeypatch.setattr(video_service, "collect_outputs", collect_outputs)
+
+    async def run():
+        tracing.start_trace()
+        return await video_service.execute_workflow({})
+
+    started = time.monotonic()
+    result = asyncio.run(run())
+
+    assert time.monotonic() - started < 1
+    assert (result["prompt_id"], result["filename"]) == ("prompt-1", "out.mp4")
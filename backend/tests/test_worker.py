@@ -0,0 +1,60 @@
+"""
+Unit tests for worker.py
+
+Runs a job against an in-memory SQLite database with stand-in generation
+steps instead of ComfyUI.
+"""
+
+import asyncio
+import time
+
+from app import worker as worker_module
+from app.models.generation_job import JOB_SUCCEEDED, GenerationJob
+from app.models.video import Video
+from app.services import job_service
+from app.worker import Worker
+
+
+def test_blocking_db_work_does_not_stall_other_jobs(session_factory, monkeypatch):
+    monkeypatch.setattr(worker_module, "SessionLocal", session_factory)
+    with session_factory() as db:
+        job_id = job_service.enqueue_job(db, 1, "fox", None, None, "wan-i2v").id
+
+    async def prepare_workflow(positive_prompt, negative_prompt):
+        return {}
+
+    async def execute_workflow(workflow, prompt_id=None, on_submitted=None):
+        return {"filename": "out.mp4"}
+
+    def save_video(db, user_id, positive_prompt, negative_prompt, result, **kwargs):
+        time.sleep(0.3)  # a slow commit
+        video = Video(user_id=user_id, positive_prompt=positive_prompt)
+        db.add(video)
+        db.commit()
+        return video
+
+    monkeypatch.setattr(worker_module, "prepare_workflow", prepare_workflow)
+    monkeypatch.setattr(worker_module, "inject_workflow_params", lambda w, **_: w)
+    monkeypatch.setattr(worker_module, "execute_workflow", execute_workflow)
+    monkeypatch.setattr(worker_module, "save_video", save_video)
+
+    async def scenario():
+        ticks = 0
+
+        async def other_job():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(other_job())
+        await Worker("w1", concurrency=2)._run_job(job_id)
+        ticker.cancel()
+        return ticks
+
+    # The other job kept polling while the video was being saved
+    assert asyncio.run(scenario()) >= 10
+
+    with session_factory() as db:
+        job = db.get(GenerationJob, job_id)
+        assert job.status == JOB_SUCCEEDED and job.video_id is not None
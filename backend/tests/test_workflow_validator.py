@@ -0,0 +1,95 @@
+"""
+Unit tests for services/workflow_validator.py
+
+Uses a trimmed-down /object_info payload covering part of the bundled
+workflow, so no ComfyUI instance is required.
+"""
+
+import copy
+
+import pytest
+
+from app.services.workflow_validator import validate_workflow
+
+OBJECT_INFO = {
+    "CheckpointLoaderSimple": {
+        "input": {
+            "required": {"ckpt_name": [["ltxv-13b-0.9.8-distilled.safetensors"]]}
+        },
+        "output": ["MODEL", "CLIP", "VAE"],
+    },
+    "KSamplerSelect": {
+        "input": {"required": {"sampler_name": [["euler", "euler_ancestral"]]}},
+        "output": ["SAMPLER"],
+    },
+    "RandomNoise": {
+        "input": {
+            "required": {
+                "noise_seed": ["INT", {"default": 0, "min": 0, "max": 2**64 - 1}]
+            }
+        },
+        "output": ["NOISE"],
+    },
+    "LoadImage": {
+        "input": {"required": {"image": [["existing.png"], {"image_upload": True}]}},
+        "output": ["IMAGE", "MASK"],
+    },
+    "VAEDecode": {
+        "input": {"required": {"samples": ["LATENT"], "vae": ["VAE"]}},
+        "output": ["IMAGE"],
+    },
+}
+
+WORKFLOW = {
+    "44": {
+        "class_type": "CheckpointLoaderSimple",
+        "inputs": {"ckpt_name": "ltxv-13b-0.9.8-distilled.safetensors"},
+    },
+    "73": {"class_type": "KSamplerSelect", "inputs": {"sampler_name": "euler"}},
+    "1206": {"class_type": "LoadImage", "inputs": {"image": "just-uploaded.jpg"}},
+    "1507": {"class_type": "RandomNoise", "inputs": {"noise_seed": 118}},
+}
+
+
+@pytest.fixture()
+def workflow():
+    return copy.deepcopy(WORKFLOW)
+
+
+def test_valid_workflow_has_no_errors(workflow):
+    """Freshly uploaded images are accepted even if not in the cached list."""
+    assert validate_workflow(workflow, OBJECT_INFO) == []
+
+
+def test_enum_and_range_violations(workflow):
+    workflow["73"]["inputs"]["sampler_name"] = "not_a_sampler"
+    workflow["1507"]["inputs"]["noise_seed"] = -1
+
+    errors = validate_workflow(workflow, OBJECT_INFO)
+
+    assert len(errors) == 2
+    assert "sampler_name" in errors[0]
+    assert "minimum" in errors[1]
+
+
+def test_links_are_checked(workflow):
+    workflow["9"] = {
+        "class_type": "VAEDecode",
+        # CLIP output wired into a VAE input; samples links to a missing node
+        "inputs": {"samples": ["404", 0], "vae": ["44", 1]},
+    }
+
+    errors = validate_workflow(workflow, OBJECT_INFO)
+
+    assert any("missing node 404" in error for error in errors)
+    assert any("expects VAE" in error for error in errors)
+
+
+def test_unknown_class_and_missing_input(workflow):
+    workflow["1"] = {"class_type": "DoesNotExist", "inputs": {}}
+    del workflow["73"]["inputs"]["sampler_name"]
+
+    errors = validate_workflow(workflow, OBJECT_INFO)
+
+    assert any("unknown node class" in error for error in errors)
+    assert any("missing input 'sampler_name'" in error for error in errors)